@@ -94,7 +94,11 @@ base_params = {
     #'x1_A': 3.435165754894179e-08,
     #'x1_a': 1.3611312021677133
                 }
-oi = OptimisationInputs(input_params,algorithm,None,'sensitivity',base_params)
+# The two geometry parameters must sum to at least 1, <= 0 is feasible
+def geometry_constraint(x):
+    return 1 - (x[:,0] + x[:,1])
+oi = OptimisationInputs(input_params,algorithm,None,'sensitivity',base_params,
+                        parameter_constraints=[geometry_constraint])
 def testfunc():
     return 1
 cf = CostFunction(simdata_to_spatialdata,[testfunc],10)
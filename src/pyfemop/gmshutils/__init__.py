@@ -3,4 +3,8 @@
 # TO DO
 # 
 
-from pyfemop.gmshutils.gmshutils import RunGmsh
\ No newline at end of file
+from pyfemop.gmshutils.gmshutils import RunGmsh
+from pyfemop.gmshutils.meshcache import MeshCache, CachedGmshRunner
+from pyfemop.gmshutils.mesher import GmshResult, GmshMesher, run_gmsh
+from pyfemop.gmshutils.gmshapi import GmshApiMesher, split_parameters
+from pyfemop.gmshutils.meshquality import MeshQualityGate, mesh_statistics, read_msh
@@ -0,0 +1,204 @@
+#
+# Meshing through the gmsh python API in long lived worker processes.
+#
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    import gmsh
+except (ImportError,OSError):
+    # OSError when the gmsh library's system dependencies are missing
+    gmsh = None
+
+from pyfemop.gmshutils.mesher import GmshResult
+
+_save = re.compile(r'^\s*Save\b[^;]*;\s*$',re.MULTILINE)
+_exit = re.compile(r'^\s*Exit\s*;\s*$',re.MULTILINE)
+_file_path = re.compile(r'\b((?:Include|Merge|ShapeFromFile)\s*\(?\s*")([^"]+)(")')
+
+
+def _parse_value(value):
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        return value.strip('"')
+
+def split_parameters(geo_text,comment_char='//',var_start='_*',var_end='**'):
+    """Take the parameter block out of a parameterised .geo file, leaving a
+    template the parameters can be set on through the API. Save and Exit
+    commands are removed as well, the mesh is written by the caller and Exit
+    would end the worker.
+
+    Args:
+        geo_text (str): Contents of the .geo file.
+        comment_char (str, optional): Comment characters. Defaults to '//'.
+        var_start (str, optional): Marks the start of the parameter block after the comment characters. Defaults to '_*'.
+        var_end (str, optional): Marks the end of the parameter block after the comment characters. Defaults to '**'.
+
+    Returns:
+        tuple: Template text and a dict of the default value of each parameter.
+    """
+    lines = geo_text.splitlines(keepends=True)
+    start = None
+    end = None
+    for i,line in enumerate(lines):
+        if start is None and line.strip() == comment_char + var_start:
+            start = i
+        elif start is not None and line.strip() == comment_char + var_end:
+            end = i
+            break
+    if start is None or end is None:
+        raise ValueError('No parameter block found in the .geo file.')
+
+    defaults = dict()
+    for line in lines[start+1:end]:
+        line = line.split(comment_char)[0].strip().rstrip(';')
+        if '=' not in line:
+            continue
+        name, value = line.split('=',1)
+        defaults[name.strip()] = _parse_value(value)
+
+    template = ''.join(lines[:start] + lines[end+1:])
+    template = _exit.sub('',_save.sub('',template))
+    return template, defaults
+
+
+def _absolute_paths(template,directory):
+    # Relative paths in Include, Merge and ShapeFromFile are relative to the
+    # original .geo file, the template is merged from somewhere else.
+    def absolute(match):
+        path = Path(match.group(2))
+        if not path.is_absolute():
+            path = Path(directory).resolve() / path
+        return match.group(1) + path.as_posix() + match.group(3)
+    return _file_path.sub(absolute,template)
+
+
+def _init_gmsh():
+    gmsh.initialize()
+    gmsh.option.setNumber('General.Terminal',0)
+
+def _mesh_with_api(geo_file,template_file,parameters,mesh_file,dim=None):
+    """Mesh the template with the given parameters in this worker's gmsh session.
+    """
+    start_time = time.perf_counter()
+    try:
+        gmsh.clear()
+        gmsh.parser.clear()
+        for name,value in parameters.items():
+            if isinstance(value,str):
+                gmsh.parser.setString(name,[value])
+            else:
+                gmsh.parser.setNumber(name,[float(value)])
+        gmsh.merge(str(template_file))
+        if gmsh.model.mesh.getNodes()[0].shape[0] == 0:
+            # The template doesn't mesh itself
+            gmsh.model.mesh.generate(dim if dim is not None else gmsh.model.getDimension())
+        gmsh.write(str(mesh_file))
+    except Exception as error:
+        return GmshResult(geo_file,1,'',str(error),time.perf_counter()-start_time)
+    return GmshResult(geo_file,0,'','',time.perf_counter()-start_time)
+
+
+class GmshApiMesher():
+    """Meshes a parameterised .geo file through the gmsh API in a pool of
+    long lived worker processes. Each worker initialises gmsh once, then for
+    every candidate sets the parameters directly on the parser and meshes,
+    so no .geo file is rendered and no gmsh process is started per candidate.
+    Runs can't be timed out, use GmshMesher for geometries that might hang.
+
+    The template, the .geo file without its parameter block, is written to a
+    temporary directory that is removed on shutdown (or when the mesher is
+    garbage collected), nothing is written next to the original. Relative
+    paths in Include, Merge and ShapeFromFile are made absolute first, paths
+    built with Str() are left as they are.
+    """
+
+    def __init__(self,geo_file,n_workers=4,dim=None,comment_char='//'):
+        """
+        Args:
+            geo_file (Path): Parameterised .geo file, with its parameters between //_* and //**.
+            n_workers (int, optional): Number of gmsh worker processes. Defaults to 4.
+            dim (int, optional): Dimension to mesh if the file has no Mesh command. Defaults to None, the model dimension.
+            comment_char (str, optional): Comment characters around the parameter block. Defaults to '//'.
+        """
+        if gmsh is None:
+            raise ImportError('The gmsh python package is required for GmshApiMesher.')
+        self._geo_file = Path(geo_file)
+        template, self._defaults = split_parameters(self._geo_file.read_text(),comment_char)
+        self._template_dir = tempfile.TemporaryDirectory(prefix='gmshapi-')
+        self._template_file = Path(self._template_dir.name) / (self._geo_file.stem + '_template.geo')
+        self._template_file.write_text(_absolute_paths(template,self._geo_file.parent))
+        self._n_workers = n_workers
+        self._dim = dim
+        self._pool = None
+
+    def get_defaults(self):
+        """
+        Returns:
+            dict: Default value of each parameter in the .geo file.
+        """
+        return dict(self._defaults)
+
+    def get_pool(self):
+        """
+        Returns:
+            ProcessPoolExecutor: Pool of gmsh workers, started on first use.
+        """
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self._n_workers,initializer=_init_gmsh)
+        return self._pool
+
+    def submit(self,parameters,mesh_file):
+        """Start meshing one candidate.
+
+        Args:
+            parameters (dict): Parameter values, missing ones take the default from the .geo file.
+            mesh_file (Path): Where to write the mesh.
+
+        Returns:
+            Future: Result, result() returns the GmshResult.
+        """
+        values = self.get_defaults()
+        values.update(parameters)
+        return self.get_pool().submit(_mesh_with_api,self._geo_file,self._template_file,values,mesh_file,self._dim)
+
+    def mesh_all(self,parameter_list,mesh_files):
+        """Mesh many candidates and wait for all of them.
+
+        Args:
+            parameter_list (list): Parameter dict for each candidate.
+            mesh_files (list): Where to write each mesh.
+
+        Returns:
+            list: GmshResult for each candidate, in order.
+        """
+        futures = [self.submit(parameters,mesh_file) for parameters,mesh_file in zip(parameter_list,mesh_files)]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        """Stop the gmsh workers and remove the template.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._template_dir is not None:
+            self._template_dir.cleanup()
+            self._template_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.shutdown()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        # Copies use the template but only the original removes it
+        state['_template_dir'] = None
+        return state
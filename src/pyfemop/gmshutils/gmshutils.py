@@ -2,20 +2,17 @@
 # Code to update .geo file parameters
 # ToDo
 
-import os
+from pyfemop.gmshutils.mesher import run_gmsh
 
-def RunGmsh(gmsh_path,input_file):
+def RunGmsh(gmsh_path,input_file,timeout=None):
     """Run the .geo file given
 
     Args:
+        gmsh_path (string): Path to the gmsh app.
         input_file (string): Path to the .geo file containing the input.
-    """
+        timeout (float, optional): Wall clock limit in seconds. Defaults to None, no limit.
 
-    if os.path.splitext(input_file)[1] != '.geo':
-        raise FileNotFoundError('Incorrect file type. Must be .geo.')
-    
-    if not os.path.exists(input_file):
-        raise FileNotFoundError('File not found.')
-    
-    call_string = '{} {}'.format(gmsh_path,input_file)
-    os.system(call_string)
\ No newline at end of file
+    Returns:
+        GmshResult: Exit status and output of gmsh.
+    """
+    return run_gmsh(gmsh_path,input_file,timeout,parse_only=False)
@@ -0,0 +1,186 @@
+#
+# Cache of gmsh meshes keyed by the rendered .geo file.
+#
+import hashlib
+import os
+import re
+import shutil
+from pathlib import Path
+
+from mooseherder import GmshRunner
+from pyfemop.gmshutils.mesher import run_gmsh
+
+_save_str = re.compile(r'^\s*Save\s+Str\s*\(\s*(\w+)\s*\)\s*;',re.MULTILINE)
+_save_literal = re.compile(r'^\s*Save\s+"([^"]+)"\s*;',re.MULTILINE)
+
+
+def _strip_comments(geo_text):
+    geo_text = re.sub(r'/\*.*?\*/','',geo_text,flags=re.DOTALL)
+    return re.sub(r'//.*','',geo_text)
+
+def get_mesh_output(geo_text,input_file):
+    """Work out where a .geo script saves its mesh.
+    Handles Save Str(variable); and Save "name";, otherwise gmsh's default
+    of the script name with a .msh extension.
+
+    Args:
+        geo_text (str): Contents of the .geo file.
+        input_file (Path): Path to the .geo file, relative mesh paths are relative to its directory.
+
+    Returns:
+        Path: Path to the mesh file.
+    """
+    input_file = Path(input_file)
+    geo_text = _strip_comments(geo_text)
+    mesh_name = None
+
+    match = _save_str.search(geo_text)
+    if match is not None:
+        assignment = re.search(r'^\s*{}\s*=\s*"([^"]+)"\s*;'.format(match.group(1)),geo_text,re.MULTILINE)
+        if assignment is not None:
+            mesh_name = assignment.group(1)
+    else:
+        match = _save_literal.search(geo_text)
+        if match is not None:
+            mesh_name = match.group(1)
+
+    if mesh_name is None:
+        return input_file.with_suffix('.msh')
+    return input_file.parent / mesh_name
+
+
+def _link_or_copy(source,target,link=True):
+    """Hard link source to target, falling back to a copy across file systems.
+    The target is replaced, never written through, so an existing link to it is left alone.
+    """
+    target = Path(target)
+    temp_path = target.with_name(target.name + '.tmp{}'.format(os.getpid()))
+    try:
+        if not link:
+            raise OSError
+        os.link(source,temp_path)
+    except OSError:
+        shutil.copyfile(source,temp_path)
+    os.replace(temp_path,target)
+
+
+class MeshCache():
+    """Content-addressed store of mesh files. Entries are keyed by a hash of
+    the rendered .geo text, so candidates with the same geometry parameters
+    share one mesh whatever their other parameters are.
+    Files pulled in with Include or Merge are not part of the key.
+    Meshes are copied in and hard linked out, so anything writing a mesh
+    file that came from the cache must remove it first, as
+    CachedGmshRunner does before running gmsh.
+    """
+
+    def __init__(self,cache_dir):
+        """
+        Args:
+            cache_dir (Path): Directory to store the meshes in, created if needed.
+        """
+        self._cache_dir = Path(cache_dir)
+        self._cache_dir.mkdir(parents=True,exist_ok=True)
+
+    def key(self,geo_text):
+        """Get the cache key for a rendered .geo file.
+
+        Args:
+            geo_text (str): Contents of the .geo file.
+
+        Returns:
+            str: Hex digest key.
+        """
+        return hashlib.sha256(geo_text.encode()).hexdigest()
+
+    def _path(self,key):
+        return self._cache_dir / (key + '.msh')
+
+    def fetch(self,key,mesh_file):
+        """Put a cached mesh at mesh_file.
+
+        Args:
+            key (str): Cache key.
+            mesh_file (Path): Where the mesh should be.
+
+        Returns:
+            bool: True if the mesh was cached, False otherwise.
+        """
+        path = self._path(key)
+        if not path.exists():
+            return False
+        try:
+            _link_or_copy(path,mesh_file)
+        except FileNotFoundError:
+            # Removed since the check
+            return False
+        return True
+
+    def store(self,key,mesh_file):
+        """Add a mesh to the cache.
+
+        Args:
+            key (str): Cache key.
+            mesh_file (Path): Mesh created for this key.
+        """
+        if Path(mesh_file).exists():
+            # A copy, the run's mesh file is overwritten by the next candidate meshed in its directory
+            _link_or_copy(mesh_file,self._path(key),link=False)
+
+    def __len__(self):
+        return len(list(self._cache_dir.glob('*.msh')))
+
+    def clear(self):
+        """Remove every mesh.
+        """
+        for path in self._cache_dir.glob('*.msh'):
+            path.unlink(missing_ok=True)
+
+
+class CachedGmshRunner(GmshRunner):
+    """GmshRunner that only calls gmsh for geometries it hasn't meshed before.
+    Drop in replacement for GmshRunner in the herd's runner list.
+    Meshes from failed or timed out runs are not cached.
+    """
+
+    def __init__(self,gmsh_app,cache_dir,timeout=None):
+        """
+        Args:
+            gmsh_app (Path): Full path to the gmsh app.
+            cache_dir (Path): Directory of the mesh cache.
+            timeout (float, optional): Wall clock limit per gmsh run in seconds. Defaults to None, no limit.
+        """
+        super().__init__(Path(gmsh_app))
+        self._mesh_cache = MeshCache(cache_dir)
+        self._timeout = timeout
+        self._last_result = None
+        self._n_hits = 0
+        self._n_runs = 0
+
+    def run(self,input_file=None,parse_only=True):
+        """Link the cached mesh into place, or run gmsh and cache the mesh.
+
+        Args:
+            input_file (Path, optional): Path to the .geo file. Defaults to the file set with set_input_file.
+            parse_only (bool, optional): Passed to GmshRunner.run. Defaults to True.
+        """
+        if input_file is not None:
+            self.set_input_file(Path(input_file))
+        if self._input_path is None:
+            raise RuntimeError("Specify input *.geo file before running gmsh.")
+
+        geo_text = self._input_path.read_text()
+        key = self._mesh_cache.key(geo_text)
+        mesh_file = get_mesh_output(geo_text,self._input_path)
+        if self._mesh_cache.fetch(key,mesh_file):
+            self._n_hits += 1
+            return
+
+        # May be a link to a cached mesh, gmsh would write through it
+        mesh_file.unlink(missing_ok=True)
+        self._last_result = run_gmsh(self._gmsh_app,self._input_path,self._timeout,parse_only)
+        self._n_runs += 1
+        if self._last_result.ok:
+            self._mesh_cache.store(key,mesh_file)
+        else:
+            print('Gmsh failed on {}: {}'.format(self._input_path,self._last_result))
@@ -0,0 +1,156 @@
+#
+# Running gmsh on many .geo files at once, with timeouts.
+#
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+class GmshResult():
+    """Outcome of one gmsh run.
+    """
+
+    def __init__(self,input_file,returncode,stdout,stderr,run_time,timed_out=False):
+        """
+        Args:
+            input_file (Path): The .geo file.
+            returncode (int): Exit status of gmsh, None if it timed out.
+            stdout (str): Captured standard output.
+            stderr (str): Captured standard error.
+            run_time (float): Wall clock time in seconds.
+            timed_out (bool, optional): Whether gmsh was killed for taking too long. Defaults to False.
+        """
+        self.input_file = input_file
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.run_time = run_time
+        self.timed_out = timed_out
+
+    @property
+    def ok(self):
+        """Whether gmsh finished with exit status 0.
+        """
+        return not self.timed_out and self.returncode == 0
+
+    def __repr__(self):
+        return 'GmshResult({}, returncode={}, timed_out={}, run_time={:.2f})'.format(
+            self.input_file,self.returncode,self.timed_out,self.run_time)
+
+
+def _decode(output):
+    if output is None:
+        return ''
+    if isinstance(output,bytes):
+        return output.decode(errors='replace')
+    return output
+
+def run_gmsh(gmsh_app,input_file,timeout=None,parse_only=True):
+    """Run gmsh on a .geo file, capturing its exit status and output.
+    A run taking longer than the timeout is killed.
+
+    Args:
+        gmsh_app (Path): Full path to the gmsh app.
+        input_file (Path): Path to the .geo file.
+        timeout (float, optional): Wall clock limit in seconds. Defaults to None, no limit.
+        parse_only (bool, optional): Run with -parse_and_exit, the .geo file saves the mesh itself. Defaults to True.
+
+    Raises:
+        FileNotFoundError: Not a .geo file, or it doesn't exist.
+
+    Returns:
+        GmshResult: The outcome.
+    """
+    input_file = Path(input_file)
+    if input_file.suffix != '.geo':
+        raise FileNotFoundError('Incorrect file type. Must be .geo.')
+    if not input_file.exists():
+        raise FileNotFoundError('File not found.')
+
+    arg_list = [str(gmsh_app)]
+    if parse_only:
+        arg_list.append('-parse_and_exit')
+    arg_list.append(str(input_file))
+
+    start_time = time.perf_counter()
+    try:
+        process = subprocess.run(arg_list,capture_output=True,text=True,timeout=timeout,check=False)
+    except subprocess.TimeoutExpired as error:
+        return GmshResult(input_file,None,_decode(error.stdout),_decode(error.stderr),
+                          time.perf_counter()-start_time,timed_out=True)
+    return GmshResult(input_file,process.returncode,process.stdout,process.stderr,
+                      time.perf_counter()-start_time)
+
+
+class GmshMesher():
+    """Meshes .geo files in parallel on a bounded pool of gmsh processes.
+    The pool lives until shutdown, so one mesher can serve every generation.
+    Each run has its own timeout, so a degenerate geometry can't stall the rest.
+    """
+
+    def __init__(self,gmsh_app,n_workers=4,timeout=None,parse_only=True):
+        """
+        Args:
+            gmsh_app (Path): Full path to the gmsh app.
+            n_workers (int, optional): Maximum number of gmsh processes at once. Defaults to 4.
+            timeout (float, optional): Wall clock limit per run in seconds. Defaults to None, no limit.
+            parse_only (bool, optional): Run with -parse_and_exit. Defaults to True.
+        """
+        if not Path(gmsh_app).exists():
+            raise FileNotFoundError('Gmsh app not found at given path.')
+        self._gmsh_app = Path(gmsh_app)
+        self._n_workers = n_workers
+        self._timeout = timeout
+        self._parse_only = parse_only
+        self._pool = None
+
+    def get_pool(self):
+        """
+        Returns:
+            ThreadPoolExecutor: Pool the gmsh runs are waited on from, created on first use.
+        """
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self._n_workers)
+        return self._pool
+
+    def submit(self,input_file):
+        """Start meshing one .geo file.
+
+        Args:
+            input_file (Path): Path to the .geo file.
+
+        Returns:
+            Future: Result, result() returns the GmshResult.
+        """
+        return self.get_pool().submit(run_gmsh,self._gmsh_app,input_file,self._timeout,self._parse_only)
+
+    def mesh_all(self,input_files):
+        """Mesh many .geo files and wait for all of them.
+
+        Args:
+            input_files (list): Paths to the .geo files.
+
+        Returns:
+            list: GmshResult for each file, in the order of input_files.
+        """
+        futures = [self.submit(input_file) for input_file in input_files]
+        return [future.result() for future in futures]
+
+    def shutdown(self):
+        """Wait for any running gmsh processes and close the pool.
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.shutdown()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
@@ -0,0 +1,242 @@
+#
+# Element quality of gmsh meshes, checked before a candidate is solved.
+#
+from pathlib import Path
+
+import numpy as np
+
+from pyfemop.gmshutils.meshcache import get_mesh_output
+
+# gmsh element type: (dimension, number of corner nodes)
+_element_types = {2:(2,3),9:(2,3),
+                  3:(2,4),10:(2,4),16:(2,4),
+                  4:(3,4),11:(3,4),
+                  5:(3,8),12:(3,8),17:(3,8)}
+
+# Corner, next and previous (and for 3D, third) node of each corner of an element
+_corners = {(2,3):[[0,1,2],[1,2,0],[2,0,1]],
+            (2,4):[[0,1,3],[1,2,0],[2,3,1],[3,0,2]],
+            (3,4):[[0,1,2,3],[1,2,0,3],[2,0,1,3],[3,0,2,1]],
+            (3,8):[[0,1,3,4],[1,2,0,5],[2,3,1,6],[3,0,2,7],
+                   [4,7,5,0],[5,4,6,1],[6,5,7,2],[7,6,4,3]]}
+
+# Scaled Jacobian of the ideal element, 1 after normalising
+_ideal = {(2,3):np.sqrt(3)/2,(2,4):1.,(3,4):1/np.sqrt(2),(3,8):1.}
+
+# Edges of each element as pairs of corner nodes
+_edges = {(2,3):[[0,1],[1,2],[2,0]],
+          (2,4):[[0,1],[1,2],[2,3],[3,0]],
+          (3,4):[[0,1],[1,2],[2,0],[0,3],[1,3],[2,3]],
+          (3,8):[[0,1],[1,2],[2,3],[3,0],[4,5],[5,6],[6,7],[7,4],[0,4],[1,5],[2,6],[3,7]]}
+
+
+def _sections(lines):
+    sections = dict()
+    name = None
+    for line in lines:
+        if line.startswith('$'):
+            if line.startswith('$End'):
+                name = None
+            else:
+                name = line[1:].strip()
+                sections[name] = []
+        elif name is not None:
+            sections[name].append(line)
+    return sections
+
+def read_msh(mesh_file):
+    """Read the nodes and elements of an ASCII gmsh mesh, format 4.1 or 2.2.
+
+    Args:
+        mesh_file (Path): The .msh file.
+
+    Raises:
+        ValueError: Binary or unsupported format.
+
+    Returns:
+        tuple: Node coordinates, shape (n nodes, 3), and a dict of
+            (n elements, n nodes per element) arrays of 0 based row numbers
+            into the coordinates, keyed by gmsh element type.
+    """
+    with open(mesh_file,'r',errors='replace') as f:
+        sections = _sections(f.read().splitlines())
+    version, file_type = sections['MeshFormat'][0].split()[:2]
+    if file_type != '0':
+        raise ValueError('Only ASCII meshes can be read.')
+
+    elements = dict()
+    if version.startswith('4'):
+        lines = sections['Nodes']
+        n_blocks, n_nodes = [int(v) for v in lines[0].split()[:2]]
+        tags = np.empty(n_nodes,dtype=np.int64)
+        coords = np.empty((n_nodes,3))
+        row = 1
+        done = 0
+        for b in range(n_blocks):
+            parametric, n = [int(v) for v in lines[row].split()[2:4]]
+            row += 1
+            tags[done:done+n] = [int(v) for v in lines[row:row+n]]
+            xyz = np.array(' '.join(lines[row+n:row+2*n]).split(),dtype=float).reshape(n,-1)
+            coords[done:done+n] = xyz[:,:3]
+            row += 2*n
+            done += n
+
+        lines = sections['Elements']
+        n_blocks = int(lines[0].split()[0])
+        row = 1
+        for b in range(n_blocks):
+            element_type, n = [int(v) for v in lines[row].split()[2:4]]
+            row += 1
+            block = np.array(' '.join(lines[row:row+n]).split(),dtype=np.int64).reshape(n,-1)[:,1:]
+            elements.setdefault(element_type,[]).append(block)
+            row += n
+    elif version.startswith('2'):
+        lines = sections['Nodes']
+        n_nodes = int(lines[0])
+        table = np.array(' '.join(lines[1:n_nodes+1]).split(),dtype=float).reshape(n_nodes,4)
+        tags = table[:,0].astype(np.int64)
+        coords = table[:,1:]
+        for line in sections['Elements'][1:]:
+            values = [int(v) for v in line.split()]
+            # tag, type, number of tags, tags..., nodes...
+            elements.setdefault(values[1],[]).append(np.array([values[3+values[2]:]]))
+    else:
+        raise ValueError('Unsupported mesh format {}.'.format(version))
+
+    # Node tags to rows of coords
+    lookup = np.zeros(tags.max()+1,dtype=np.int64)
+    lookup[tags] = np.arange(tags.shape[0])
+    elements = {key: lookup[np.vstack(blocks)] for key,blocks in elements.items()}
+    return coords, elements
+
+
+def element_quality(coords,elements):
+    """Scaled Jacobian and edge aspect ratio of every element of the highest
+    dimension in the mesh. The scaled Jacobian is the smallest over the
+    corners, normalised to 1 for the ideal shape and <= 0 for an inverted
+    or degenerate element. 2D elements are signed against the majority
+    orientation, so flipped elements come out negative.
+
+    Args:
+        coords (np.ndarray): Node coordinates, shape (n nodes, 3).
+        elements (dict): Element node rows keyed by gmsh element type, as returned by read_msh.
+
+    Returns:
+        tuple: Scaled Jacobian and aspect ratio (longest over shortest edge) of each element.
+    """
+    shapes = [_element_types[key] for key in elements if key in _element_types]
+    if not shapes:
+        return np.array([]), np.array([])
+    dim = max([shape[0] for shape in shapes])
+
+    jacobians = []
+    ratios = []
+    for key,nodes in elements.items():
+        if _element_types.get(key,(0,0))[0] != dim:
+            continue
+        shape = _element_types[key]
+        xyz = coords[nodes[:,:shape[1]]]
+        corners = np.array(_corners[shape])
+        origin = xyz[:,corners[:,0]]
+        a = xyz[:,corners[:,1]] - origin
+        b = xyz[:,corners[:,2]] - origin
+        if dim == 2:
+            cross = np.cross(a,b)
+            if np.allclose(coords[:,2],coords[0,2]):
+                det = cross[...,2]
+            else:
+                det = np.linalg.norm(cross,axis=-1)
+            scale = np.linalg.norm(a,axis=-1)*np.linalg.norm(b,axis=-1)
+        else:
+            c = xyz[:,corners[:,3]] - origin
+            det = np.einsum('ijk,ijk->ij',np.cross(a,b),c)
+            scale = np.linalg.norm(a,axis=-1)*np.linalg.norm(b,axis=-1)*np.linalg.norm(c,axis=-1)
+        with np.errstate(divide='ignore',invalid='ignore'):
+            jacobian = np.nan_to_num(det/scale/_ideal[shape],nan=0.)
+        jacobians.append(jacobian.min(axis=1) if dim == 3 else jacobian)
+
+        edges = np.array(_edges[shape])
+        lengths = np.linalg.norm(xyz[:,edges[:,1]] - xyz[:,edges[:,0]],axis=-1)
+        with np.errstate(divide='ignore'):
+            ratios.append(lengths.max(axis=1)/lengths.min(axis=1))
+
+    if dim == 2:
+        # Orientation of 2D elements follows the surface, take the majority as positive
+        signs = np.sign(np.median(np.concatenate([j.ravel() for j in jacobians])))
+        jacobians = [(j*(signs if signs != 0 else 1.)).min(axis=1) for j in jacobians]
+    return np.concatenate(jacobians), np.concatenate(ratios)
+
+def mesh_statistics(mesh_file):
+    """Quality statistics of a mesh file.
+
+    Args:
+        mesh_file (Path): The .msh file.
+
+    Returns:
+        dict: Number of elements, minimum and mean scaled Jacobian, maximum and mean aspect ratio.
+    """
+    jacobian, ratio = element_quality(*read_msh(mesh_file))
+    if jacobian.shape[0] == 0:
+        return {'n_elements':0,'min_jacobian':np.nan,'mean_jacobian':np.nan,
+                'max_aspect_ratio':np.nan,'mean_aspect_ratio':np.nan}
+    return {'n_elements':jacobian.shape[0],
+            'min_jacobian':float(jacobian.min()),
+            'mean_jacobian':float(jacobian.mean()),
+            'max_aspect_ratio':float(ratio.max()),
+            'mean_aspect_ratio':float(ratio.mean())}
+
+
+class MeshQualityGate():
+    """Rejects candidates whose mesh is missing, unreadable or of poor
+    quality before they are solved. Rejected candidates get the penalty cost.
+    """
+
+    def __init__(self,min_jacobian=0.1,max_aspect_ratio=20.,penalty=1E6):
+        """
+        Args:
+            min_jacobian (float, optional): Smallest scaled Jacobian allowed in any element. Defaults to 0.1.
+            max_aspect_ratio (float, optional): Largest aspect ratio allowed in any element. Defaults to 20.
+            penalty (float, optional): Cost given to rejected candidates. Defaults to 1E6.
+        """
+        self._min_jacobian = min_jacobian
+        self._max_aspect_ratio = max_aspect_ratio
+        self._penalty = penalty
+
+    def get_penalty(self):
+        """
+        Returns:
+            float: Cost given to rejected candidates.
+        """
+        return self._penalty
+
+    def check(self,mesh_file):
+        """Check a mesh file.
+
+        Args:
+            mesh_file (Path): The .msh file.
+
+        Returns:
+            tuple: Whether the mesh passed and its statistics (None if it couldn't be read).
+        """
+        if not Path(mesh_file).exists():
+            return False, None
+        try:
+            stats = mesh_statistics(mesh_file)
+        except (ValueError,KeyError,IndexError):
+            return False, None
+        passed = (stats['n_elements'] > 0
+                  and stats['min_jacobian'] >= self._min_jacobian
+                  and stats['max_aspect_ratio'] <= self._max_aspect_ratio)
+        return passed, stats
+
+    def check_geo(self,geo_file):
+        """Check the mesh saved by a .geo file.
+
+        Args:
+            geo_file (Path): The rendered .geo file, after gmsh has run.
+
+        Returns:
+            tuple: Whether the mesh passed and its statistics (None if it couldn't be read).
+        """
+        geo_file = Path(geo_file)
+        return self.check(get_mesh_output(geo_file.read_text(),geo_file))
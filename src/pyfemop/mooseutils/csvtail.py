@@ -0,0 +1,83 @@
+#
+# Fast reading of the final row of moose postprocessor csv files.
+#
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+def _to_value(string):
+    """Convert a csv field to a float where possible, like pandas would.
+    """
+    string = string.strip()
+    if string == '':
+        return float('nan')
+    try:
+        return float(string)
+    except ValueError:
+        return string
+
+def _parse_line(line,delimiter):
+    return next(csv.reader([line],delimiter=delimiter))
+
+def read_last_row(filename,delimiter=',',block_size=65536):
+    """Read the header and final row of a csv file without reading the rest.
+    Seeks back from the end of the file a block at a time until a complete
+    line is found. A trailing line with the wrong number of fields, e.g.
+    one still being written, is skipped.
+
+    Args:
+        filename (str): Path to the file to be read.
+        delimiter (str, optional): Field delimiter. Defaults to ','.
+        block_size (int, optional): Number of bytes read per seek. Defaults to 65536.
+
+    Returns:
+        dict: Header names as keys, values of the final row as floats (or str if not numeric).
+            None if the file has no data rows.
+    """
+    with open(filename,'rb') as f:
+        header = _parse_line(f.readline().decode().rstrip('\r\n'),delimiter)
+        data_start = f.tell()
+
+        end = f.seek(0,os.SEEK_END)
+        position = end
+        tail = b''
+        while True:
+            lines = tail.split(b'\n')
+            # Anything before the first newline may be a partial line unless at the start of the data
+            complete = lines if position <= data_start else lines[1:]
+            for line in reversed(complete):
+                line = line.decode().rstrip('\r')
+                if line.strip() == '':
+                    continue
+                values = _parse_line(line,delimiter)
+                if len(values) == len(header):
+                    return dict(zip(header,[_to_value(v) for v in values]))
+            if position <= data_start:
+                return None
+            # Keep the possibly partial first line and read the block before it
+            read_size = min(block_size,position-data_start)
+            position -= read_size
+            f.seek(position)
+            tail = f.read(read_size) + lines[0]
+
+def read_last_rows(filenames,n_threads=8,delimiter=','):
+    """Read the final row of many csv files concurrently.
+    Missing files give None.
+
+    Args:
+        filenames (list): Paths to the files to be read.
+        n_threads (int, optional): Number of reader threads. Defaults to 8.
+        delimiter (str, optional): Field delimiter. Defaults to ','.
+
+    Returns:
+        list: Dict (or None) per file, in the order of filenames.
+    """
+    def read(filename):
+        try:
+            return read_last_row(filename,delimiter)
+        except FileNotFoundError:
+            return None
+
+    with ThreadPoolExecutor(n_threads) as pool:
+        return list(pool.map(read,filenames))
@@ -0,0 +1,250 @@
+#
+# Mapping of simulation nodal data onto measured DIC points.
+#
+import hashlib
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+from pyfemop.mooseutils.interpolation import mesh_fingerprint, _triangles
+
+# Mappings kept by this process, most recently used last.
+_mappings = OrderedDict()
+_max_mappings = 8
+
+
+class DICData():
+    """Measured DIC data: point coordinates and fields at those points.
+    Field names should match the nodal variables of the simulation, e.g.
+    'disp_x', so they can be compared directly.
+    """
+
+    def __init__(self,points,fields):
+        """
+        Args:
+            points (np.ndarray): Point coordinates, shape (n points, 2) or (n points, 3).
+            fields (dict): Measured values keyed by nodal variable name, shape (n points,)
+                to compare with every time step or (n points, n time steps).
+        """
+        self.points = np.asarray(points,dtype=float)
+        self.fields = fields
+
+    def fingerprint(self):
+        """
+        Returns:
+            str: Hash of the point coordinates.
+        """
+        return hashlib.sha256(np.ascontiguousarray(self.points).tobytes()).hexdigest()
+
+
+class DICMapping():
+    """Sparse matrix interpolating simulation nodal values to DIC points.
+    Points inside a 2D element use its linear (barycentric) weights, other
+    points (outside the mesh, or 3D meshes) use inverse distance weights of
+    the nearest nodes found with a KD-tree.
+    """
+
+    def __init__(self,weights):
+        """
+        Args:
+            weights (sparse.csr_matrix): Weights, shape (n points, n nodes).
+        """
+        self._weights = weights.tocsr()
+
+    @classmethod
+    def build(cls,coords,connect,points,n_candidates=8,n_nearest=3):
+        """Build the mapping from a mesh to a set of points.
+
+        Args:
+            coords (np.ndarray): Nodal coordinates, shape (n nodes, 3).
+            connect (dict): Connectivity tables keyed 'connectX', as in SimData.
+            points (np.ndarray): DIC point coordinates, shape (n points, 2) or (n points, 3).
+            n_candidates (int, optional): Nearest elements checked for each point. Defaults to 8.
+            n_nearest (int, optional): Nodes used for points not in an element. Defaults to 3.
+
+        Returns:
+            DICMapping: The mapping.
+        """
+        coords = np.asarray(coords)
+        points = np.asarray(points,dtype=float)
+        n_points = points.shape[0]
+        rows, cols, weights = [], [], []
+        located = np.zeros(n_points,dtype=bool)
+
+        try:
+            triangles = _triangles(connect)
+        except ValueError:
+            # Not a 2D mesh, only the nearest node fallback applies
+            triangles = None
+
+        if triangles is not None and triangles.shape[0] > 0:
+            xy = coords[:,:2]
+            corners = xy[triangles]
+            tree = cKDTree(corners.mean(axis=1))
+            k = min(n_candidates,triangles.shape[0])
+            _, candidates = tree.query(points[:,:2],k=k)
+            candidates = candidates.reshape(n_points,k)
+
+            a = corners[candidates,0]
+            v0 = corners[candidates,1] - a
+            v1 = corners[candidates,2] - a
+            v2 = points[:,None,:2] - a
+            d00 = np.sum(v0*v0,axis=-1)
+            d01 = np.sum(v0*v1,axis=-1)
+            d11 = np.sum(v1*v1,axis=-1)
+            d20 = np.sum(v2*v0,axis=-1)
+            d21 = np.sum(v2*v1,axis=-1)
+            denom = d00*d11 - d01*d01
+            with np.errstate(divide='ignore',invalid='ignore'):
+                l1 = (d11*d20 - d01*d21)/denom
+                l2 = (d00*d21 - d01*d20)/denom
+            l0 = 1 - l1 - l2
+            tol = -1E-9
+            inside = (l0 >= tol) & (l1 >= tol) & (l2 >= tol) & (denom > 0)
+
+            located = np.any(inside,axis=1)
+            first = np.argmax(inside,axis=1)
+            point = np.flatnonzero(located)
+            choice = first[point]
+            tri = candidates[point,choice]
+            rows.append(np.repeat(point,3))
+            cols.append(triangles[tri].ravel())
+            weights.append(np.column_stack((l0[point,choice],l1[point,choice],l2[point,choice])).ravel())
+
+        remaining = np.flatnonzero(~located)
+        if remaining.shape[0] > 0:
+            dims = points.shape[1]
+            tree = cKDTree(coords[:,:dims])
+            k = min(n_nearest,coords.shape[0])
+            distance, nodes = tree.query(points[remaining],k=k)
+            distance = distance.reshape(remaining.shape[0],k)
+            nodes = nodes.reshape(remaining.shape[0],k)
+            with np.errstate(divide='ignore'):
+                inverse = 1/distance
+            # A point on a node takes that node's value
+            on_node = np.isinf(inverse)
+            inverse[np.any(on_node,axis=1)] = on_node[np.any(on_node,axis=1)]
+            inverse /= inverse.sum(axis=1,keepdims=True)
+            rows.append(np.repeat(remaining,k))
+            cols.append(nodes.ravel())
+            weights.append(inverse.ravel())
+
+        matrix = sparse.csr_matrix((np.concatenate(weights),(np.concatenate(rows),np.concatenate(cols))),
+                                   shape=(n_points,coords.shape[0]))
+        return cls(matrix)
+
+    def apply(self,values):
+        """Interpolate nodal values to the DIC points.
+
+        Args:
+            values (np.ndarray): Nodal values, shape (n nodes,) or (n nodes, n time steps).
+
+        Returns:
+            np.ndarray: Values at the points, shape (n points,) or (n points, n time steps).
+        """
+        return self._weights @ np.asarray(values,dtype=float)
+
+    def save(self,path):
+        """Save the mapping to an npz file.
+
+        Args:
+            path (Path): File to save to.
+        """
+        sparse.save_npz(path,self._weights)
+
+    @classmethod
+    def load(cls,path):
+        """Load a mapping saved with save().
+
+        Args:
+            path (Path): File to load.
+
+        Returns:
+            DICMapping: The mapping.
+        """
+        return cls(sparse.load_npz(path))
+
+
+def get_dic_mapping(coords,connect,dic_data,cache_dir=None):
+    """Get the mapping from a mesh to the DIC points, building it only if it
+    hasn't been built before in this process or saved in cache_dir.
+
+    Args:
+        coords (np.ndarray): Nodal coordinates, shape (n nodes, 3).
+        connect (dict): Connectivity tables keyed 'connectX', as in SimData.
+        dic_data (DICData): Measured data.
+        cache_dir (Path, optional): Directory to persist mappings in between runs. Defaults to None.
+
+    Returns:
+        DICMapping: The mapping.
+    """
+    key = mesh_fingerprint(coords,connect) + dic_data.fingerprint()[:16]
+    if key in _mappings:
+        _mappings.move_to_end(key)
+        return _mappings[key]
+
+    path = None
+    if cache_dir is not None:
+        Path(cache_dir).mkdir(parents=True,exist_ok=True)
+        path = Path(cache_dir) / (key + '.npz')
+    if path is not None and path.exists():
+        mapping = DICMapping.load(path)
+    else:
+        mapping = DICMapping.build(coords,connect,dic_data.points)
+        if path is not None:
+            mapping.save(path)
+
+    _mappings[key] = mapping
+    if len(_mappings) > _max_mappings:
+        _mappings.popitem(last=False)
+    return mapping
+
+
+class PointData():
+    """Simulated fields and residuals at the DIC points at a series of time steps.
+    Mirrors the parts of SpatialData used by the objectives: _time and
+    data_sets[i][name].
+    """
+
+    def __init__(self,time,points,fields):
+        """
+        Args:
+            time (np.ndarray): Time of each step.
+            points (np.ndarray): Point coordinates.
+            fields (dict): Arrays of shape (n time steps, n points) keyed by name.
+        """
+        self._time = np.asarray(time)
+        self.points = points
+        self.fields = fields
+
+    @property
+    def data_sets(self):
+        """Fields at each time step, as a list of dicts of (n points,) arrays.
+        """
+        return [{name: field[i] for name,field in self.fields.items()} for i in range(self._time.shape[0])]
+
+
+def compare_to_dic(data,dic_data,cache_dir=None):
+    """Interpolate simulation fields to the DIC points and calculate residuals.
+
+    Args:
+        data (SimData): Simulation data with coords, connect and the measured node_vars.
+        dic_data (DICData): Measured data.
+        cache_dir (Path, optional): Directory to persist mappings in. Defaults to None.
+
+    Returns:
+        PointData: Simulated fields by name and residuals (simulated - measured) as 'res_' + name.
+    """
+    mapping = get_dic_mapping(data.coords,data.connect,dic_data,cache_dir)
+    fields = dict()
+    for name,measured in dic_data.fields.items():
+        simulated = mapping.apply(np.asarray(data.node_vars[name]).reshape(data.coords.shape[0],-1)).T
+        measured = np.asarray(measured)
+        if measured.ndim == 2:
+            measured = measured.T
+        fields[name] = simulated
+        fields['res_'+name] = simulated - measured
+    return PointData(data.time,dic_data.points,fields)
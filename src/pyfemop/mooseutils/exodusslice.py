@@ -0,0 +1,148 @@
+#
+# Selective reading of exodus files, only the requested fields and time steps.
+#
+import threading
+import netCDF4 as nc
+import numpy as np
+from mooseherder.simdata import SimData
+
+# netCDF4/HDF5 is not thread safe, every open and read of an exodus file
+# in this package holds this lock so thread workers take turns.
+netcdf_lock = threading.RLock()
+
+
+def _names(dataset,key):
+    if key not in dataset.variables:
+        return []
+    return [str(n) for n in nc.chartostring(dataset.variables[key][:])]
+
+def select_time_steps(time,time_steps='all'):
+    """Resolve a time step selector into indices.
+
+    Args:
+        time (np.ndarray): Time of each step in the file.
+        time_steps (str, int, list or tuple, optional): 'all', 'last', an index,
+            a list/array of indices or a (start time, end time) window. Defaults to 'all'.
+
+    Returns:
+        slice or np.ndarray: Indices into the time dimension.
+    """
+    n_steps = time.shape[0]
+    if isinstance(time_steps,str):
+        if time_steps == 'all':
+            return slice(0,n_steps)
+        if time_steps == 'last':
+            return slice(max(n_steps-1,0),n_steps)
+        raise ValueError("time_steps must be 'all', 'last', indices or a (start,end) time window.")
+    if isinstance(time_steps,tuple):
+        inds = np.flatnonzero((time >= time_steps[0]) & (time <= time_steps[1]))
+    else:
+        inds = np.atleast_1d(np.asarray(time_steps,dtype=int))
+        inds = np.where(inds < 0,inds+n_steps,inds)
+    # A contiguous run of steps is read as one hyperslab
+    if inds.shape[0] > 0 and np.all(np.diff(inds) == 1):
+        return slice(int(inds[0]),int(inds[-1])+1)
+    return inds
+
+
+class ExodusSelection():
+    """Which fields and time steps to read from an exodus file.
+    Small and picklable, so it can be handed to reader workers.
+    """
+
+    def __init__(self,fields=None,time_steps='all',coords=True,connect=True):
+        """
+        Args:
+            fields (list, optional): Names of the nodal, element or global variables to read.
+                Defaults to None, reading every variable.
+            time_steps (str, int, list or tuple, optional): Time steps to read, see select_time_steps. Defaults to 'all'.
+            coords (bool, optional): Read the nodal coordinates. Defaults to True.
+            connect (bool, optional): Read the element connectivity. Defaults to True.
+        """
+        self.fields = fields
+        self.time_steps = time_steps
+        self.coords = coords
+        self.connect = connect
+
+    def read(self,filename):
+        """Read the selection from a file.
+
+        Args:
+            filename (Path): Exodus file.
+
+        Returns:
+            SimData: Data with only the selected variables and time steps.
+        """
+        return read_exodus(filename,self.fields,self.time_steps,self.coords,self.connect)
+
+
+def read_exodus(filename,fields=None,time_steps='all',coords=True,connect=True):
+    """Read selected variables at selected time steps from an exodus file.
+    Only the requested hyperslabs are decoded from the netCDF file, nothing
+    else is loaded. Arrays have the same layout as mooseherder's ExodusReader.
+    Reads are serialised through netcdf_lock, so threads read one file at a time.
+
+    Args:
+        filename (Path): Exodus file.
+        fields (list, optional): Names of the nodal, element or global variables to read.
+            Defaults to None, reading every variable.
+        time_steps (str, int, list or tuple, optional): Time steps to read, see select_time_steps. Defaults to 'all'.
+        coords (bool, optional): Read the nodal coordinates. Defaults to True.
+        connect (bool, optional): Read the element connectivity. Defaults to True.
+
+    Returns:
+        SimData: Data with only the selected variables and time steps.
+    """
+    data = SimData()
+    with netcdf_lock, nc.Dataset(str(filename)) as dataset:
+        dataset.set_auto_mask(False)
+        variables = dataset.variables
+
+        time = np.array(variables['time_whole'][:]) if 'time_whole' in variables else np.array([])
+        t_inds = select_time_steps(time,time_steps)
+        data.time = time[t_inds]
+
+        if coords:
+            xyz = [np.array(variables[key][:]) for key in ('coordx','coordy','coordz') if key in variables]
+            if not xyz:
+                raise RuntimeError("No spatial coordinate dimensions detected, problem must be at least 1D.")
+            data.num_spat_dims = len(xyz)
+            xyz += [np.zeros(xyz[0].shape[0])]*(3-len(xyz))
+            data.coords = np.vstack(xyz).T
+
+        n_blocks = len([key for key in variables if key.startswith('connect')])
+        if connect:
+            data.connect = dict()
+            for bb in range(n_blocks):
+                key = 'connect{:d}'.format(bb+1)
+                if key in variables:
+                    data.connect[key] = np.array(variables[key][:]).T
+
+        def wanted(names):
+            if fields is None:
+                return names
+            return [n for n in names if n in fields]
+
+        node_names = _names(dataset,'name_nod_var')
+        if node_names:
+            data.node_vars = dict()
+            for name in wanted(node_names):
+                key = 'vals_nod_var{:d}'.format(node_names.index(name)+1)
+                data.node_vars[name] = np.array(variables[key][t_inds,:]).T
+
+        elem_names = _names(dataset,'name_elem_var')
+        if elem_names:
+            data.elem_vars = dict()
+            for name in wanted(elem_names):
+                for bb in range(n_blocks):
+                    key = 'vals_elem_var{:d}eb{:d}'.format(elem_names.index(name)+1,bb+1)
+                    if key in variables:
+                        data.elem_vars[(name,bb+1)] = np.array(variables[key][t_inds,:]).T
+
+        glob_names = _names(dataset,'name_glo_var')
+        if glob_names:
+            data.glob_vars = dict()
+            for name in wanted(glob_names):
+                data.glob_vars[name] = np.array(variables['vals_glo_var'][t_inds,glob_names.index(name)])
+
+    return data
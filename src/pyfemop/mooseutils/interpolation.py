@@ -0,0 +1,227 @@
+#
+# Interpolation of simulation nodal data onto a regular grid.
+#
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+from scipy import sparse
+
+from pyfemop.mooseutils.strain import window_strains
+
+# Plans kept by this process, most recently used last.
+_plans = OrderedDict()
+_max_plans = 8
+
+
+def mesh_fingerprint(coords,connect):
+    """Hash identifying a mesh by its node coordinates and connectivity.
+
+    Args:
+        coords (np.ndarray): Nodal coordinates, shape (n nodes, 3).
+        connect (dict): Connectivity tables keyed 'connectX', as in SimData.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256(np.ascontiguousarray(coords,dtype=np.float64).tobytes())
+    for key in sorted(connect):
+        digest.update(key.encode())
+        digest.update(np.ascontiguousarray(connect[key],dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+def _triangles(connect):
+    """Split the 2D elements in every block into triangles of 0 based node numbers.
+    Connectivity is in the SimData layout, (nodes per element, n elements), 1 based.
+    """
+    triangles = []
+    for key in sorted(connect):
+        elements = np.asarray(connect[key]).T.astype(np.int64) - 1
+        n_nodes = elements.shape[1]
+        if n_nodes in (3,6):
+            triangles.append(elements[:,:3])
+        elif n_nodes in (4,8,9):
+            triangles.append(elements[:,[0,1,2]])
+            triangles.append(elements[:,[0,2,3]])
+        else:
+            raise ValueError('Only 2D tri and quad elements can be gridded, {} has {} nodes per element.'.format(key,n_nodes))
+    return np.vstack(triangles)
+
+
+class InterpolationPlan():
+    """Linear interpolation weights from the nodes of a 2D mesh to a regular
+    grid, stored as a sparse matrix. Built once per mesh and spacing, after
+    which gridding every field at every time step is one sparse product.
+    Grid points outside the elements (e.g. in holes) are NaN.
+    """
+
+    def __init__(self,coords,connect,spacing):
+        """
+        Args:
+            coords (np.ndarray): Nodal coordinates, shape (n nodes, 3). Only x and y are used.
+            connect (dict): Connectivity tables keyed 'connectX', as in SimData.
+            spacing (float): Grid spacing.
+        """
+        xy = np.asarray(coords)[:,:2]
+        self._spacing = spacing
+        self._x = np.arange(xy[:,0].min(),xy[:,0].max()+spacing/2,spacing)
+        self._y = np.arange(xy[:,1].min(),xy[:,1].max()+spacing/2,spacing)
+        nx = self._x.shape[0]
+        ny = self._y.shape[0]
+
+        triangles = _triangles(connect)
+        corners = xy[triangles]
+        # Grid index range of each triangle's bounding box
+        i0 = np.ceil((corners[:,:,0].min(axis=1)-self._x[0])/spacing - 1E-9).astype(np.int64)
+        i1 = np.floor((corners[:,:,0].max(axis=1)-self._x[0])/spacing + 1E-9).astype(np.int64)
+        j0 = np.ceil((corners[:,:,1].min(axis=1)-self._y[0])/spacing - 1E-9).astype(np.int64)
+        j1 = np.floor((corners[:,:,1].max(axis=1)-self._y[0])/spacing + 1E-9).astype(np.int64)
+        n_i = np.maximum(i1-i0+1,0)
+        n_j = np.maximum(j1-j0+1,0)
+        counts = n_i*n_j
+
+        # Every (triangle, candidate grid point) pair
+        tri = np.repeat(np.arange(triangles.shape[0]),counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts)-counts,counts)
+        ix = i0[tri] + local % n_i[tri]
+        iy = j0[tri] + local // n_i[tri]
+
+        a = corners[tri,0]
+        v0 = corners[tri,1] - a
+        v1 = corners[tri,2] - a
+        v2 = np.column_stack((self._x[np.clip(ix,0,nx-1)],self._y[np.clip(iy,0,ny-1)])) - a
+        d00 = np.sum(v0*v0,axis=1)
+        d01 = np.sum(v0*v1,axis=1)
+        d11 = np.sum(v1*v1,axis=1)
+        d20 = np.sum(v2*v0,axis=1)
+        d21 = np.sum(v2*v1,axis=1)
+        denom = d00*d11 - d01*d01
+        with np.errstate(divide='ignore',invalid='ignore'):
+            l1 = (d11*d20 - d01*d21)/denom
+            l2 = (d00*d21 - d01*d20)/denom
+        l0 = 1 - l1 - l2
+        tol = -1E-9
+        inside = ((l0 >= tol) & (l1 >= tol) & (l2 >= tol) & (denom > 0)
+                  & (ix >= 0) & (ix < nx) & (iy >= 0) & (iy < ny))
+
+        # Points on shared edges are found in more than one triangle, keep one
+        point = (iy*nx + ix)[inside]
+        point, first = np.unique(point,return_index=True)
+        keep = np.flatnonzero(inside)[first]
+
+        rows = np.repeat(point,3)
+        cols = triangles[tri[keep]].ravel()
+        weights = np.column_stack((l0[keep],l1[keep],l2[keep])).ravel()
+        self._weights = sparse.csr_matrix((weights,(rows,cols)),shape=(ny*nx,xy.shape[0]))
+        self._mask = np.ones(ny*nx,dtype=bool)
+        self._mask[point] = False
+
+    def get_grid(self):
+        """
+        Returns:
+            tuple: x and y coordinates of the grid.
+        """
+        return self._x, self._y
+
+    def apply(self,values):
+        """Interpolate nodal values onto the grid.
+
+        Args:
+            values (np.ndarray): Nodal values, shape (n nodes,) or (n nodes, n time steps).
+
+        Returns:
+            np.ndarray: Gridded values, shape (ny, nx) or (n time steps, ny, nx).
+        """
+        gridded = self._weights @ np.asarray(values,dtype=float)
+        gridded[self._mask] = np.nan
+        shape = (self._y.shape[0],self._x.shape[0])
+        if gridded.ndim == 1:
+            return gridded.reshape(shape)
+        return np.moveaxis(gridded.reshape(shape+(gridded.shape[1],)),-1,0)
+
+
+def get_interpolation_plan(coords,connect,spacing):
+    """Get the interpolation plan for a mesh, building it only if this
+    process hasn't seen the mesh and spacing before.
+
+    Args:
+        coords (np.ndarray): Nodal coordinates, shape (n nodes, 3).
+        connect (dict): Connectivity tables keyed 'connectX', as in SimData.
+        spacing (float): Grid spacing.
+
+    Returns:
+        InterpolationPlan: The plan.
+    """
+    key = (mesh_fingerprint(coords,connect),float(spacing))
+    if key in _plans:
+        _plans.move_to_end(key)
+        return _plans[key]
+    plan = InterpolationPlan(coords,connect,spacing)
+    _plans[key] = plan
+    if len(_plans) > _max_plans:
+        _plans.popitem(last=False)
+    return plan
+
+
+class GridData():
+    """Fields on a regular grid at a series of time steps.
+    Mirrors the parts of SpatialData used by the objectives: _time and
+    data_sets[i][name].
+    """
+
+    def __init__(self,time,x,y,fields):
+        """
+        Args:
+            time (np.ndarray): Time of each step.
+            x (np.ndarray): Grid x coordinates.
+            y (np.ndarray): Grid y coordinates.
+            fields (dict): Arrays of shape (n time steps, ny, nx) keyed by name.
+        """
+        self._time = np.asarray(time)
+        self._x = x
+        self._y = y
+        self.fields = fields
+
+    @property
+    def data_sets(self):
+        """Fields at each time step, as a list of dicts of (ny, nx) arrays.
+        """
+        return [{name: field[i] for name,field in self.fields.items()} for i in range(self._time.shape[0])]
+
+    def window_differentation(self,data_range='all',window_size=5,dtype=np.float64):
+        """Calculate strains from the displacements as a DIC system would,
+        fitting a plane to the displacements in a window around each point.
+        Adds 'exx', 'eyy' and 'exy' to the fields.
+
+        Args:
+            data_range (str, optional): 'all' time steps or only the 'last'. Defaults to 'all'.
+            window_size (int, optional): Width of the window in grid points. Defaults to 5.
+            dtype (np.dtype, optional): Precision of the strains, np.float32 halves the memory. Defaults to np.float64.
+        """
+        steps = slice(-1,None) if data_range == 'last' else slice(None)
+        spacing = (self._x[1]-self._x[0] if self._x.shape[0] > 1 else 1.,
+                   self._y[1]-self._y[0] if self._y.shape[0] > 1 else 1.)
+        strains = window_strains(self.fields['disp_x'][steps],self.fields['disp_y'][steps],
+                                 window_size,spacing,dtype)
+        for name,strain in strains.items():
+            field = np.full(self.fields['disp_x'].shape,np.nan,dtype=dtype)
+            field[steps] = strain
+            self.fields[name] = field
+
+
+def interpolate_simdata(data,spacing,fields=('disp_x','disp_y')):
+    """Grid nodal variables of a 2D simulation, reusing the interpolation
+    plan of earlier simulations on the same mesh.
+
+    Args:
+        data (SimData): Simulation data with coords, connect and node_vars.
+        spacing (float): Grid spacing.
+        fields (tuple, optional): Nodal variables to grid. Defaults to ('disp_x','disp_y').
+
+    Returns:
+        GridData: Gridded fields at every time step in data.
+    """
+    plan = get_interpolation_plan(data.coords,data.connect,spacing)
+    x, y = plan.get_grid()
+    gridded = {name: plan.apply(np.asarray(data.node_vars[name]).reshape(data.coords.shape[0],-1)) for name in fields}
+    return GridData(data.time,x,y,gridded)
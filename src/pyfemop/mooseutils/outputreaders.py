@@ -1,29 +1,63 @@
 #
 # Moose output readers
 #
-import pandas as pd
+try:
+    import pandas as pd
+except ImportError:
+    pd = None
 from pycoatl.spatialdata.importmoose import moose_to_spatialdata
+from pycoatl.spatialdata.importsimdata import simdata_to_spatialdata
 import os
-
-def output_csv_reader(filename):
+from pyfemop.mooseutils.csvtail import read_last_row, read_last_rows
+from pyfemop.mooseutils.exodusslice import read_exodus, netcdf_lock
+from pyfemop.mooseutils.interpolation import interpolate_simdata
+from pyfemop.mooseutils.dicmapping import compare_to_dic
+
+def _read_csv_last_row(filename,fast=True):
+    if fast:
+        return read_last_row(filename,delimiter=',')
+    if pd is None:
+        raise ImportError('pandas is required when fast=False.')
+    data = pd.read_csv(filename,
+                delimiter=',',
+                header= 0)
+    return data.iloc[-1].to_dict()
+
+def output_csv_reader(filename,fast=True):
     """Outputs a dict of the last row of the csv output. 
 
     Args:   
         filename (str): Path to the file to be read.
+        fast (bool, optional): Only read the header and last line instead of
+            loading the whole file with pandas. Defaults to True.
     """
     try:
-        data = pd.read_csv(filename,
-                    delimiter=',',
-                    header= 0)
-
-        output = data.iloc[-1].to_dict()
+        output = _read_csv_last_row(filename,fast)
     except(FileNotFoundError):
        print('Likely model did not run, setting data as none.')
        output =None
     return output
 
 
-def output_exodus_reader(filename,dic_filter=True,filter_spacing=0.2,dic_data=None,data_range='all',window_size=5):
+def _read_moose_data(filename,fields=None,time_steps='all'):
+    if fields is None and time_steps == 'all':
+        with netcdf_lock:
+            return moose_to_spatialdata(filename)
+    return simdata_to_spatialdata(read_exodus(filename,fields,time_steps))
+
+def _read_grid_data(filename,filter_spacing,data_range,window_size,time_steps='all'):
+    # Only the displacements are needed to grid and differentiate
+    data = read_exodus(filename,['disp_x','disp_y'],time_steps)
+    grid_data = interpolate_simdata(data,filter_spacing)
+    grid_data.window_differentation(data_range,window_size)
+    return grid_data
+
+def _read_dic_comparison(filename,dic_data,time_steps='all',cache_dir=None):
+    data = read_exodus(filename,list(dic_data.fields.keys()),time_steps)
+    return compare_to_dic(data,dic_data,cache_dir)
+
+def output_exodus_reader(filename,dic_filter=True,filter_spacing=0.2,dic_data=None,data_range='all',window_size=5,fields=None,time_steps='all',
+                         interpolation_plan=False,mapping_dir=None):
     """Reads the exodus file into the pyvista data format. 
     Optionally processes to run the DIC filter either on actual data or
     a regularly spaced grid.
@@ -31,23 +65,31 @@ def output_exodus_reader(filename,dic_filter=True,filter_spacing=0.2,dic_data=No
     Args:   
         filename (str): Path to the file to be read.
         dic_filter (): Whether to apply a DIC filter 
+        fields (list, optional): Only read these variables. Defaults to None, reading all of them.
+        time_steps (str, optional): Only read these time steps: 'all', 'last', indices
+            or a (start,end) time window. Defaults to 'all'.
+        interpolation_plan (bool, optional): Grid 2D meshes with a cached sparse interpolation plan,
+            returning GridData, instead of pycoatl's interpolate_to_grid. Defaults to False.
+        dic_data (DICData, optional): Measured data to compare to, returning PointData with residuals. Defaults to None.
+        mapping_dir (Path, optional): Directory to persist the sim to DIC mappings in. Defaults to None.
     """
     if not os.path.exists(filename):
        print('Likely model did not run, setting data as none.')
        return None
     
+    if dic_filter and dic_data is None and interpolation_plan:
+        return _read_grid_data(filename,filter_spacing,data_range,window_size,time_steps)
+    if dic_filter and dic_data is not None:
+        return _read_dic_comparison(filename,dic_data,time_steps,mapping_dir)
+
     # Import Moose Data
-    moose_data = moose_to_spatialdata(filename)
+    moose_data = _read_moose_data(filename,fields,time_steps)
     
     if dic_filter and dic_data is None:
         moose_data_int = moose_data.interpolate_to_grid(filter_spacing)
         moose_data_int.window_differentation(data_range,window_size)
         output = moose_data_int
 
-    elif dic_filter and dic_data is not None:
-        print('Do something using actual DIC data.')
-        # To do later on
-
     else: # Just return the Moose data
         output = moose_data
     
@@ -59,9 +101,16 @@ class OutputCSVReader():
     which will call read() in paralle;.
     """
 
-    def __init__(self):
+    def __init__(self,fast=True,n_threads=8):
+        """
+        Args:
+            fast (bool, optional): Only read the header and last line of each file. Defaults to True.
+            n_threads (int, optional): Number of threads used by read_batch. Defaults to 8.
+        """
         self._data_type = 'csv'
         self._extension = 'csv'
+        self._fast = fast
+        self._n_threads = n_threads
     
     def read(self,filename):
         """Read file
@@ -74,23 +123,44 @@ class OutputCSVReader():
         """
             
         try:
-            data = pd.read_csv(filename,
-                        delimiter=',',
-                        header= 0)
-
-            output = data.iloc[-1].to_dict()
+            output = _read_csv_last_row(filename,self._fast)
         except(FileNotFoundError):
             print('Likely model did not run, setting data as none.')
             output =None
         return output
 
+    def read_batch(self,filenames):
+        """Read many files concurrently.
+
+        Args:
+            filenames (list): Paths of the files to read.
+
+        Returns:
+            list : Dict (or None if the file is missing) per file.
+        """
+        if not self._fast:
+            return [self.read(filename) for filename in filenames]
+        return read_last_rows(filenames,self._n_threads)
+
 class OutputExodusReader():
     """Class to support reading in of exodus files in parallel
     An instance of this class will be passed to the mooseherder 
     which will call read() in parallel.
     """
 
-    def __init__(self,dic_filter=True,filter_spacing=0.2,dic_data=None,data_range='all',window_size=5):
+    def __init__(self,dic_filter=True,filter_spacing=0.2,dic_data=None,data_range='all',window_size=5,fields=None,time_steps='all',
+                 interpolation_plan=False,mapping_dir=None):
+        """
+        Args:
+            fields (list, optional): Only read these variables. Defaults to None, reading all of them.
+            time_steps (str, optional): Only read these time steps: 'all', 'last', indices
+                or a (start,end) time window. Defaults to 'all'.
+            interpolation_plan (bool, optional): Grid 2D meshes with a sparse interpolation plan that is
+                reused for every model on the same mesh, returning GridData. Defaults to False.
+            dic_data (DICData, optional): Measured data to compare to. The simulation is mapped to the
+                DIC points once per mesh and read() returns PointData with residuals. Defaults to None.
+            mapping_dir (Path, optional): Directory to persist the sim to DIC mappings in between runs. Defaults to None.
+        """
         self._data_type = 'exodus'
         self._extension = 'e'
         self._dic_filter = dic_filter
@@ -98,6 +168,10 @@ class OutputExodusReader():
         self._filter_spacing = filter_spacing
         self._dic_data = dic_data
         self._window_size = window_size
+        self._fields = fields
+        self._time_steps = time_steps
+        self._interpolation_plan = interpolation_plan
+        self._mapping_dir = mapping_dir
     
     def read(self,filename):
         """Read file
@@ -113,9 +187,14 @@ class OutputExodusReader():
             print('Likely model did not run, setting data as none.')
             return None
         
+        if self._dic_filter and self._dic_data is None and self._interpolation_plan:
+            return _read_grid_data(filename,self._filter_spacing,self._data_range,self._window_size,self._time_steps)
+        if self._dic_filter and self._dic_data is not None:
+            return _read_dic_comparison(filename,self._dic_data,self._time_steps,self._mapping_dir)
+
         # Import Moose Data
         try:
-            moose_data = moose_to_spatialdata(filename)
+            moose_data = _read_moose_data(filename,self._fields,self._time_steps)
         except(KeyError):
             print('Error reading file. Check Stdout.') # This error is likely due to the mesh containing HEX8 and PRISM6 elements.
             return None
@@ -125,10 +204,6 @@ class OutputExodusReader():
             moose_data_int.window_differentation(self._data_range,self._window_size)
             output = moose_data_int
 
-        elif self._dic_filter and self._dic_data is not None:
-            print('Do something using actual DIC data.')
-            # To do later on
-
         else: # Just return the Moose data
             output = moose_data
         
@@ -0,0 +1,82 @@
+#
+# DIC style strain calculation from gridded displacement fields.
+#
+import numpy as np
+from scipy.ndimage import correlate1d
+
+
+def _window_sum(a,kernel_x,kernel_y):
+    """Sum a over the window around each grid point, weighted by the
+    separable kernel kernel_y(row offset)*kernel_x(column offset).
+    """
+    a = correlate1d(a,kernel_x,axis=-1,mode='constant',cval=0.)
+    return correlate1d(a,kernel_y,axis=-2,mode='constant',cval=0.)
+
+def window_gradient(u,window_size,spacing=(1.,1.),dtype=np.float64):
+    """Least squares plane fit gradient over a square window around every
+    grid point, for a whole stack of time steps at once. The fit's moment
+    sums are separable, so each is two 1D correlations over the stack.
+    NaNs (e.g. holes) are left out of the fits. Points that are NaN, or have
+    fewer than 3 values or a degenerate fit in their window, are NaN.
+
+    Args:
+        u (np.ndarray): Field, shape (ny, nx) or (n time steps, ny, nx).
+        window_size (int): Width of the window in grid points.
+        spacing (tuple, optional): Grid spacing in x and y. Defaults to (1.,1.).
+        dtype (np.dtype, optional): Working precision, np.float32 halves the memory. Defaults to np.float64.
+
+    Returns:
+        tuple: du/dx and du/dy, same shape as u.
+    """
+    u = np.asarray(u,dtype=dtype)
+    valid = ~np.isnan(u)
+    w = valid.astype(dtype)
+    u0 = np.where(valid,u,0).astype(dtype)
+
+    k = (np.arange(window_size) - window_size//2).astype(dtype)
+    ones = np.ones(window_size,dtype=dtype)
+
+    # Window moments, offsets in grid points relative to the centre point
+    n = _window_sum(w,ones,ones)
+    sx = _window_sum(w,k,ones)
+    sy = _window_sum(w,ones,k)
+    sxx = _window_sum(w,k*k,ones)
+    syy = _window_sum(w,ones,k*k)
+    sxy = _window_sum(w,k,k)
+    su = _window_sum(u0,ones,ones)
+    sxu = _window_sum(u0,k,ones)
+    syu = _window_sum(u0,ones,k)
+
+    with np.errstate(divide='ignore',invalid='ignore'):
+        # Centre the moments on the window mean
+        cxx = sxx - sx*sx/n
+        cyy = syy - sy*sy/n
+        cxy = sxy - sx*sy/n
+        cxu = sxu - sx*su/n
+        cyu = syu - sy*su/n
+        det = cxx*cyy - cxy*cxy
+        du_dx = (cyy*cxu - cxy*cyu)/det/dtype(spacing[0])
+        du_dy = (cxx*cyu - cxy*cxu)/det/dtype(spacing[1])
+
+    bad = (n < 3) | ~valid | ~(np.abs(det) > 1E-6*np.abs(cxx*cyy))
+    du_dx[bad] = np.nan
+    du_dy[bad] = np.nan
+    return du_dx, du_dy
+
+def window_strains(disp_x,disp_y,window_size,spacing=(1.,1.),dtype=np.float64):
+    """Small strains from gridded displacements by windowed least squares,
+    as a DIC system would calculate them.
+
+    Args:
+        disp_x (np.ndarray): x displacement, shape (ny, nx) or (n time steps, ny, nx).
+        disp_y (np.ndarray): y displacement, same shape as disp_x.
+        window_size (int): Width of the window in grid points.
+        spacing (tuple, optional): Grid spacing in x and y. Defaults to (1.,1.).
+        dtype (np.dtype, optional): Working precision, np.float32 halves the memory. Defaults to np.float64.
+
+    Returns:
+        dict: 'exx', 'eyy' and 'exy' arrays, same shape as the displacements.
+    """
+    du_dx, du_dy = window_gradient(disp_x,window_size,spacing,dtype)
+    dv_dx, dv_dy = window_gradient(disp_y,window_size,spacing,dtype)
+    return {'exx':du_dx,'eyy':dv_dy,'exy':0.5*(du_dy + dv_dx)}
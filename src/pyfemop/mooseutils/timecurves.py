@@ -0,0 +1,74 @@
+#
+# Time to strain limit curves, e.g. for creep, from field histories.
+#
+import numpy as np
+
+
+def stack_field(data,name):
+    """Stack a field over every time step into one array.
+
+    Args:
+        data (SpatialData/GridData/PointData): Data with data_sets.
+        name (str): Field name, e.g. 'mechanical_strain_yy'.
+
+    Returns:
+        np.ndarray: Field, shape (n time steps, n points).
+    """
+    return np.stack([np.asarray(data_set[name],dtype=float).reshape(-1) for data_set in data.data_sets])
+
+def time_to_limit(time,strain,stress,limit):
+    """Time and stress at which each point first exceeds a strain limit,
+    linearly interpolated between the last step under the limit and the
+    first step over it. All points are handled in one pass.
+
+    Args:
+        time (np.ndarray): Time of each step, shape (n time steps,).
+        strain (np.ndarray): Strain history, shape (n time steps, n points).
+        stress (np.ndarray): Stress history, shape (n time steps, n points).
+        limit (float): Strain limit.
+
+    Returns:
+        tuple: Time to the limit and stress at the limit, shape (n points,).
+            NaN where a point never exceeds the limit or is over it from the first step.
+    """
+    time = np.asarray(time,dtype=float)
+    strain = np.asarray(strain,dtype=float)
+    stress = np.asarray(stress,dtype=float)
+
+    over = strain > limit
+    first = np.argmax(over,axis=0)
+    crossed = np.any(over,axis=0) & (first > 0)
+
+    # Steps either side of the crossing, the crossing itself at step 0 is invalid
+    after = np.where(crossed,first,1)
+    before = after - 1
+    points = np.arange(strain.shape[1])
+    e0 = strain[before,points]
+    e1 = strain[after,points]
+    with np.errstate(divide='ignore',invalid='ignore'):
+        w = (limit - e0)/(e1 - e0)
+    times = time[before] + w*(time[after] - time[before])
+    stresses = stress[before,points] + w*(stress[after,points] - stress[before,points])
+
+    times[~crossed] = np.nan
+    stresses[~crossed] = np.nan
+    return times, stresses
+
+def curve_area(times,stresses):
+    """Area under the stress against time to limit curve, by the trapezium
+    rule over the points sorted by time. NaN points are left out.
+
+    Args:
+        times (np.ndarray): Time to the limit of each point.
+        stresses (np.ndarray): Stress at the limit of each point.
+
+    Returns:
+        float: Area, 0 if fewer than 2 points reached the limit.
+    """
+    valid = ~np.isnan(times) & ~np.isnan(stresses)
+    order = np.argsort(times[valid])
+    t = times[valid][order]
+    s = stresses[valid][order]
+    if t.shape[0] < 2:
+        return 0.
+    return float(np.sum(0.5*(s[1:] + s[:-1])*np.diff(t)))
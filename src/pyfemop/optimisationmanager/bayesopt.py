@@ -0,0 +1,199 @@
+#
+# Batch Bayesian optimisation as a pymoo algorithm, for expensive simulations.
+#
+import numpy as np
+from pymoo.core.algorithm import Algorithm
+from pymoo.core.population import Population
+from scipy.spatial import cKDTree
+from scipy.special import erfc, ndtr
+
+from pyfemop.optimisationmanager.surrogate import GaussianProcess
+
+
+def expected_improvement(mean,std,best):
+    """Expected improvement below the best value, for minimisation.
+
+    Args:
+        mean (np.ndarray): Predicted mean.
+        std (np.ndarray): Predicted standard deviation.
+        best (float): Best value found so far.
+
+    Returns:
+        np.ndarray: Expected improvement.
+    """
+    improvement = best - mean
+    with np.errstate(divide='ignore',invalid='ignore'):
+        z = improvement/std
+        ei = improvement*ndtr(z) + std*np.exp(-0.5*z**2)/np.sqrt(2*np.pi)
+    return np.where(std > 0,ei,np.maximum(improvement,0.))
+
+def parego_scalarise(F,weights,rho=0.05):
+    """ParEGO augmented Tchebycheff scalarisation of normalised objectives.
+
+    Args:
+        F (np.ndarray): Objectives normalised to [0,1], shape (n points, n objectives).
+        weights (np.ndarray): Weight of each objective, summing to 1.
+        rho (float, optional): Weight of the augmenting sum. Defaults to 0.05.
+
+    Returns:
+        np.ndarray: Scalar value of each point.
+    """
+    weighted = F*weights
+    return weighted.max(axis=1) + rho*weighted.sum(axis=1)
+
+
+class BatchBayesianOptimisation(Algorithm):
+    """Batch Bayesian optimisation. A Gaussian process is fitted to every
+    candidate evaluated so far and each iteration proposes a batch of
+    batch_size candidates, maximising expected improvement with local
+    penalisation: once a point is chosen, the acquisition is damped around
+    it by how far the model's Lipschitz constant says the optimum could be,
+    so the batch spreads over different promising regions. Multiple
+    objectives are scalarised ParEGO style with new random weights each
+    iteration. The acquisition is maximised over a random and local
+    candidate pool in a few vectorised model evaluations.
+
+    Drops into MooseOptimisationRun like GA, the batch size defaults to the
+    herd's number of parallel simulations.
+    """
+
+    def __init__(self,batch_size=None,n_initial=None,n_candidates=2000,max_fit=1000,penalty=1E6,model=None,**kwargs):
+        """
+        Args:
+            batch_size (int, optional): Candidates per iteration. Defaults to None, set from the herd
+                by MooseOptimisationRun, otherwise 4.
+            n_initial (int, optional): Size of the initial latin hypercube. Defaults to None, the larger
+                of the batch size and 2*n_var+2.
+            n_candidates (int, optional): Size of the random candidate pool the acquisition is maximised over. Defaults to 2000.
+            max_fit (int, optional): Largest number of evaluated points the model is fitted to, the best are kept. Defaults to 1000.
+            penalty (float, optional): Objectives at or above this are failed runs. Defaults to 1E6.
+            model (GaussianProcess, optional): Surrogate model. Defaults to None, a GaussianProcess.
+        """
+        super().__init__(**kwargs)
+        if model is None:
+            model = GaussianProcess()
+        self._batch_size = batch_size
+        self._n_initial = n_initial
+        self._n_candidates = n_candidates
+        self._max_fit = max_fit
+        self._penalty = penalty
+        self._model = model
+
+    def set_batch_size(self,batch_size):
+        """Set the candidates per iteration, if they weren't given. Called
+        by MooseOptimisationRun with the herd's number of parallel simulations.
+
+        Args:
+            batch_size (int): Candidates per iteration.
+        """
+        if self._batch_size is None:
+            self._batch_size = batch_size
+
+    @property
+    def pop_size(self):
+        """Candidates per iteration, as the status printouts expect of pymoo algorithms.
+        """
+        return self._batch_size
+
+    def _setup(self,problem,**kwargs):
+        if self._batch_size is None:
+            self._batch_size = 4
+        if self._n_initial is None:
+            self._n_initial = max(self._batch_size,2*problem.n_var+2)
+
+    def _scale(self,X):
+        return (X - self.problem.xl)/(self.problem.xu - self.problem.xl)
+
+    def _unscale(self,U):
+        return self.problem.xl + U*(self.problem.xu - self.problem.xl)
+
+    def _initialize_infill(self):
+        n = self._n_initial
+        d = self.problem.n_var
+        # Latin hypercube, one random permutation of the strata per variable
+        strata = np.argsort(self.random_state.random((n,d)),axis=0)
+        U = (strata + self.random_state.random((n,d)))/n
+        return Population.new('X',self._unscale(U))
+
+    def _initialize_advance(self,infills=None,**kwargs):
+        self.pop = infills
+
+    def _advance(self,infills=None,**kwargs):
+        self.pop = Population.merge(self.pop,infills)
+
+    def get_targets(self):
+        """Scalar values the model is fitted to, for minimisation.
+        Failed or infeasible points are given the worst successful value.
+
+        Returns:
+            tuple: Scaled parameters and target of every evaluated point.
+        """
+        X = self._scale(self.pop.get('X'))
+        F = self.pop.get('F')
+        CV = self.pop.get('CV')
+        ok = np.all(np.isfinite(F),axis=1) & np.all(F < self._penalty,axis=1)
+        if CV is not None and CV.size:
+            ok &= CV[:,0] <= 0
+        if not np.any(ok):
+            return X, np.zeros(X.shape[0])
+
+        if F.shape[1] == 1:
+            y = F[:,0].copy()
+        else:
+            ideal = F[ok].min(axis=0)
+            span = F[ok].max(axis=0) - ideal
+            span[span == 0] = 1.
+            weights = self.random_state.dirichlet(np.ones(F.shape[1]))
+            y = parego_scalarise((F - ideal)/span,weights)
+        y[~ok] = y[ok].max()
+        return X, y
+
+    def _candidate_pool(self,X,y):
+        d = X.shape[1]
+        pool = [self.random_state.random((self._n_candidates,d))]
+        # Local samples around the best points so far
+        best = X[np.argsort(y)[:5]]
+        for scale in (0.1,0.02):
+            local = np.repeat(best,self._n_candidates//10,axis=0)
+            pool.append(local + scale*self.random_state.standard_normal(local.shape))
+        return np.clip(np.vstack(pool),0.,1.)
+
+    def _lipschitz(self,pool):
+        # Largest gradient norm of the model mean over a sample of the pool
+        sample = pool[:min(500,pool.shape[0])]
+        h = 1E-4
+        base = self._model.predict(sample)[0][:,0]
+        gradient = np.empty(sample.shape)
+        for j in range(sample.shape[1]):
+            step = sample.copy()
+            step[:,j] += h
+            gradient[:,j] = (self._model.predict(step)[0][:,0] - base)/h
+        return max(float(np.max(np.linalg.norm(gradient,axis=1))),1E-7)
+
+    def _infill(self):
+        X, y = self.get_targets()
+        if X.shape[0] > self._max_fit:
+            keep = np.argsort(y)[:self._max_fit]
+            X, y = X[keep], y[keep]
+        self._model.fit(X,y[:,None])
+
+        pool = self._candidate_pool(X,y)
+        mean, std = self._model.predict(pool)
+        mean, std = mean[:,0], std[:,0]
+        acquisition = expected_improvement(mean,std,y.min())
+        # Points already evaluated can't be proposed again
+        nearest = cKDTree(X).query(pool)[0]
+        acquisition[nearest < 1E-6] = -np.inf
+
+        lipschitz = self._lipschitz(pool)
+        chosen = []
+        for k in range(self._batch_size):
+            i = int(np.argmax(acquisition))
+            chosen.append(i)
+            # Local penalisation around the chosen point
+            r = np.linalg.norm(pool - pool[i],axis=1)
+            s = max(std[i],1E-12)
+            z = (lipschitz*r + y.min() - mean[i])/(np.sqrt(2)*s)
+            acquisition = acquisition*0.5*erfc(-z)
+            acquisition[i] = -np.inf
+        return Population.new('X',self._unscale(pool[chosen]))
@@ -2,11 +2,163 @@
 # Some methods for reading in an building cost functions. 
 #
 import multiprocessing as mp
+from multiprocessing.pool import ThreadPool
+from functools import partial
+import os
+import threading
 import numpy as np
+from mooseherder import ExodusReader
+from pyfemop.optimisationmanager.sharedarrays import SharedArrayStore
+from pyfemop.optimisationmanager.sharedarrays import attach
+from pyfemop.mooseutils.timecurves import stack_field, time_to_limit, curve_area
+from pyfemop.mooseutils.exodusslice import netcdf_lock
+
+# Cost function held by each process pool worker, set by the pool initializer.
+_worker_cost_function = None
+
+# Derived quantities of the simulation being evaluated, one memo per thread.
+_memo = threading.local()
+
+def memoise(key,function,*args):
+    """Calculate a derived quantity once per evaluation. Inside
+    CostFunction.evaluate every objective and constraint asking for the same key
+    gets the value calculated by the first, outside it the value is just calculated.
+
+    Args:
+        key (hashable): Identifies the quantity, e.g. ('equiv_strain',id(data)).
+        function (function): Calculates the quantity from args.
+
+    Returns:
+        object: The quantity.
+    """
+    cache = getattr(_memo,'cache',None)
+    if cache is None:
+        return function(*args)
+    if key not in cache:
+        cache[key] = function(*args)
+    return cache[key]
+
+def batch_objective(function):
+    """Mark an objective or constraint as a batch function. Batch functions
+    take the columns of stack_scalar_data for the whole population, with
+    the endtime and external data, and return one value per candidate.
+    CostFunction calls them once per population instead of once per simulation.
+
+    Args:
+        function (function): Function of (columns,endtime,external_data).
+
+    Returns:
+        function: The same function.
+    """
+    function.batch = True
+    return function
+
+def _is_batch(function):
+    return getattr(function,'batch',False)
+
+def stack_scalar_data(data_list,names=None):
+    """Stack the scalar outputs (e.g. the last row of the postprocessor csv)
+    of every candidate into one array per name.
+    Missing simulations, missing names and non-numeric values are NaN.
+
+    Args:
+        data_list (list): Dict (or None if the model didn't run) per candidate.
+        names (list, optional): Names to stack. Defaults to None, every name found.
+
+    Returns:
+        dict: Arrays of shape (n candidates,) keyed by name.
+    """
+    if names is None:
+        names = []
+        for data in data_list:
+            if data is not None:
+                names += [name for name in data if name not in names]
+    columns = dict()
+    for name in names:
+        column = np.full(len(data_list),np.nan)
+        for i,data in enumerate(data_list):
+            if data is None:
+                continue
+            try:
+                column[i] = data.get(name,np.nan)
+            except (TypeError,ValueError):
+                pass
+        columns[name] = column
+    return columns
+
+def completed(columns,endtime):
+    """Mask of the candidates whose simulation reached the endtime.
+
+    Args:
+        columns (dict): Stacked outputs, with 'time'.
+        endtime (float): Endtime of the simulation, None to only check the model ran.
+
+    Returns:
+        np.ndarray: True where the simulation completed.
+    """
+    time = np.asarray(columns.get('time',np.nan),dtype=float)
+    if endtime is None:
+        return np.isfinite(time)
+    return np.isclose(time,endtime,rtol=1E-9,atol=0.)
+
+def penalise_failed(cost,columns,endtime,penalty=1E6):
+    """Replace the cost of candidates that didn't complete, or whose cost
+    couldn't be calculated, with the penalty.
+
+    Args:
+        cost (np.ndarray): Cost of each candidate.
+        columns (dict): Stacked outputs, with 'time'.
+        endtime (float): Endtime of the simulation.
+        penalty (float, optional): Cost of a failed candidate. Defaults to 1E6.
+
+    Returns:
+        np.ndarray: Costs.
+    """
+    cost = np.asarray(cost,dtype=float)
+    failed = ~completed(columns,endtime) | ~np.isfinite(cost)
+    return np.where(failed,penalty,cost)
+
+def _init_worker(cost_function):
+    global _worker_cost_function
+    _worker_cost_function = cost_function
+
+def _get_cost_function(cost_function,endtime):
+    if cost_function is None:
+        cost_function = _worker_cost_function
+        # The worker's copy was made when the pool started, follow the caller's endtime
+        cost_function._endtime = endtime
+    return cost_function
+
+def _evaluate_indexed(item,cost_function=None,endtime=None):
+    """Evaluate one (index, data) pair, using the worker's cost function
+    unless one is given.
+    """
+    cost_function = _get_cost_function(cost_function,endtime)
+    i, data = item
+    if cost_function._shared_memory:
+        data = attach(data)
+    return i, cost_function.evaluate(data)
+
+def _evaluate_output(output_files,loader=None,cost_function=None,endtime=None):
+    cost_function = _get_cost_function(cost_function,endtime)
+    return cost_function.evaluate_output(output_files,loader)
+
+def _read_output_indexed(item,loader=None,cost_function=None,endtime=None):
+    cost_function = _get_cost_function(cost_function,endtime)
+    i, output_files = item
+    data = cost_function.read_outputs(output_files)
+    if loader is not None:
+        data = loader(data)
+    return i, cost_function.read_data(data)
+
+def _evaluate_output_indexed(item,loader=None,cost_function=None,endtime=None):
+    i, output_files = item
+    return i, _evaluate_output(output_files,loader,cost_function,endtime)
 
 class CostFunction():
 
-    def __init__(self,reader,objective_functions,endtime,external_data = None,ineq_constraints=None,eq_constraints=None):
+    def __init__(self,reader,objective_functions,endtime,external_data = None,ineq_constraints=None,eq_constraints=None,
+                 n_workers=None,backend='process',chunksize=1,shared_memory=False,selection=None,batch=False):
         """Cost functions to be evaluated. 
         Now will run on .exodus output only. 
 
@@ -19,6 +171,19 @@ class CostFunction():
             dic_data (SpatialData, optional): Dic data to use in costfunction maybe. Defaults to None.
             ineq_constraints (list of functions, optional): Functions describing inequality constraints. Defaults to None.
             eq_constraints (list of functions, optional): Functions describing equality constraints. Defaults to None.
+            n_workers (int, optional): Size of the worker pool used by evaluate_parallel. Defaults to None, the number of cpus.
+            backend (str, optional): 'process' or 'thread' worker pool. Defaults to 'process'.
+                netCDF4 is not thread safe, so on the thread backend exodus reads
+                (read_sim_outputs, submit_output and the fused and streamed paths)
+                are serialised through netcdf_lock and only the scoring runs side by side.
+            chunksize (int, optional): Number of simulations sent to a worker at a time. Defaults to 1.
+            shared_memory (bool, optional): Publish the arrays in the data to process workers through shared
+                memory instead of pickling them into every worker. Defaults to False.
+            selection (ExodusSelection, optional): Fields and time steps read from the outputs when the
+                cost function reads them itself. Defaults to None, reading everything.
+            batch (bool, optional): Evaluate a whole population at once with evaluate_batch.
+                The data is read on the worker pool, then every function marked with
+                batch_objective is called once for the population. Defaults to False.
         """          
         #self._data = data
         self._reader = reader
@@ -26,6 +191,10 @@ class CostFunction():
         self._ineq_constraints = ineq_constraints
         self._eq_constraints = eq_constraints
         self._n_obj = len(self._objective_functions)
+        if ineq_constraints is None:
+            self._ineq_constraints = []
+        if eq_constraints is None:
+            self._eq_constraints = []
         if ineq_constraints is not None:
             self.n_ieq_constraints = len(ineq_constraints)
         else: 
@@ -38,50 +207,371 @@ class CostFunction():
         self._endtime = endtime
         self.external_data = external_data
 
+        if backend not in ('process','thread'):
+            raise ValueError('Unknown backend: {}'.format(backend))
+        if n_workers is None:
+            n_workers = os.cpu_count() or 1
+        self._n_workers = n_workers
+        self._backend = backend
+        self._chunksize = chunksize
+        self._shared_memory = shared_memory
+        self._selection = selection
+        self._batch = batch
+        self._pool = None
+
+    def __getstate__(self):
+        # The pool can't be pickled, workers and backups get a copy without it.
+        state = self.__dict__.copy()
+        state['_pool'] = None
+        return state
+
+    def get_pool(self):
+        """Get the worker pool, starting it on first use. The pool is kept
+        between generations until shutdown() is called. Process workers get a
+        copy of the cost function when the pool starts.
+
+        Returns:
+            Pool: The worker pool.
+        """
+        if self._pool is None:
+            if self._backend == 'thread':
+                self._pool = ThreadPool(self._n_workers)
+            else:
+                self._pool = mp.Pool(self._n_workers,initializer=_init_worker,initargs=(self,))
+        return self._pool
+
+    def _worker_self(self):
+        # Thread workers share this instance, process workers hold their own copy.
+        if self._backend == 'thread':
+            return self
+        return None
+
+    def shutdown(self):
+        """Close the worker pool and wait for the workers to exit.
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def read_data(self,simdata):
+        """Apply the reader to the simulation data.
+
+        Args:
+            simdata (list): SimData (or None) for each output.
+
+        Returns:
+            object: Data in the format the objectives expect.
+        """
+        # Should retain reasonably generic function
+        if self._reader is not None:
+            return self._reader(simdata)
+        return simdata
+
+    def get_endtime(self):
+        """
+        Returns:
+            float: Endtime of the simulation.
+        """
+        return self._endtime
+
+    def set_endtime(self,endtime):
+        """Change the endtime, e.g. for a shorter low fidelity run. Pool
+        workers are sent the endtime with every task, so they follow it.
+
+        Args:
+            endtime (float): Endtime of the simulation.
+        """
+        self._endtime = endtime
+
+    @property
+    def n_obj(self):
+        """Number of objectives.
+        """
+        return self._n_obj
+
+    def _evaluate(self,simdata,constraints):
+        _memo.cache = dict()
+        try:
+            data = self.read_data(simdata)
+            f= []
+            for function in self._objective_functions:
+                f.append(self._call(function,data))
+            if constraints:
+                f += self.evaluate_constraints(data)
+        finally:
+            _memo.cache = None
+        return f
+
+    def _call(self,function,data):
+        if _is_batch(function):
+            return float(np.atleast_1d(function(stack_scalar_data([data]),self._endtime,self.external_data))[0])
+        return function(data,self._endtime,self.external_data)
+
+    def evaluate_batch(self,data_list):
+        """Calculate the objectives and constraints for a whole population of read data.
+        Batch functions are called once on the stacked columns, any others once per candidate.
+
+        Args:
+            data_list (list): Data for each candidate, as returned by read_data.
+
+        Returns:
+            np.ndarray: Results, shape (n candidates, n objectives + n constraints), see split_results.
+        """
+        functions = list(self._objective_functions) + list(self._ineq_constraints) + list(self._eq_constraints)
+        results = np.empty((len(data_list),len(functions)))
+        columns = None
+        for j,function in enumerate(functions):
+            if _is_batch(function):
+                if columns is None:
+                    columns = stack_scalar_data(data_list)
+                results[:,j] = function(columns,self._endtime,self.external_data)
+            else:
+                for i,data in enumerate(data_list):
+                    results[i,j] = function(data,self._endtime,self.external_data)
+        return results
+
     def evaluate_objectives(self,simdata):
-        """Calculate the cost of each function, to pass back to pymoo
+        """Calculate the cost of each function, to pass back to pymoo.
+        The data is read once and shared by every function, as are any
+        quantities the functions calculate through memoise().
         
         Returns:
             list: Costs for each function 
         """
-        f= []
-        for function in self._objective_functions:
-            # Should retain reasonably generic function
-            if self._reader is not None:
-                data = self._reader(simdata)
-            else:
-                data = simdata
-            f.append(function(data,self._endtime,self.external_data))
-        return f
+        return self._evaluate(simdata,False)
+
+    def evaluate(self,simdata):
+        """Calculate the objectives and constraints in one pass over the data.
+        Use split_results to separate them.
+
+        Returns:
+            list: Costs for each function, then inequality and equality constraint values.
+        """
+        return self._evaluate(simdata,True)
+
+    def split_results(self,results):
+        """Split the results of evaluate for a set of simulations into the arrays pymoo expects.
+
+        Args:
+            results (np.ndarray): Results of evaluate, one row per simulation.
+
+        Returns:
+            tuple: F, G and H arrays. G and H are None if there are no constraints of that type.
+        """
+        results = np.asarray(results,dtype=float).reshape(-1,self._n_obj+self.n_ieq_constraints+self.n_eq_constraints)
+        F = results[:,:self._n_obj]
+        G = results[:,self._n_obj:self._n_obj+self.n_ieq_constraints]
+        H = results[:,self._n_obj+self.n_ieq_constraints:]
+        return F, (G if self.n_ieq_constraints else None), (H if self.n_eq_constraints else None)
+    
+    def read_outputs(self,output_files):
+        """Read the outputs of one simulation chain, only the selected fields and time steps if set.
+
+        Args:
+            output_files (list): Output paths of the simulation chain, None where there is no output.
+
+        Returns:
+            list: SimData (or None) for each output.
+        """
+        return read_sim_outputs(output_files,selection=self._selection)
+
+    def evaluate_output(self,output_files,loader=None):
+        """Read the outputs of one simulation chain and calculate the cost.
+        Lets the output be read on the same worker that scores it.
+
+        Args:
+            output_files (list): Output paths of the simulation chain, None where there is no output.
+            loader (function, optional): Applied to the list of SimData before the objectives,
+                e.g. to convert or filter the data. Defaults to None.
+
+        Returns:
+            list: Costs for each function
+        """
+        data = self.read_outputs(output_files)
+        if loader is not None:
+            data = loader(data)
+        return self.evaluate(data)
     
     def evaluate_constraints(self,data):
-        """Calculate the cost of each function, to pass back to pymoo
-        
+        """Calculate the constraints, to pass back to pymoo.
+        Inequality constraints are satisfied when <= 0, equality constraints when == 0.
+
+        Args:
+            data (object): Data as returned by read_data.
+
         Returns:
-            list: Costs for each function 
+            list: Inequality constraint values, then equality constraint values.
         """
         g= []
-        for function in self._constraints:
-            g.append(function(data,self._endtime))
+        for function in list(self._ineq_constraints) + list(self._eq_constraints):
+            g.append(self._call(function,data))
         return g
     
     def evaluate_parallel(self,data_list):
-        #Evaluate all objectives and constraints in parallel.
-        n_threads = len(data_list)
-
-        with mp.Pool(n_threads) as pool:
-            processes = []
-            for data in data_list:
-                processes.append(pool.apply_async(self.evaluate_objectives, (data,))) # tuple is important, otherwise it unpacks strings for some reason
-            f_list=[pp.get() for pp in processes]
-        
+        """Evaluate the objectives for every simulation on the worker pool.
+
+        Args:
+            data_list (list): Data for each simulation.
+
+        Returns:
+            list: Costs (and constraint values) for each simulation, in the order of data_list.
+        """
+        if self._batch:
+            return list(self.evaluate_batch([self.read_data(data) for data in data_list]))
+
+        pool = self.get_pool()
+        evaluate = partial(_evaluate_indexed,cost_function=self._worker_self(),endtime=self._endtime)
+
+        store = None
+        if self._shared_memory and self._backend == 'process':
+            # Workers only receive handles, the arrays are copied once here.
+            store = SharedArrayStore()
+            data_list = store.publish(data_list)
+
+        f_list = [None]*len(data_list)
+        try:
+            for i,f in pool.imap_unordered(evaluate,enumerate(data_list),chunksize=self._chunksize):
+                f_list[i] = f
+        finally:
+            if store is not None:
+                store.close()
         return f_list
 
+    def evaluate_outputs_parallel(self,output_files_list,loader=None):
+        """Read and score every simulation on the worker pool. Workers are
+        only sent the output paths and only send back the costs, so the
+        field data never passes through this process.
+
+        Args:
+            output_files_list (list): Output paths of each simulation chain, as returned by herd.run_para.
+            loader (function, optional): Picklable function applied to the SimData in the worker
+                before the objectives. Defaults to None.
+
+        Returns:
+            list: Costs (and constraint values) for each simulation, in the order of output_files_list.
+        """
+        pool = self.get_pool()
+        if self._batch:
+            # Only the read data (e.g. the last csv row) comes back, the population is scored here at once
+            read = partial(_read_output_indexed,loader=loader,cost_function=self._worker_self(),endtime=self._endtime)
+            data_list = [None]*len(output_files_list)
+            for i,data in pool.imap_unordered(read,enumerate(output_files_list),chunksize=self._chunksize):
+                data_list[i] = data
+            return list(self.evaluate_batch(data_list))
+
+        evaluate = partial(_evaluate_output_indexed,loader=loader,cost_function=self._worker_self(),endtime=self._endtime)
+        f_list = [None]*len(output_files_list)
+        for i,f in pool.imap_unordered(evaluate,enumerate(output_files_list),chunksize=self._chunksize):
+            f_list[i] = f
+        return f_list
+
+    def submit_output(self,output_files,loader=None):
+        """Read and score the outputs of one simulation chain on the worker pool.
+
+        Args:
+            output_files (list): Output paths of the simulation chain.
+            loader (function, optional): Applied to the SimData before the objectives. Defaults to None.
+
+        Returns:
+            AsyncResult: Result, get() returns the costs.
+        """
+        return self.get_pool().apply_async(_evaluate_output,(output_files,loader,self._worker_self(),self._endtime))
+
+
+def read_sim_outputs(output_files,read_config=None,selection=None):
+    """Read the outputs of one simulation chain, as SweepReader.read_results_once.
+    Exodus files are read under netcdf_lock, so thread workers read one at a time.
+
+    Args:
+        output_files (list): Output paths, None where a runner has no output.
+        read_config (SimReadConfig, optional): Variables to read. Defaults to None, reading everything.
+        selection (ExodusSelection, optional): Fields and time steps to read, takes precedence
+            over read_config. Defaults to None.
+
+    Returns:
+        list: SimData (or None) for each output.
+    """
+    data_list = []
+    for output_file in output_files:
+        if output_file is None:
+            data_list.append(None)
+            continue
+        if selection is not None:
+            data_list.append(selection.read(output_file))
+            continue
+        with netcdf_lock:
+            reader = ExodusReader(output_file)
+            try:
+                if read_config is None:
+                    data_list.append(reader.read_all_sim_data())
+                else:
+                    data_list.append(reader.read_sim_data(read_config))
+            finally:
+                # The reader never closes its dataset, left to the garbage
+                # collector it would be closed outside the lock, on any thread.
+                reader._data.close()
+    return data_list
+
+
+def final_field(data,name):
+    """Field at the last time step as an array, shared by the objectives of an evaluation.
+
+    Args:
+        data (SpatialData/GridData): Data with data_sets.
+        name (str): Field name, e.g. 'eyy'.
+
+    Returns:
+        np.ndarray: The field.
+    """
+    return memoise(('final_field',name,id(data)),lambda: np.array(data.data_sets[-1][name]))
+
+def equivalent_strain(data):
+    """Von Mises equivalent of the in-plane strains at the last time step,
+    shared by the objectives of an evaluation.
+
+    Args:
+        data (SpatialData/GridData): Data with 'exx', 'eyy' and 'exy' fields.
+
+    Returns:
+        np.ndarray: Equivalent strain.
+    """
+    def calculate():
+        exx = final_field(data,'exx')
+        eyy = final_field(data,'eyy')
+        exy = final_field(data,'exy')
+        return np.sqrt(2/3*(exx**2 + eyy**2 + 2*exy**2))
+    return memoise(('equivalent_strain',id(data)),calculate)
+
+def global_curve(data,name):
+    """Time history of a global variable (postprocessor), shared by the objectives of an evaluation.
+
+    Args:
+        data (SimData): Simulation data with glob_vars.
+        name (str): Global variable name, e.g. 'max_stress'.
+
+    Returns:
+        tuple: Time and values as arrays.
+    """
+    return memoise(('global_curve',name,id(data)),lambda: (np.asarray(data.time),np.asarray(data.glob_vars[name])))
+
+def field_history(data,name):
+    """Field at every time step as one array, shared by the objectives of an evaluation.
+
+    Args:
+        data (SpatialData/GridData/PointData): Data with data_sets.
+        name (str): Field name, e.g. 'mechanical_strain_yy'.
+
+    Returns:
+        np.ndarray: Field, shape (n time steps, n points).
+    """
+    return memoise(('field_history',name,id(data)),stack_field,data,name)
+
 
 class ObjectiveFunctionBase():
     """Base class for cost function.
     """
-    def calculate(data,endtime):
+    def calculate(self,data,endtime):
         """To be overwritten, calculates cost function
 
         Args:
@@ -94,6 +584,45 @@ class ObjectiveFunctionBase():
 
         return None
 
+    def __call__(self,data,endtime,external_data=None):
+        return self.calculate(data,endtime)
+
+
+class TimeToLimitArea(ObjectiveFunctionBase):
+    """Maximise the area under the curve of stress against time to a strain
+    limit (e.g. a creep limit), taken over every point of the model.
+    """
+
+    def __init__(self,limit,field='mechanical_strain_yy',stress_field='stress_yy'):
+        """
+        Args:
+            limit (float): Strain limit.
+            field (str, optional): Strain field. Defaults to 'mechanical_strain_yy'.
+            stress_field (str, optional): Stress field. Defaults to 'stress_yy'.
+        """
+        self._limit = limit
+        self._field = field
+        self._stress_field = stress_field
+
+    def curve(self,data):
+        """Time to the limit and stress at the limit of every point.
+
+        Args:
+            data (SpatialData/GridData/PointData): Data with the strain and stress fields.
+
+        Returns:
+            tuple: Times and stresses, NaN where the limit isn't crossed.
+        """
+        return time_to_limit(data._time,field_history(data,self._field),
+                             field_history(data,self._stress_field),self._limit)
+
+    def calculate(self,data,endtime):
+        if data is None:
+            return 1E6
+        if int(data._time[-1]) != endtime:
+            return 1E6
+        return -1*curve_area(*self.curve(data))
+
 
 
 # Define some functions to use as trials
@@ -108,61 +637,45 @@ def objective_function(data,endtime):
     pass
     
 
-def min_plastic(data,endtime):
-    # Maybe add a check that time == 100 to ensure run completed.
-    try: 
-        if data["time"] == endtime:
-            cost = data['max_plas_strain']
-        else:
-            cost = 1E6
-    except(TypeError):
-        print('Suspect model did not run')
-        cost = 1E6
-    return cost
-
-def creep_range(data,endtime):
-    if data["time"] == endtime:
-        cost = -1*(data['max_creep_strain']-data['min_creep_strain'])
-    else:
-        cost = 1E6
-    return cost
-
-def max_stress(data,endtime):
-    try:
-        if data["time"] == endtime:
-            cost = -1*(data['max_stress'])
-        else:
-            cost = 1E6
-    except(TypeError):
-        print('Suspect model did not run')
-        cost = 1E6
-    return cost
-
-def avg_creep(data,endtime):
-    try:
-        if data["time"] == endtime:
-            cost = -1*(data['avg_creep'])
-        else:
-            cost = 1E6
-    except(TypeError):
-        print('Suspect model did not run')
-        cost = 1E6
-    return cost
-
-def maximise_strain(data,endtime):
+@batch_objective
+def min_plastic(columns,endtime=None,external_data=None):
+    """Minimise the maximum plastic strain.
+    """
+    return penalise_failed(columns.get('max_plas_strain',np.nan),columns,endtime)
+
+@batch_objective
+def creep_range(columns,endtime=None,external_data=None):
+    """Maximise the range of creep strain.
+    """
+    cost = -1*(np.asarray(columns.get('max_creep_strain',np.nan))-np.asarray(columns.get('min_creep_strain',np.nan)))
+    return penalise_failed(cost,columns,endtime)
+
+@batch_objective
+def max_stress(columns,endtime=None,external_data=None):
+    """Maximise the maximum stress.
+    """
+    return penalise_failed(-1*np.asarray(columns.get('max_stress',np.nan)),columns,endtime)
+
+@batch_objective
+def avg_creep(columns,endtime=None,external_data=None):
+    """Maximise the average creep strain.
+    """
+    return penalise_failed(-1*np.asarray(columns.get('avg_creep',np.nan)),columns,endtime)
+
+def maximise_strain(data,endtime,external_data=None):
     if data is None:
         return 1E6
     if int(data._time[-1]) != endtime:
         return 1E6
     
-    return -1*np.nanmax(np.array(data.data_sets[-1]['eyy']))
+    return -1*np.nanmax(final_field(data,'eyy'))
 
-def maximise_strain_deviation(data,endtime):
+def maximise_strain_deviation(data,endtime,external_data=None):
     if data is None:
         return 1E6
     if int(data._time[-1]) != endtime:
         return 1E6
     
-    return -1*np.nanstd(np.array(data.data_sets[-1]['eyy']))
+    return -1*np.nanstd(final_field(data,'eyy'))
 
 
@@ -0,0 +1,206 @@
+#
+# Persistent on-disk cache of evaluated candidates.
+#
+import functools
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+import numpy as np
+
+
+def _value_identity(value,seen):
+    if value is None or isinstance(value,(bool,int,float,complex,str,bytes,np.generic)):
+        return repr(value)
+    if isinstance(value,np.ndarray):
+        # Hash the whole array, its repr is truncated
+        digest = hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()
+        return 'ndarray({},{},{})'.format(value.dtype,value.shape,digest)
+    if id(value) in seen:
+        return '<cycle>'
+    seen = seen | {id(value)}
+    if isinstance(value,(list,tuple,set,frozenset)):
+        items = [_value_identity(item,seen) for item in value]
+        if isinstance(value,(set,frozenset)):
+            items.sort()
+        return '{}[{}]'.format(type(value).__name__,','.join(items))
+    if isinstance(value,dict):
+        items = sorted([(repr(k),_value_identity(v,seen)) for k,v in value.items()])
+        return 'dict[{}]'.format(','.join(['{}:{}'.format(k,v) for k,v in items]))
+    if hasattr(value,'to_numpy') and hasattr(value,'columns'):
+        # DataFrame, hash the values and column names
+        return 'frame({},{})'.format(_value_identity(list(value.columns),seen),_value_identity(value.to_numpy(),seen))
+    return _callable_identity(value,seen)
+
+def _callable_identity(obj,seen):
+    if obj is None:
+        return 'None'
+    if isinstance(obj,functools.partial):
+        return 'partial({};{};{})'.format(_callable_identity(obj.func,seen),
+                                          _value_identity(obj.args,seen),_value_identity(obj.keywords,seen))
+    if hasattr(obj,'__self__') and hasattr(obj,'__func__'):
+        # Bound method, the instance's settings matter
+        return '{}.{}'.format(_value_identity(obj.__self__,seen),obj.__func__.__qualname__)
+    if hasattr(obj,'__qualname__') and hasattr(obj,'__module__'):
+        return '{}.{}'.format(obj.__module__,obj.__qualname__)
+    obj_type = type(obj)
+    settings = ''
+    if hasattr(obj,'__dict__'):
+        # Not the repr, that can hold memory addresses and truncated arrays
+        settings = _value_identity(vars(obj),seen | {id(obj)})
+    return '{}.{}({})'.format(obj_type.__module__,obj_type.__qualname__,settings)
+
+def callable_identity(obj):
+    """String identifying a function, class or configured instance. It is
+    the same for equal settings in every session: partials are identified
+    by their function and arguments, instances by their attributes and
+    numpy arrays by a hash of their contents.
+
+    Args:
+        obj (object): Function, class, partial or instance.
+
+    Returns:
+        str: Identity string.
+    """
+    return _callable_identity(obj,frozenset())
+
+def cost_function_identity(cost_function):
+    """String identifying what a CostFunction calculates.
+
+    Args:
+        cost_function (CostFunction): Cost function.
+
+    Returns:
+        str: Identity string.
+    """
+    parts = [callable_identity(cost_function._reader),repr(cost_function._endtime),
+             'external:' + _value_identity(cost_function.external_data,frozenset())]
+    for function in cost_function._objective_functions:
+        parts.append(callable_identity(function))
+    for function in list(cost_function._ineq_constraints) + list(cost_function._eq_constraints):
+        parts.append('constraint:' + callable_identity(function))
+    return ';'.join(parts)
+
+
+class EvaluationCache():
+    """Content-addressed cache of objective values, stored one file per entry.
+    Entries are keyed by a hash of the rounded parameter vector and a context
+    string, which should identify the input files and the cost function.
+    The least recently used entries are evicted once the cache is full.
+    """
+
+    def __init__(self,cache_dir,tolerance=1E-8,max_entries=10000,max_bytes=None):
+        """
+        Args:
+            cache_dir (Path): Directory to store the cache in, created if needed.
+            tolerance (float, optional): Parameters are rounded to a grid of this spacing
+                before hashing, so vectors closer than this are usually treated as equal. Defaults to 1E-8.
+            max_entries (int, optional): Maximum number of entries kept. Defaults to 10000.
+            max_bytes (int, optional): Maximum total size of the cache on disk. Defaults to None, no limit.
+        """
+        self._cache_dir = Path(cache_dir)
+        self._cache_dir.mkdir(parents=True,exist_ok=True)
+        self._tolerance = tolerance
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._count()
+
+    def _count(self):
+        # Size is tracked from here on, the directory is only listed again to evict
+        sizes = [e.stat().st_size for e in self._cache_dir.glob('*.pickle')]
+        self._n_entries = len(sizes)
+        self._n_bytes = sum(sizes)
+
+    def key(self,x,context=''):
+        """Get the cache key for a parameter vector.
+
+        Args:
+            x (np.ndarray): Parameter vector.
+            context (str, optional): Context the vector was evaluated in. Defaults to ''.
+
+        Returns:
+            str: Hex digest key.
+        """
+        rounded = np.round(np.asarray(x,dtype=float)/self._tolerance).astype(np.int64)
+        digest = hashlib.sha256(context.encode())
+        digest.update(rounded.tobytes())
+        return digest.hexdigest()
+
+    def _path(self,key):
+        return self._cache_dir / (key + '.pickle')
+
+    def get(self,key):
+        """Look up an entry, marking it as recently used.
+
+        Args:
+            key (str): Cache key.
+
+        Returns:
+            tuple: (objectives, field_data) or None if the key is not cached.
+        """
+        path = self._path(key)
+        try:
+            with open(path,'rb') as f:
+                entry = pickle.load(f)
+        except (FileNotFoundError,EOFError,pickle.UnpicklingError):
+            return None
+        os.utime(path)
+        return entry
+
+    def put(self,key,f,field_data=None):
+        """Store an entry and evict old entries if the cache is full.
+
+        Args:
+            key (str): Cache key.
+            f (np.ndarray): Objective values.
+            field_data (object, optional): Compact field data to keep with the objectives. Defaults to None.
+        """
+        path = self._path(key)
+        temp_path = path.with_suffix('.tmp{}'.format(os.getpid()))
+        with open(temp_path,'wb') as out:
+            pickle.dump((np.asarray(f),field_data),out,pickle.HIGHEST_PROTOCOL)
+        try:
+            self._n_bytes -= path.stat().st_size
+        except FileNotFoundError:
+            self._n_entries += 1
+        self._n_bytes += temp_path.stat().st_size
+        # Replace is atomic, readers never see a partial entry
+        os.replace(temp_path,path)
+        if self._n_entries > self._max_entries or (self._max_bytes is not None and self._n_bytes > self._max_bytes):
+            self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until within the size limits.
+        """
+        entries = []
+        for path in self._cache_dir.glob('*.pickle'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime,stat.st_size,path))
+        entries.sort(key=lambda e: e[0])
+        total = sum([e[1] for e in entries])
+        n_remove = max(len(entries)-self._max_entries,0)
+        n_removed = 0
+        for mtime,size,path in entries:
+            over_bytes = self._max_bytes is not None and total > self._max_bytes
+            if n_removed >= n_remove and not over_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            n_removed += 1
+        self._n_entries = len(entries) - n_removed
+        self._n_bytes = total
+
+    def __len__(self):
+        return len(list(self._cache_dir.glob('*.pickle')))
+
+    def clear(self):
+        """Remove every entry.
+        """
+        for path in self._cache_dir.glob('*.pickle'):
+            path.unlink(missing_ok=True)
+        self._n_entries = 0
+        self._n_bytes = 0
@@ -0,0 +1,299 @@
+#
+# Screening candidates on cheap models and promoting the best to full fidelity.
+#
+import copy
+import re
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+
+def override_assignments(lines,overrides):
+    """Set the value of assignments anywhere in an input file, not just in the
+    parameter block, keeping any end character and trailing comment. Every
+    line assigning the name is changed, e.g. dt in several MOOSE blocks.
+
+    Args:
+        lines (list): Lines of the input file.
+        overrides (dict): New value of each variable.
+
+    Raises:
+        KeyError: A variable isn't assigned anywhere in the file.
+
+    Returns:
+        list: The changed lines.
+    """
+    lines = list(lines)
+    for name,value in overrides.items():
+        pattern = re.compile(r'^(\s*' + re.escape(name) + r'\s*=\s*)(.*?)(\s*(?:;|//|#).*)?$',re.DOTALL)
+        found = False
+        for i,line in enumerate(lines):
+            match = pattern.match(line.rstrip('\n'))
+            if match is None:
+                continue
+            found = True
+            lines[i] = match.group(1) + str(value) + (match.group(3) or '') + ('\n' if line.endswith('\n') else '')
+        if not found:
+            raise KeyError('{} is not assigned in the input file.'.format(name))
+    return lines
+
+
+class FidelityLevel():
+    """One level of a multi-fidelity run. The herd's input files are copied
+    with some assignments changed, e.g. a coarser mesh size lc in the .geo
+    file or a larger dt or earlier end_time in the MOOSE input, and the copies
+    are swapped into the herd while the level runs. Overrides of variables in
+    the parameter block also change the modifier's defaults, which is what the
+    herd writes there. The copies are written to the herd's base directory,
+    beside its run directories, as <stem>_<level name><suffix>, and the
+    user's input directory is left alone. The herd writes the run inputs
+    from the copies' text, and the evaluation cache reads the copies to keep
+    the levels apart. A level that ends the simulation earlier also needs
+    its endtime, so the cost function doesn't treat its runs as failed for
+    stopping short.
+    """
+
+    def __init__(self,name,overrides=None,cost=1.,endtime=None):
+        """
+        Args:
+            name (str): Name of the level, used in the names of the copied input files.
+            overrides (list, optional): Dict of variables to change (or None) for each of the herd's
+                modifiers, in the same order. Defaults to None, the original inputs.
+            cost (float, optional): Cost of one evaluation relative to the full model, for reporting. Defaults to 1.
+            endtime (float, optional): Endtime given to the cost function while the level runs.
+                Defaults to None, the cost function's own.
+        """
+        self._name = name
+        self._overrides = overrides
+        self._cost = cost
+        self._endtime = endtime
+        self._modifiers = None
+
+    def get_name(self):
+        """
+        Returns:
+            str: Name of the level.
+        """
+        return self._name
+
+    def get_cost(self):
+        """
+        Returns:
+            float: Cost of one evaluation relative to the full model.
+        """
+        return self._cost
+
+    def get_modifiers(self,modifiers,directory):
+        """Copies of the herd's input modifiers with the overrides applied,
+        created on first use.
+
+        Args:
+            modifiers (list): The herd's input modifiers.
+            directory (Path): Where the copied input files are written.
+
+        Returns:
+            list: Input modifiers for this level.
+        """
+        if self._overrides is None:
+            return modifiers
+        if self._modifiers is None:
+            if len(self._overrides) != len(modifiers):
+                raise ValueError('Need one override dict (or None) per input modifier.')
+            self._modifiers = []
+            for modifier,overrides in zip(modifiers,self._overrides):
+                if not overrides:
+                    self._modifiers.append(modifier)
+                    continue
+                level_modifier = copy.copy(modifier)
+                level_modifier._vars = dict(modifier._vars)
+                level_modifier._input_lines = override_assignments(modifier._input_lines,overrides)
+                # The parameter block is written from the variables, not the lines
+                for name,value in overrides.items():
+                    if name in level_modifier._vars:
+                        level_modifier._vars[name] = value
+                input_file = Path(modifier.get_input_file())
+                level_modifier._input_file = Path(directory) / (input_file.stem + '_' + self._name + input_file.suffix)
+                with open(level_modifier._input_file,'w') as f:
+                    f.writelines(level_modifier._input_lines)
+                self._modifiers.append(level_modifier)
+        return self._modifiers
+
+    @contextmanager
+    def applied(self,herd,cost_function=None):
+        """Run the herd, and score its outputs, at this level inside the context.
+
+        Args:
+            herd (MooseHerd): The herd.
+            cost_function (CostFunction, optional): Given the level's endtime if it has one. Defaults to None.
+        """
+        original = herd._modifiers
+        herd._modifiers = self.get_modifiers(original,herd._dir_manager._base_dir)
+        endtime = None
+        if cost_function is not None and self._endtime is not None:
+            endtime = cost_function.get_endtime()
+            cost_function.set_endtime(self._endtime)
+        try:
+            yield herd
+        finally:
+            herd._modifiers = original
+            if endtime is not None:
+                cost_function.set_endtime(endtime)
+
+
+class MultiFidelity():
+    """Evaluates each generation on a cascade of fidelity levels, cheapest
+    first. Every candidate runs at the lowest level, and only the best
+    fraction (on the best rank over the objectives) is promoted to the
+    next level, up to the last, normally the original inputs. An additive
+    correction between each pair of neighbouring levels is tracked from the
+    promoted candidates, which have results at both, and candidates that
+    stop at a lower level are given their result plus the corrections up to
+    the last level.
+    """
+
+    def __init__(self,levels,fraction=0.25,max_pairs=50,penalty=1E6):
+        """
+        Args:
+            levels (list): FidelityLevel for each level, cheapest first.
+            fraction (float or list, optional): Fraction of the candidates at each level promoted to the
+                next, one value for all or one per promotion. Defaults to 0.25.
+            max_pairs (int, optional): Only the most recent pairs of results are averaged for the corrections. Defaults to 50.
+            penalty (float, optional): Results with an objective at or above this are failed runs,
+                never promoted or corrected. Defaults to 1E6.
+        """
+        if len(levels) < 2:
+            raise ValueError('Need at least two fidelity levels.')
+        if np.isscalar(fraction):
+            fraction = [fraction]*(len(levels)-1)
+        self._levels = levels
+        self._fraction = fraction
+        self._max_pairs = max_pairs
+        self._penalty = penalty
+        self._differences = [None]*(len(levels)-1)
+        self._n_evaluations = np.zeros(len(levels),dtype=int)
+
+    def get_levels(self):
+        """
+        Returns:
+            list: The fidelity levels, cheapest first.
+        """
+        return self._levels
+
+    def _ok(self,results,n_obj):
+        return np.all(np.isfinite(results),axis=1) & np.all(results[:,:n_obj] < self._penalty,axis=1)
+
+    def add(self,level,low,high,n_obj):
+        """Add results of the same candidates at a level and the next.
+
+        Args:
+            level (int): The lower level.
+            low (np.ndarray): Results at the lower level, one row per candidate.
+            high (np.ndarray): Results at the next level.
+            n_obj (int): Number of objectives, the first columns of the results.
+        """
+        ok = self._ok(low,n_obj) & self._ok(high,n_obj)
+        if not np.any(ok):
+            return
+        differences = high[ok] - low[ok]
+        if self._differences[level] is not None:
+            differences = np.vstack((self._differences[level],differences))
+        self._differences[level] = differences[-self._max_pairs:]
+
+    def get_correction(self,level):
+        """Additive correction from a level to the next.
+
+        Args:
+            level (int): The lower level.
+
+        Returns:
+            np.ndarray: Mean difference of each result column, 0 with no pairs yet.
+        """
+        if self._differences[level] is None:
+            return 0.
+        return self._differences[level].mean(axis=0)
+
+    def correct(self,results,levels,n_obj):
+        """Estimate the last level's results from results at lower levels.
+
+        Args:
+            results (np.ndarray): Results, one row per candidate.
+            levels (np.ndarray): Level each row was evaluated at.
+            n_obj (int): Number of objectives, the first columns of the results.
+
+        Returns:
+            np.ndarray: Corrected results, failed runs are left as they are.
+        """
+        corrected = np.array(results,dtype=float)
+        ok = self._ok(corrected,n_obj)
+        for i in np.flatnonzero(ok):
+            for level in range(levels[i],len(self._levels)-1):
+                corrected[i] += self.get_correction(level)
+        return corrected
+
+    def select(self,results,level,n_obj):
+        """Choose the candidates to promote from a level.
+
+        Args:
+            results (np.ndarray): Corrected results at the level, one row per candidate.
+            level (int): The level.
+            n_obj (int): Number of objectives, the first columns of the results.
+
+        Returns:
+            np.ndarray: True for the candidates to promote.
+        """
+        ok = self._ok(results,n_obj)
+        promote = np.zeros(results.shape[0],dtype=bool)
+        n_promote = min(int(np.ceil(self._fraction[level]*results.shape[0])),np.sum(ok))
+        if n_promote == 0:
+            return promote
+        # Rank on each objective, a candidate is as good as its best rank
+        objectives = np.where(ok[:,None],results[:,:n_obj],np.inf)
+        ranks = np.argsort(np.argsort(objectives,axis=0),axis=0).min(axis=1)
+        promote[np.argsort(ranks,kind='stable')[:n_promote]] = True
+        return promote
+
+    def evaluate(self,herd,x,evaluate,n_obj,cost_function=None):
+        """Evaluate candidates through the levels.
+
+        Args:
+            herd (MooseHerd): The herd, its inputs are swapped for each level.
+            x (np.ndarray): Candidate parameters, one row per candidate.
+            evaluate (function): Evaluates an array of candidates with the herd as it is, returning their results.
+            n_obj (int): Number of objectives, the first columns of the results.
+            cost_function (CostFunction, optional): Given each level's endtime. Defaults to None.
+
+        Returns:
+            tuple: Corrected results with one row per candidate, and the level each was evaluated at.
+        """
+        run = np.arange(x.shape[0])
+        levels = np.zeros(x.shape[0],dtype=int)
+        results = None
+        for k,level in enumerate(self._levels):
+            with level.applied(herd,cost_function):
+                level_results = np.asarray(evaluate(x[run]),dtype=float)
+            self._n_evaluations[k] += run.shape[0]
+            if results is None:
+                results = np.empty((x.shape[0],level_results.shape[1]))
+            else:
+                self.add(k-1,results[run],level_results,n_obj)
+            results[run] = level_results
+            levels[run] = k
+            if k == len(self._levels)-1:
+                break
+            promote = self.select(self.correct(results[run],levels[run],n_obj),k,n_obj)
+            print('       {} of {} candidates promoted to fidelity level {}'.format(np.sum(promote),run.shape[0],self._levels[k+1].get_name()))
+            print('------------------------------------------------')
+            run = run[promote]
+            if run.shape[0] == 0:
+                break
+        return self.correct(results,levels,n_obj), levels
+
+    def get_cost_summary(self):
+        """
+        Returns:
+            dict: Number of evaluations at each level and the fraction of the total cost spent there.
+        """
+        costs = self._n_evaluations*np.array([level.get_cost() for level in self._levels])
+        total = costs.sum() if costs.sum() > 0 else 1.
+        return {level.get_name():(int(n),float(c/total)) for level,n,c in zip(self._levels,self._n_evaluations,costs)}
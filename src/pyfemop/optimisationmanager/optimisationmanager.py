@@ -12,21 +12,64 @@ from mooseherder import ExodusReader
 
 import pickle
 import copy
+from concurrent.futures import wait, FIRST_COMPLETED
+
+from pyfemop.optimisationmanager.scheduling import AskTellAdapter
+from pyfemop.optimisationmanager.scheduling import run_in_slot
+from pyfemop.optimisationmanager.scheduling import run_streamed
+from pyfemop.optimisationmanager.scheduling import run_pipelined
+from pyfemop.optimisationmanager.scheduling import slot_executor
+from pyfemop.optimisationmanager.evaluationcache import cost_function_identity
+from pyfemop.optimisationmanager.parameterplan import ParameterPlan
+from pyfemop.optimisationmanager.bayesopt import BatchBayesianOptimisation
 
 class MooseOptimisationRun():
 
-    def __init__(self,name,algorithm,termination,herd,cost_function,parameter_space):
+    def __init__(self,name,algorithm,termination,herd,cost_function,parameter_space,dispatch='sweep',num_para_read=4,evaluation_cache=None,
+                 parameter_constraints=None,n_mesh_workers=1,mesh_gate=None,surrogate=None,fidelity=None):
         """Class to contain everything needed for an optimization run 
         with moose. Should be pickle-able.
 
         Args:
             name (str) : string to name the run.
-            algorithm (pymoo algorithm): Choice of algorithm for the optimization
+            algorithm (pymoo algorithm): Choice of algorithm for the optimization. A BatchBayesianOptimisation
+                without a batch size proposes as many candidates per iteration as the herd runs in parallel.
             termination (pymoo termination): Termination criteria for the algorithm
             herd (MooseHerd): MooseHerd instance for the run.
             costfunction (CostFunction): CostFunction instance.
             parameter_space (dict): Dict with parameters as keys and 2-tuple with lower and upper bounds as values.
+            dispatch (str, optional): How a generation is evaluated. 'sweep' runs, reads and scores in three phases,
+                'streamed' reads and scores each output while the other simulations are still running,
+                'fused' runs the sweep then reads and scores each output in the cost function's workers,
+                'pipelined' meshes candidates ahead of the solver pool and scores each output as it is solved,
+                for herds of a gmsh runner followed by a MOOSE runner. Defaults to 'sweep'.
+            num_para_read (int, optional): Number of outputs to read in parallel. Defaults to 4.
+            evaluation_cache (EvaluationCache, optional): Cache of previous evaluations, checked before
+                running the herd. Its tolerance is relative to the range of each parameter. Defaults to None.
+            parameter_constraints (list of functions, optional): Inequality constraints that only depend on the
+                parameters. Each takes the (n candidates, n_var) array and returns n values, <= 0 is feasible.
+                Infeasible candidates are given a penalty cost and never run. Defaults to None.
+            n_mesh_workers (int, optional): Size of the meshing pool of the 'pipelined' dispatch. Defaults to 1.
+            mesh_gate (MeshQualityGate, optional): Checks each mesh in the 'pipelined' dispatch, candidates with
+                a missing or poor mesh get the gate's penalty without being solved. Defaults to None.
+            surrogate (SurrogateScreen, optional): Pre-screens each generation of run(), only the most promising
+                or uncertain candidates are simulated and the rest get the surrogate's prediction. The individuals
+                given predictions have 'surrogate' set True in the population. Defaults to None.
+            fidelity (MultiFidelity, optional): Evaluates each generation of run() on cheap fidelity levels first,
+                only the best candidates are promoted to the full model and the rest get corrected low fidelity
+                results. The level each individual reached is set as 'fidelity' in the population, -1 if it
+                wasn't simulated. Defaults to None.
         """
+        if dispatch not in ('sweep','streamed','fused','pipelined'):
+            raise ValueError('Unknown dispatch type: {}'.format(dispatch))
+        self._dispatch = dispatch
+        self._n_mesh_workers = n_mesh_workers
+        self._mesh_gate = mesh_gate
+        self._surrogate = surrogate
+        self._surrogate_flags = None
+        self._fidelity = fidelity
+        self._fidelity_levels = None
+        self._evaluation_cache = evaluation_cache
         self._name = name
         self._algorithm = algorithm
         self._herd = herd
@@ -35,6 +78,9 @@ class MooseOptimisationRun():
         self._opt_parameters = [x for x in parameter_space.keys()]
         self._n_var = len(parameter_space)
         self._n_obj = self._cost_function.n_obj
+        if parameter_constraints is None:
+            parameter_constraints = []
+        self._parameter_constraints = parameter_constraints
         lb=[]
         ub = []
         for value in parameter_space.values():
@@ -47,15 +93,19 @@ class MooseOptimisationRun():
 
         self._problem = Problem(n_var=self._n_var,
                   n_obj=self._n_obj,
+                  n_ieq_constr=self._cost_function.n_ieq_constraints+len(self._parameter_constraints),
+                  n_eq_constr=self._cost_function.n_eq_constraints,
                   xl=self._bounds[0],
                   xu=self._bounds[1])
         
         self.assign_parameter_list()
         
         # Setup algorithm
+        if isinstance(self._algorithm,BatchBayesianOptimisation):
+            self._algorithm.set_batch_size(herd._n_para_sims)
         self._algorithm.setup(self._problem,termination=termination)
 
-        self.sweep_reader = SweepReader(herd._dir_manager,num_para_read=4)
+        self.sweep_reader = SweepReader(herd._dir_manager,num_para_read=num_para_read)
         
 
 
@@ -87,14 +137,271 @@ class MooseOptimisationRun():
 
     def assign_parameter_list(self):
         """Iterate through the herder modifiers and work out where each parameter goes.
+        Compiles the column plan used to convert populations for the herd.
+        """
+        self._parameter_plan = ParameterPlan.from_herd(self._opt_parameters,self._herd)
+        self._parameter_assignment = self._parameter_plan.get_assignment()
+
+    def get_para_vars(self,x):
+        """Convert an array of candidates into the list of lists of dicts
+        the herd expects, one dict (or None) per modifier.
+
+        Args:
+            x (np.ndarray): Candidate parameters, one row per candidate.
+
+        Returns:
+            list: Sweep variables to pass to the herd.
+        """
+        return self._parameter_plan.to_sweep(x)
+
+    def get_cache_context(self):
+        """Get the string identifying the inputs and cost function for the evaluation cache.
+
+        Returns:
+            str: Cache context.
         """
-        parameter_assignment = []
+        context = [cost_function_identity(self._cost_function)]
         for modifier in self._herd._modifiers:
-            temp_params = [x for x in modifier._vars.keys()]
-            parameter_assignment.append([x for x in temp_params if x in self._opt_parameters])
+            with open(modifier.get_input_file(),'r') as f:
+                context.append(f.read())
+        return '\n'.join(context)
+
+    def get_cache_keys(self,x):
+        """Get the evaluation cache key of each candidate. Parameters are scaled
+        by their bounds first so the tolerance applies to all of them equally.
+
+        Args:
+            x (np.ndarray): Candidate parameters, one row per candidate.
+
+        Returns:
+            list: Cache key for each candidate.
+        """
+        context = self.get_cache_context()
+        x_scaled = (x-self._bounds[0])/(self._bounds[1]-self._bounds[0])
+        return [self._evaluation_cache.key(row,context) for row in x_scaled]
+
+    def evaluate_parameter_constraints(self,x):
+        """Evaluate the constraints that only depend on the parameters, for the whole population at once.
+
+        Args:
+            x (np.ndarray): Candidate parameters, one row per candidate.
+
+        Returns:
+            np.ndarray: Constraint values, one row per candidate and one column per constraint.
+        """
+        G = np.empty((x.shape[0],len(self._parameter_constraints)))
+        for j,function in enumerate(self._parameter_constraints):
+            G[:,j] = function(x)
+        return G
+
+    def get_penalty(self):
+        """Results given to candidates that are not simulated because they are infeasible.
+
+        Returns:
+            np.ndarray: Penalty costs, simulation constraints are left at 0.
+        """
+        n_constr = self._cost_function.n_ieq_constraints + self._cost_function.n_eq_constraints
+        return np.concatenate((np.full(self._n_obj,1E6),np.zeros(n_constr)))
+
+    def split_results(self,results):
+        """Split results of evaluate_population into the arrays pymoo expects.
+
+        Args:
+            results (np.ndarray): Results, one row per candidate.
+
+        Returns:
+            dict: F and, if there are constraints, G and H. Can be passed to StaticProblem.
+        """
+        results = np.atleast_2d(results)
+        n_param = len(self._parameter_constraints)
+        F, G, H = self._cost_function.split_results(results[:,:results.shape[1]-n_param])
+        out = {'F':F}
+        if n_param:
+            G_param = results[:,results.shape[1]-n_param:]
+            out['G'] = G_param if G is None else np.hstack((G,G_param))
+        elif G is not None:
+            out['G'] = G
+        if H is not None:
+            out['H'] = H
+        return out
+
+    def evaluate_population(self,x):
+        """Calculate the objectives and constraints for every candidate. Candidates
+        that fail a parameter constraint get a penalty and aren't run, the herd is
+        only run for feasible candidates that aren't in the evaluation cache.
+
+        Args:
+            x (np.ndarray): Candidate parameters, one row per candidate.
+
+        Returns:
+            np.ndarray: Results with one row per candidate. Columns are the objectives, the cost
+                function's constraints then the parameter constraints, see split_results.
+        """
+        G_param = self.evaluate_parameter_constraints(x)
+        feasible = np.all(G_param <= 0,axis=1)
+        results = np.tile(self.get_penalty(),(x.shape[0],1))
+        self._surrogate_flags = np.zeros(x.shape[0],dtype=bool)
+        self._fidelity_levels = np.full(x.shape[0],-1)
+        if not np.all(feasible):
+            print('       {} of {} candidates are infeasible, not run'.format(np.sum(~feasible),x.shape[0]))
+            print('------------------------------------------------')
+        if np.any(feasible):
+            results[feasible], self._surrogate_flags[feasible], self._fidelity_levels[feasible] = self.evaluate_screened(x[feasible])
+        return np.hstack((results,G_param))
+
+    def evaluate_screened(self,x):
+        """Calculate the objectives and constraints, only simulating the candidates
+        the surrogate picks if there is one.
+
+        Args:
+            x (np.ndarray): Candidate parameters, one row per candidate.
+
+        Returns:
+            tuple: Costs and constraint values with one row per candidate, True for the candidates
+                given the surrogate's prediction and the fidelity level of each (-1 if predicted).
+        """
+        predicted = np.zeros(x.shape[0],dtype=bool)
+        if self._surrogate is None:
+            costs, levels = self.evaluate_fidelities(x)
+            return costs, predicted, levels
+
+        x_scaled = (x-self._bounds[0])/(self._bounds[1]-self._bounds[0])
+        run = self._surrogate.select(x_scaled,self._n_obj)
+        predicted = ~run
+        costs = np.empty((x.shape[0],self.get_penalty().shape[0]))
+        levels = np.full(x.shape[0],-1)
+        costs[run], levels[run] = self.evaluate_fidelities(x[run])
+        self._surrogate.add(x_scaled[run],costs[run])
+        if np.any(predicted):
+            print('       {} of {} candidates given surrogate predictions'.format(np.sum(predicted),x.shape[0]))
+            print('------------------------------------------------')
+            costs[predicted] = self._surrogate.predict(x_scaled[predicted])[0]
+        return costs, predicted, levels
+
+    def evaluate_fidelities(self,x):
+        """Calculate the objectives and constraints, through the fidelity levels if there are any.
+
+        Args:
+            x (np.ndarray): Candidate parameters, one row per candidate.
+
+        Returns:
+            tuple: Costs and constraint values with one row per candidate, and the fidelity level
+                each was evaluated at (0 without multi-fidelity).
+        """
+        if self._fidelity is None:
+            return self.evaluate_feasible(x), np.zeros(x.shape[0],dtype=int)
+        return self._fidelity.evaluate(self._herd,x,self.evaluate_feasible,self._n_obj,self._cost_function)
+
+    def evaluate_feasible(self,x):
+        """Calculate the objectives and constraints for every candidate, only running the herd
+        for candidates that aren't in the evaluation cache. Failed runs (a penalty or
+        non-finite objective) aren't cached, so they are retried in later generations.
+
+        Args:
+            x (np.ndarray): Candidate parameters, one row per candidate.
+
+        Returns:
+            np.ndarray: Costs and constraint values with one row per candidate.
+        """
+        if self._evaluation_cache is None:
+            return self.run_population(x)
+
+        keys = self.get_cache_keys(x)
+        costs = np.empty((x.shape[0],self.get_penalty().shape[0]))
+        hit = np.zeros(x.shape[0],dtype=bool)
+        for i,key in enumerate(keys):
+            entry = self._evaluation_cache.get(key)
+            if entry is not None:
+                costs[i] = entry[0]
+                hit[i] = True
+        print('       {} of {} candidates found in cache'.format(np.sum(hit),x.shape[0]))
+        print('------------------------------------------------')
+
+        if not np.all(hit):
+            costs[~hit] = self.run_population(x[~hit])
+            for i in np.where(~hit)[0]:
+                self.store_in_cache(keys[i],costs[i])
+        return costs
+
+    def store_in_cache(self,key,costs):
+        """Add a result to the evaluation cache, unless the run failed
+        (a penalty or non-finite objective), so failures are retried later.
+
+        Args:
+            key (str): Cache key of the candidate.
+            costs (np.ndarray): Costs and constraint values of the candidate.
+        """
+        objectives = np.asarray(costs[:self._n_obj],dtype=float)
+        if np.all(np.isfinite(objectives)) and np.all(objectives < self.get_penalty()[:self._n_obj]):
+            self._evaluation_cache.put(key,costs)
+
+    def run_population(self,x):
+        """Run the herd for every candidate and calculate the objectives and constraints.
+
+        Args:
+            x (np.ndarray): Candidate parameters, one row per candidate.
+
+        Returns:
+            np.ndarray: Costs and constraint values with one row per candidate.
+        """
+        #Run moose for all x.
+        #Moose herder needs list of dicts. With correctly named parameters. 
+        # The order of parameters will be the same as in the bounds
         
-        self._parameter_assignment = parameter_assignment
+        # Convert x to list of dict
+        # Need to check from the herder what is running what. i.e. what should the format be 
+        para_vars = self.get_para_vars(x)
 
+        if self._dispatch == 'streamed':
+            # Each output is read and scored as soon as its simulation finishes
+            print('       Running, Reading and Scoring             ')
+            print('------------------------------------------------')
+            costs = np.array(run_streamed(self._herd,para_vars,
+                                          self._cost_function.submit_output))
+            print('        Run time = {:.2f} seconds.'.format(self._herd.get_sweep_time()))
+            print('------------------------------------------------')
+            return costs
+
+        if self._dispatch == 'pipelined':
+            # Meshing of the next candidates overlaps the solves
+            print('    Meshing, Solving, Reading and Scoring       ')
+            print('------------------------------------------------')
+            rejected_score = None
+            if self._mesh_gate is not None:
+                rejected_score = self.get_penalty()
+                rejected_score[:self._n_obj] = self._mesh_gate.get_penalty()
+            costs = np.array(run_pipelined(self._herd,para_vars,self._n_mesh_workers,
+                                           submit_score=self._cost_function.submit_output,
+                                           gate=self._mesh_gate,rejected_score=rejected_score))
+            print('        Run time = {:.2f} seconds.'.format(self._herd.get_sweep_time()))
+            print('------------------------------------------------')
+            return costs
+
+        output_files = self._herd.run_para(para_vars)
+        print('        Run time = {:.2f} seconds.'.format(self._herd.get_sweep_time()))
+        print('------------------------------------------------')
+
+        if self._dispatch == 'fused':
+            print('       Reading Data and Calculating Objectives  ')
+            print('------------------------------------------------')
+            return np.array(self._cost_function.evaluate_outputs_parallel(output_files))
+
+        # Read in moose results and get cost. 
+        print('                Reading Data                    ')
+        print('------------------------------------------------')
+        
+        #output_files = self.sweep_reader.read_all_output_keys()
+        if self._cost_function._selection is not None:
+            data_list = [self._cost_function.read_outputs(o) for o in output_files]
+        else:
+            # Only this sweep's outputs, the run dirs can hold earlier sweeps
+            # of the same generation (e.g. lower fidelity levels)
+            data_list = [self.sweep_reader.read_results_once(o) for o in output_files]
+
+        print('            Calculating Objectives              ')
+        print('------------------------------------------------')
+
+        return np.array(self._cost_function.evaluate_parallel(data_list))
 
 
 
@@ -168,73 +475,15 @@ class MooseOptimisationRun():
             #Get parameters
             x = pop.get("X")
 
-            #Run moose for all x.
-            #Moose herder needs list of dicts. With correctly named parameters. 
-            # The order of parameters will be the same as in the bounds
-            
-            # Convert x to list of dict
-            # Need to check from the herder what is running what. i.e. what should the format be 
-            para_vars = []
-            for i in range(x.shape[0]):
-                sub_vars = []
-                p_no = 0
-                for param_list in self._parameter_assignment:
-                    if param_list:
-                        para_dict = dict()
-                        for j,key in enumerate(param_list):
-                            para_dict[key] = x[i,p_no]
-                            p_no+=1
-                    else:
-                        para_dict = None
-                    sub_vars.append(para_dict)
-                para_vars.append(sub_vars)
-            
-            # For now only modifying moose or gmsh, not both so this should work:
-            
-            #print(para_vars)
-            
-            #if self._mod_moose == False: # Don't need to change moose
-            #    moose_vars = [self._herd._moose_modifier.get_vars()] 
-            #else: 
-            #    moose_vars = [{key: l[key] for key in self._moose_opt_params} for l in para_vars]
-
-            #if self._mod_gmsh == False: # Don't need to change gmsh
-            #    gmsh_vars = None 
-            #else: 
-            #    gmsh_vars = [{key: l[key] for key in self._gmsh_opt_params} for l in para_vars]
-
-            self._herd.run_para(para_vars)
-            print('        Run time = {:.2f} seconds.'.format(self._herd.get_sweep_time()))
-            print('------------------------------------------------')
-            # Read in moose results and get cost. 
-            print('                Reading Data                    ')
-            print('------------------------------------------------')
-            
-            #output_files = self.sweep_reader.read_all_output_keys()
-            data_list = self.sweep_reader.read_results_sequential()
-            #print(data_list)
-
-            # Ultimately want to convert from simdata to spatialdata but for now...
-
-            #if self._reader is not None:
-            #    data_list = self._herd.read_results_para_generic(self._reader)
-            #else:
-            #    # For working with examples relying on herder only.
-            #    vars_to_read = ['disp_y','vonmises_stress']
-            #    data_list = self._herd.read_results_para(vars_to_read,self._herd._sweep_iter,[1,1])
-            
-            print('            Calculating Objectives              ')
-            print('------------------------------------------------')
-
-            costs = np.array(self._cost_function.evaluate_parallel(data_list))
-            F = []
-            for i in range(costs.shape[1]):
-                F.append(costs[:,i])
-            
+            results = self.evaluate_population(x)
 
-            static = StaticProblem(self._problem,F=F)
+            static = StaticProblem(self._problem,**self.split_results(results))
             #Evaluator().eval(static,pop)
             self._algorithm.evaluator.eval(static,pop)
+            if self._surrogate is not None:
+                pop.set('surrogate',self._surrogate_flags)
+            if self._fidelity is not None:
+                pop.set('fidelity',self._fidelity_levels)
 
             self._algorithm.tell(infills=pop)
             self.backup()
@@ -242,10 +491,100 @@ class MooseOptimisationRun():
             print('************************************************')
             print('')
             self.print_status_to_file()
+        self._cost_function.shutdown()
+        self.print_status()
+        self.print_status_to_file()
+
+
+    def run_async(self,num_evals,max_batches=2):
+        """Run the optimization without a generation barrier. Each simulation
+        slot gets a new candidate as soon as it frees up, its output is read
+        and scored on the cost function's worker pool while the slot runs the
+        next candidate, and results are told to the algorithm as they arrive.
+        Works best with steady-state algorithms (small n_offsprings), larger
+        batches are handed out candidate by candidate and told once complete.
+
+        Args:
+            num_evals (int): Maximum number of simulations to run.
+            max_batches (int, optional): Number of offspring batches that can be in flight at once. Defaults to 2.
+        """
+        adapter = AskTellAdapter(self._algorithm,self._problem,max_batches,self.split_results)
+        n_slots = self._herd._n_para_sims
+
+        self._herd._dir_manager.clear_dirs()
+        self._herd._dir_manager.create_dirs()
+        print('************************************************')
+        print('     Running Asynchronous Optimization          ')
+        print('------------------------------------------------')
+
+        sim_iter = self._herd._sim_iter
+        n_submitted = 0
+        running = dict()
+        scoring = []
+        executor = slot_executor(n_slots)
+        try:
+            while True:
+                # Fill every free slot
+                while len(running) < n_slots and n_submitted < num_evals:
+                    candidate = adapter.ask()
+                    if candidate is None:
+                        break
+                    batch_id, index, x = candidate
+                    G_param = self.evaluate_parameter_constraints(np.atleast_2d(x))[0]
+                    if np.any(G_param > 0):
+                        # Infeasible, never reaches the herd
+                        if adapter.tell(batch_id,index,np.concatenate((self.get_penalty(),G_param))):
+                            self.backup()
+                        continue
+                    key = None
+                    if self._evaluation_cache is not None:
+                        key = self.get_cache_keys(np.atleast_2d(x))[0]
+                        entry = self._evaluation_cache.get(key)
+                        if entry is not None:
+                            if adapter.tell(batch_id,index,np.concatenate((entry[0],G_param))):
+                                self.backup()
+                            continue
+                    var_list = self.get_para_vars(np.atleast_2d(x))[0]
+                    future = executor.submit(run_in_slot,self._herd,sim_iter,var_list)
+                    running[future] = (batch_id,index,key,G_param)
+                    sim_iter += 1
+                    n_submitted += 1
+
+                if not running and not scoring:
+                    break
+
+                # Wait for a simulation, checking on the scores every so often
+                if running:
+                    done, _ = wait(running,timeout=0.05 if scoring else None,return_when=FIRST_COMPLETED)
+                else:
+                    done = []
+                    scoring[0][0].wait(0.05)
+                for future in done:
+                    batch_id, index, key, G_param = running.pop(future)
+                    # Read and scored on the cost function's pool, the slot is refilled first
+                    score = self._cost_function.submit_output(future.result())
+                    scoring.append((score,batch_id,index,key,G_param))
+
+                for item in [item for item in scoring if item[0].ready()]:
+                    scoring.remove(item)
+                    score, batch_id, index, key, G_param = item
+                    f = np.asarray(score.get(),dtype=float)
+                    if key is not None:
+                        self.store_in_cache(key,f)
+                    if adapter.tell(batch_id,index,np.concatenate((f,G_param))):
+                        print('   Batch complete, {} simulations run.'.format(n_submitted))
+                        self.backup()
+                        self.print_status_to_file()
+        finally:
+            executor.shutdown()
+            self._cost_function.shutdown()
+            self._herd._sim_iter = sim_iter
+
+        print('************************************************')
+        print('')
         self.print_status()
         self.print_status_to_file()
 
-    
     def run_optimal(self,pf_nums):
         """Run a model from the pareto front
 
@@ -270,13 +609,7 @@ class MooseOptimisationRun():
         
         moose_vars = [self._herd._moose_modifier.get_vars()] 
 
-        para_vars = list()
-        para_names = [t for t in self._parameter_space.keys()]
-        for i in range(x.shape[0]):
-            para_dict = dict()
-            for j in range(len(para_names)):
-                para_dict[para_names[j]] = x[i,j]
-            para_vars.append(para_dict)
+        para_vars = self._parameter_plan.to_dicts(x)
         
         print('**** Running Selected Models ****')
         temp_herd.run_para(moose_vars,para_vars)  
@@ -297,13 +630,19 @@ class MooseOptimisationRun():
         # Not sure why the below code doesn't work, (Returns 0) but can get n_evals roughly
         #print('Completed Evaluations: {}'.format(self._algorithm.evaluator.n_eval))
         print('Completed Evaluations: {}'.format((self._algorithm.n_gen-1)*self._algorithm.pop_size))
+        if self._fidelity is not None:
+            for name,(n,fraction) in self._fidelity.get_cost_summary().items():
+                print('  Fidelity {}: {} evaluations, {:.0%} of cost'.format(name,n,fraction))
         # Doesn't seem like there's a way to get which termination tripped on the algorithm
         if self._algorithm.has_next():
             print('Termination criteria not reached.')
         else:
             print('Algorithm terminated.')
         print('------------------------------------------------')
-        if len(X.shape)==1:
+        if X is None:
+            print('         No feasible solution found yet         ')
+            print('------------------------------------------------')
+        elif len(X.shape)==1:
             print('      Single Objective Optimisation Result      ')
             print('------------------------------------------------')
             outstring = 'Parameters:\n'
@@ -350,13 +689,19 @@ class MooseOptimisationRun():
             # Not sure why the below code doesn't work, (Returns 0) but can get n_evals roughly
             #print('Completed Evaluations: {}'.format(self._algorithm.evaluator.n_eval))
             f.write('Completed Evaluations: {}\n'.format((self._algorithm.n_gen-1)*self._algorithm.pop_size))
+            if self._fidelity is not None:
+                for name,(n,fraction) in self._fidelity.get_cost_summary().items():
+                    f.write('  Fidelity {}: {} evaluations, {:.0%} of cost\n'.format(name,n,fraction))
             # Doesn't seem like there's a way to get which termination tripped on the algorithm
             if self._algorithm.has_next():
                 f.write('Termination criteria not reached.\n')
             else:
                 f.write('Algorithm terminated.\n')
             f.write('------------------------------------------------\n')
-            if len(X.shape)==1:
+            if X is None:
+                f.write('         No feasible solution found yet         \n')
+                f.write('------------------------------------------------\n')
+            elif len(X.shape)==1:
                 f.write('      Single Objective Optimisation Result      \n')
                 f.write('------------------------------------------------\n')
                 outstring = 'Parameters:\n'
@@ -406,7 +751,10 @@ class MooseOptimisationRun():
         else:
             mega_string +='Algorithm terminated.\n'
         mega_string +='------------------------------------------------\n'
-        if len(X.shape)==1:
+        if X is None:
+            mega_string +='         No feasible solution found yet         \n'
+            mega_string +='------------------------------------------------\n'
+        elif len(X.shape)==1:
             mega_string +='      Single Objective Optimisation Result      \n'
             mega_string +='------------------------------------------------\n'
             outstring = 'Parameters:\n'
@@ -465,12 +813,7 @@ class MooseOptimisationRun():
             # The order of parameters will be the same as in the bounds
             
             # Convert x to list of dict
-            para_vars = []
-            for i in range(x.shape[0]):
-                para_dict = dict()
-                for j,key in enumerate(self._opt_parameters):
-                    para_dict[key] = x[i,j]
-                para_vars.append(para_dict)
+            para_vars = self._parameter_plan.to_dicts(x)
             
             if self._mod_moose == False: # Don't need to change moose
                 moose_vars = [self._herd._moose_modifier.get_vars()] 
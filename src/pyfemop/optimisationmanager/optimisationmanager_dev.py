@@ -16,11 +16,13 @@ import pickle
 import copy
 import pyvista as pv
 from pyfemop.optimisationmanager.costfunctions import CostFunction
+from pyfemop.optimisationmanager.parameterplan import ParameterPlan
 from pycoatl.spatialdata.importsimdata import simdata_to_spatialdata
 
 class OptimisationInputs():
 
-    def __init__(self,parameter_space : dict ,algorithm : Algorithm ,termination : Termination, run_type = 'default', base_params : dict = None):
+    def __init__(self,parameter_space : dict ,algorithm : Algorithm ,termination : Termination, run_type = 'default', base_params : dict = None,
+                 parameter_constraints : list = None):
         """Class for containing the input choices for an optimisation.
 
         Args:
@@ -29,6 +31,9 @@ class OptimisationInputs():
             termination (Termination): Pymoo termination criteria to use for the optimisation
             run_type (str) : Default 'default'. Type of run: 'default', 'sensitivity' or 'gradient'.
             base_params (dict) : Default None. Dictionary of parameters used as a baseline for the sensitivity runs
+            parameter_constraints (list) : Default None. Inequality constraints that only depend on the parameters.
+                Each takes the (n candidates, n_var) array and returns n values, <= 0 is feasible.
+                Infeasible candidates are never run.
         """
         self._algorithm = algorithm
         self._parameter_space = parameter_space
@@ -44,14 +49,65 @@ class OptimisationInputs():
         self._termination = termination
         self._run_type = run_type
         self._base_params = base_params
+        if parameter_constraints is None:
+            parameter_constraints = []
+        self._parameter_constraints = parameter_constraints
         # Check base params exist for sensitivity run
         if self._run_type == 'sensitivity' and self._base_params is None:
             raise ValueError('Sensitivity optimisation runs require a set of base parameters.')
 
+    def evaluate_parameter_constraints(self,x):
+        """Evaluate the parameter constraints for the whole population at once.
+
+        Args:
+            x (np.ndarray): Candidate parameters, one row per candidate.
+
+        Returns:
+            tuple: Constraint values (n candidates, n constraints) and the feasible mask.
+        """
+        G = np.empty((x.shape[0],len(self._parameter_constraints)))
+        for j,function in enumerate(self._parameter_constraints):
+            G[:,j] = function(x)
+        return G, np.all(G <= 0,axis=1)
+
+
+def sensitivity_cost(strains):
+    """Cost of candidates from their base and perturbed runs.
+
+    Args:
+        strains (np.ndarray): Final equivalent strain, shape (..., 1 + n perturbations, n points).
+            Base run first. Candidates on the same mesh can be stacked along the leading axis.
+
+    Returns:
+        float or np.ndarray: Negative sum of the normalised mean absolute sensitivities.
+    """
+    sens = strains[...,:1,:] - strains[...,1:,:]
+    mean_sens = np.mean(np.abs(sens),axis=-1)
+    return -np.sum(mean_sens/np.max(mean_sens,axis=-1,keepdims=True),axis=-1)
+
+
+class SpatialDataLoader():
+    """Picklable loader for CostFunction workers. Converts the simulation
+    data to SpatialData and runs the data filter, if there is one.
+    """
+
+    def __init__(self,data_filter = None):
+        """
+        Args:
+            data_filter : Instance of data filter class or None.
+        """
+        self._data_filter = data_filter
+
+    def __call__(self,data):
+        spatial_data = simdata_to_spatialdata(data)
+        if self._data_filter is not None:
+            spatial_data = self._data_filter.run_filter(spatial_data)
+        return spatial_data
+
 
 class MooseOptimisationRun():
 
-    def __init__(self,name : str,optimisation_inputs : OptimisationInputs,herd : MooseHerd,cost_function : CostFunction,data_filter = None):
+    def __init__(self,name : str,optimisation_inputs : OptimisationInputs,herd : MooseHerd,cost_function : CostFunction,data_filter = None,fused_read = False):
         """Class to contain everything needed for an optimization run 
         with moose. Should be pickle-able.
 
@@ -60,17 +116,25 @@ class MooseOptimisationRun():
             herd (MooseHerd): MooseHerd instance for the run.
             costfunction (CostFunction): CostFunction instance should operate on data or sensitivities as required.
             data_filter : Instance of data filter class or None.
+            fused_read (bool) : Default False. If True the cost function workers read, convert, filter
+                and score each output themselves, only the costs come back to this process.
         """
         self._name = name
         self._herd = herd
         self._optimisation_inputs = optimisation_inputs
         self._cost_function = cost_function
         self._data_filter = data_filter
+        self._fused_read = fused_read
         self._reader = cost_function._reader # Data reader 
         
         # Set up problem
+        n_ieq_constr = len(optimisation_inputs._parameter_constraints)
+        if optimisation_inputs._run_type == 'standard':
+            n_ieq_constr += self._cost_function.n_ieq_constraints
         self._problem = Problem(n_var=optimisation_inputs._n_var,
                   n_obj=self._cost_function._n_obj,
+                  n_ieq_constr=n_ieq_constr,
+                  n_eq_constr=self._cost_function.n_eq_constraints if optimisation_inputs._run_type == 'standard' else 0,
                   xl=optimisation_inputs._bounds[0],
                   xu=optimisation_inputs._bounds[1])
                
@@ -79,16 +143,14 @@ class MooseOptimisationRun():
 
         # Get output reader
         self.sweep_reader = SweepReader(herd._dir_manager,num_para_read=4)
+        self.assign_parameter_list()
         
     def assign_parameter_list(self):
         """Iterate through the herder modifiers and work out where each parameter goes.
+        Compiles the column plan used to convert populations for the herd.
         """
-        parameter_assignment = []
-        for modifier in self._herd._modifiers:
-            temp_params = [x for x in modifier._vars.keys()]
-            parameter_assignment.append([x for x in temp_params if x in self._optimisation_inputs._opt_parameters])
-        
-        self._parameter_assignment = parameter_assignment
+        self._parameter_plan = ParameterPlan.from_herd(self._optimisation_inputs._opt_parameters,self._herd)
+        self._parameter_assignment = self._parameter_plan.get_assignment()
 
     def run(self,num_its):
         """Run the optimization for n_its number of generations.
@@ -115,8 +177,16 @@ class MooseOptimisationRun():
             #Get parameters
             pop = self._optimisation_inputs._algorithm.ask()
             x = pop.get("X")
+            G_param, feasible = self._optimisation_inputs.evaluate_parameter_constraints(x)
+            if not np.all(feasible):
+                print('       {} of {} candidates are infeasible, not run'.format(np.sum(~feasible),x.shape[0]))
+                print('------------------------------------------------')
+            out = dict()
             
-            if self._optimisation_inputs._run_type == 'standard':
+            if self._optimisation_inputs._run_type == 'standard' and not np.any(feasible):
+                costs = np.empty((0,))
+
+            elif self._optimisation_inputs._run_type == 'standard':
 
                 self._herd._dir_manager.clear_dirs()
                 self._herd._dir_manager.create_dirs()
@@ -127,103 +197,100 @@ class MooseOptimisationRun():
                 
                 # Convert x to list of dict
                 # Need to check from the herder what is running what. i.e. what should the format be 
-                para_vars = []
-                for i in range(x.shape[0]):
-                    sub_vars = []
-                    p_no = 0
-                    for param_list in self._parameter_assignment:
-                        if param_list:
-                            para_dict = dict()
-                            for j,key in enumerate(param_list):
-                                para_dict[key] = x[i,p_no]
-                                p_no+=1
-                        else:
-                            para_dict = None
-                        sub_vars.append(para_dict)
-                    para_vars.append(sub_vars)
+                para_vars = self._parameter_plan.to_sweep(x[feasible])
                 
 
-                self._herd.run_para(para_vars)
+                output_files = self._herd.run_para(para_vars)
                 print('        Run time = {:.2f} seconds.'.format(self._herd.get_sweep_time()))
                 print('------------------------------------------------')
-                # Read in moose results and get cost. 
-                print('                Reading Data                    ')
-                print('------------------------------------------------')
-                
-                #output_files = self.sweep_reader.read_all_output_keys()
-                data_list = self.sweep_reader.read_results_sequential()
-                # Convert data list to SpatialData
-                spatial_data_list = []
-                for data in data_list:
-                  spatial_data_list.append(simdata_to_spatialdata(data))
-                
-                # Run Data filter, if there is one.
-                if self._data_filter is not None:
-                    print('             Running Data Filter                ')
+
+                if self._fused_read:
+                    print('       Reading Data and Calculating Objectives  ')
+                    print('------------------------------------------------')
+                    loader = SpatialDataLoader(self._data_filter)
+                    costs = np.array(self._cost_function.evaluate_outputs_parallel(output_files,loader))
+                else:
+                    # Read in moose results and get cost. 
+                    print('                Reading Data                    ')
+                    print('------------------------------------------------')
+                    
+                    #output_files = self.sweep_reader.read_all_output_keys()
+                    data_list = self.sweep_reader.read_results_sequential()
+                    # Convert data list to SpatialData
+                    spatial_data_list = []
+                    for data in data_list:
+                      spatial_data_list.append(simdata_to_spatialdata(data))
+                    
+                    # Run Data filter, if there is one.
+                    filtered_data_list = spatial_data_list
+                    if self._data_filter is not None:
+                        print('             Running Data Filter                ')
+                        print('------------------------------------------------')
+                        filtered_data_list = []
+                        for spatial_data in spatial_data_list:
+                            filtered_data_list.append(self._data_filter.run_filter(spatial_data))
+
+                    print('            Calculating Objectives              ')
                     print('------------------------------------------------')
-                    filtered_data_list = []
-                    for spatial_data in spatial_data_list:
-                        filtered_data_list.append(self._data_filter.run_filter(spatial_data))
 
-                print('            Calculating Objectives              ')
-                print('------------------------------------------------')
+                    costs = np.array(self._cost_function.evaluate_parallel(filtered_data_list))
 
-                costs = np.array(self._cost_function.evaluate_parallel(filtered_data_list))
-                
-                F = []
-                for i in range(costs.shape[1]):
-                    F.append(costs[:,i])
+            if self._optimisation_inputs._run_type == 'standard':
+                # Infeasible candidates get a penalty cost, their simulation constraints are left at 0
+                results = np.zeros((x.shape[0],self._cost_function._n_obj+self._cost_function.n_ieq_constraints
+                                    +self._cost_function.n_eq_constraints))
+                results[:,:self._cost_function._n_obj] = 1E6
+                if costs.size:
+                    results[feasible] = costs
+                F, G, H = self._cost_function.split_results(results)
+                out['F'] = F
+                if G is not None:
+                    out['G'] = G
+                if H is not None:
+                    out['H'] = H
             
             elif self._optimisation_inputs._run_type == 'sensitivity':
                 # Sensitivity based run
-                all_costs = np.empty(x.shape[0]) 
-                for i in range(x.shape[0]):
-                    self._herd._dir_manager.clear_dirs()
-                    self._herd._dir_manager.create_dirs()
-                    #Check params are valid
-                    if x[i][0] + x[i][1] < 1:
-                        all_costs[i]=1000
-                        continue
-                    print('Populate sweep Parameters')
-                    sweep_params = list([])
-                    
+                # Every candidate and perturbation is run in one sweep so no slots sit idle.
+                base_params = self._optimisation_inputs._base_params
+                n_sims = 1 + len(base_params)
+                all_costs = np.full(x.shape[0],1000.)
+                valid = np.flatnonzero(feasible)
+
+                print('Populate sweep Parameters')
+                sweep_params = list([])
+                for i in valid:
                     # Assumes there's a neml2 input for now...
                     # Could be the case that there's 2 modifiers, one for gmsh and one for moose
                     # Easy fix would just be to check # of input modifiers in herd, but seems lazy
-                    gmsh_params = dict()
-                    for j,key in enumerate(self._optimisation_inputs._parameter_space):
-                        gmsh_params[key] = x[i,j]
-                    #gmsh_params = {'p0':x[i][0],'p1':x[i][1]}
-                    sweep_params.append([gmsh_params,None,self._optimisation_inputs._base_params])
-                    for p in self._optimisation_inputs._base_params:
-                        new_dict = self._optimisation_inputs._base_params.copy()
-                        new_dict[p] = self._optimisation_inputs._base_params[p]*1.1
+                    gmsh_params = dict(zip(self._optimisation_inputs._parameter_space,x[i].tolist()))
+                    sweep_params.append([gmsh_params,None,base_params])
+                    for p in base_params:
+                        new_dict = base_params.copy()
+                        new_dict[p] = base_params[p]*1.1
                         sweep_params.append([gmsh_params,None,new_dict])
-                    
-                    print(sweep_params)
-                    #print('Run the herd')
+
+                if sweep_params:
+                    self._herd._dir_manager.clear_dirs()
+                    self._herd._dir_manager.create_dirs()
                     self._herd.run_para(sweep_params)
+                    print('        Run time = {:.2f} seconds.'.format(self._herd.get_sweep_time()))
                     data_list = self.sweep_reader.read_results_sequential()
-                    
+
                     print('Calculate costs')
-                    base_file = simdata_to_spatialdata(data_list[0])
-                    base_file.get_equivalent_strain('mechanical_strain')
-
-                    sens = []
-                    for simdata in data_list[1:]:
-                        alt_file = simdata_to_spatialdata(simdata)
-                        alt_file.get_equivalent_strain('mechanical_strain')
-                        sens.append(base_file.data_fields['equiv_strain'].data[:,0,-1]-alt_file.data_fields['equiv_strain'].data[:,0,-1])
-                    
-                    sens = np.array(sens)
-                    
-                    mean_sens = np.mean(np.abs(sens),axis=1)
-                    cost = -np.sum(mean_sens/np.max(mean_sens))
-                    all_costs[i] = cost 
-                    F=all_costs.tolist()    
+                    for k,i in enumerate(valid):
+                        strains = []
+                        for simdata in data_list[k*n_sims:(k+1)*n_sims]:
+                            spatial_data = simdata_to_spatialdata(simdata)
+                            spatial_data.get_equivalent_strain('mechanical_strain')
+                            strains.append(spatial_data.data_fields['equiv_strain'].data[:,0,-1])
+                        all_costs[i] = sensitivity_cost(np.array(strains))
+                out['F'] = all_costs[:,None]
 
             # Give the problem the updated costs. 
-            static = StaticProblem(self._problem,F=F)
+            if G_param.shape[1]:
+                out['G'] = np.hstack((out['G'],G_param)) if 'G' in out else G_param
+            static = StaticProblem(self._problem,**out)
             self._algorithm.evaluator.eval(static,pop)
             self._algorithm.tell(infills=pop)
             self.backup()
@@ -259,13 +326,7 @@ class MooseOptimisationRun():
         
         moose_vars = [self._herd._moose_modifier.get_vars()] 
 
-        para_vars = list()
-        para_names = [t for t in self._parameter_space.keys()]
-        for i in range(x.shape[0]):
-            para_dict = dict()
-            for j in range(len(para_names)):
-                para_dict[para_names[j]] = x[i,j]
-            para_vars.append(para_dict)
+        para_vars = self._parameter_plan.to_dicts(x)
         
         print('**** Running Selected Models ****')
         temp_herd.run_para(moose_vars,para_vars)  
@@ -292,7 +353,10 @@ class MooseOptimisationRun():
         else:
             print('Algorithm terminated.')
         print('------------------------------------------------')
-        if len(X.shape)==1:
+        if X is None:
+            print('         No feasible solution found yet         ')
+            print('------------------------------------------------')
+        elif len(X.shape)==1:
             print('      Single Objective Optimisation Result      ')
             print('------------------------------------------------')
             outstring = 'Parameters:\n'
@@ -391,7 +455,10 @@ class MooseOptimisationRun():
             else:
                 f.write('Algorithm terminated.\n')
             f.write('------------------------------------------------\n')
-            if len(X.shape)==1:
+            if X is None:
+                f.write('         No feasible solution found yet         \n')
+                f.write('------------------------------------------------\n')
+            elif len(X.shape)==1:
                 f.write('      Single Objective Optimisation Result      \n')
                 f.write('------------------------------------------------\n')
                 outstring = 'Parameters:\n'
@@ -441,7 +508,10 @@ class MooseOptimisationRun():
         else:
             mega_string +='Algorithm terminated.\n'
         mega_string +='------------------------------------------------\n'
-        if len(X.shape)==1:
+        if X is None:
+            mega_string +='         No feasible solution found yet         \n'
+            mega_string +='------------------------------------------------\n'
+        elif len(X.shape)==1:
             mega_string +='      Single Objective Optimisation Result      \n'
             mega_string +='------------------------------------------------\n'
             outstring = 'Parameters:\n'
@@ -0,0 +1,90 @@
+#
+# Mapping of candidate parameter arrays onto the herd's input modifiers.
+#
+import numpy as np
+
+
+class ParameterPlan():
+    """Column index plan mapping the optimised parameters onto the herd's
+    modifiers. Built once per run, then whole populations are split into one
+    column block per modifier with fancy indexing. Dicts are only built when
+    the sweep is handed to the herd.
+    """
+
+    def __init__(self,opt_parameters,modifier_parameters):
+        """
+        Args:
+            opt_parameters (list): Names of the optimised parameters, in the order of the columns of x.
+            modifier_parameters (list): For each modifier, the names of the variables it can modify.
+        """
+        self._opt_parameters = list(opt_parameters)
+        self._names = []
+        self._columns = []
+        for parameters in modifier_parameters:
+            names = [p for p in parameters if p in self._opt_parameters]
+            self._names.append(names)
+            if names:
+                self._columns.append(np.array([self._opt_parameters.index(p) for p in names]))
+            else:
+                self._columns.append(None)
+
+    @classmethod
+    def from_herd(cls,opt_parameters,herd):
+        """Build the plan from the variables in the herd's input modifiers.
+
+        Args:
+            opt_parameters (list): Names of the optimised parameters, in the order of the columns of x.
+            herd (MooseHerd): Herd to run the candidates with.
+
+        Returns:
+            ParameterPlan: The plan.
+        """
+        return cls(opt_parameters,[modifier._vars.keys() for modifier in herd._modifiers])
+
+    def get_assignment(self):
+        """
+        Returns:
+            list: Names of the optimised parameters going to each modifier.
+        """
+        return [list(names) for names in self._names]
+
+    def blocks(self,x):
+        """Split candidates into one block of columns per modifier.
+
+        Args:
+            x (np.ndarray): Candidate parameters, one row per candidate.
+
+        Returns:
+            list: Array of shape (n candidates, n modifier parameters) per modifier, None if it has no optimised parameters.
+        """
+        x = np.atleast_2d(x)
+        return [None if columns is None else x[:,columns] for columns in self._columns]
+
+    def to_sweep(self,x):
+        """Convert candidates into the list of lists of dicts the herd expects.
+
+        Args:
+            x (np.ndarray): Candidate parameters, one row per candidate.
+
+        Returns:
+            list: Sweep variables to pass to the herd, one dict (or None) per modifier.
+        """
+        x = np.atleast_2d(x)
+        per_modifier = []
+        for names,block in zip(self._names,self.blocks(x)):
+            if block is None:
+                per_modifier.append([None]*x.shape[0])
+            else:
+                per_modifier.append([dict(zip(names,row)) for row in block.tolist()])
+        return [list(sub_vars) for sub_vars in zip(*per_modifier)]
+
+    def to_dicts(self,x):
+        """Convert candidates into one dict of every optimised parameter each.
+
+        Args:
+            x (np.ndarray): Candidate parameters, one row per candidate.
+
+        Returns:
+            list: Dict per candidate.
+        """
+        return [dict(zip(self._opt_parameters,row)) for row in np.atleast_2d(x).tolist()]
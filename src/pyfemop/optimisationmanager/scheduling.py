@@ -0,0 +1,296 @@
+#
+# Helpers for running the herd without a hard generation barrier.
+#
+import copy
+import multiprocessing as mp
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import as_completed
+from concurrent.futures import wait, FIRST_COMPLETED
+
+import numpy as np
+from pymoo.problems.static import StaticProblem
+
+# Slot number of the current worker process, set by the pool initializer.
+_slot = None
+
+def _init_slot(slots):
+    """Pool initializer, takes a fixed slot number for the life of the worker.
+
+    Args:
+        slots (mp.Queue): Queue of free slot numbers.
+    """
+    global _slot
+    _slot = slots.get()
+
+def _slot_name():
+    return 'Slot-{}'.format(_slot)
+
+def run_in_slot(herd,sim_iter,var_list):
+    """Run one simulation chain in the working directory owned by this worker.
+    The herd picks its directory from the process name, which is not stable
+    across pools, so the name is pinned to the worker's slot number.
+
+    Args:
+        herd (MooseHerd): Herd to run.
+        sim_iter (int): Simulation iteration, used to name the files.
+        var_list (list): One dict (or None) per modifier.
+
+    Returns:
+        list: Output paths of the simulation chain.
+    """
+    herd._get_process_name = _slot_name
+    return herd.run_once(sim_iter,var_list)
+
+def slot_executor(n_slots):
+    """Create a process pool where every worker owns one herd working directory.
+
+    Args:
+        n_slots (int): Number of workers. Should not exceed the number of
+            directories in the herd's DirectoryManager.
+
+    Returns:
+        ProcessPoolExecutor: Executor to submit run_in_slot to.
+    """
+    slots = mp.Queue()
+    for i in range(n_slots):
+        slots.put(i+1)
+    return ProcessPoolExecutor(n_slots,initializer=_init_slot,initargs=(slots,))
+
+def run_streamed(herd,var_sweep,submit_score):
+    """Run a sweep with the herd and score each output as soon as its
+    simulation finishes, while the rest of the sweep is still running.
+    The sweep is logged by the herd in the same way as run_para.
+
+    Args:
+        herd (MooseHerd): Herd to run.
+        var_sweep (list): Sweep variables as passed to herd.run_para.
+        submit_score (function): Takes the output paths of one simulation chain, starts
+            scoring them on another worker and returns an AsyncResult, e.g. CostFunction.submit_output.
+
+    Returns:
+        list: Scores for each simulation, in sweep order.
+    """
+    sweep_start_time = herd._start_sweep(var_sweep)
+    output_files = [None]*len(var_sweep)
+
+    with slot_executor(herd._n_para_sims) as sim_pool:
+        sims = dict()
+        for i,vv in enumerate(var_sweep):
+            sims[sim_pool.submit(run_in_slot,herd,herd._sim_iter+i,vv)] = i
+
+        scores = dict()
+        for future in as_completed(sims):
+            i = sims[future]
+            output_files[i] = future.result()
+            scores[i] = submit_score(output_files[i])
+
+        results = [scores[i].get() for i in range(len(var_sweep))]
+
+    herd._end_sweep(sweep_start_time,output_files)
+    return results
+
+def run_pipelined(herd,var_sweep,n_mesh_workers=1,n_mesh_stages=1,submit_score=None,gate=None,rejected_score=None):
+    """Run a sweep as a two stage pipeline: the first runners in the chain
+    (e.g. gmsh) on a small meshing pool and the rest (e.g. MOOSE) on a solver
+    pool of herd._n_para_sims. Candidate k+1 is meshed while candidate k
+    solves, so the solvers don't wait for meshes.
+
+    Each candidate holds one of the herd's run directories from the start of
+    meshing until its solve finishes. With at least n_para_sims + n_mesh_workers
+    directories meshing never waits for a free directory. The runners only
+    start subprocesses, so both pools are threads, each job running a copy
+    of its runner. The sweep is logged by the herd in the same way as run_para.
+
+    Args:
+        herd (MooseHerd): Herd to run.
+        var_sweep (list): Sweep variables as passed to herd.run_para.
+        n_mesh_workers (int, optional): Size of the meshing pool. Defaults to 1.
+        n_mesh_stages (int, optional): Number of runners at the start of the chain in the meshing stage. Defaults to 1.
+        submit_score (function, optional): Takes the output paths of one simulation chain and returns
+            an AsyncResult, e.g. CostFunction.submit_output, to score each output as soon as it is solved.
+            Defaults to None.
+        gate (MeshQualityGate, optional): Checks the mesh made from the first runner's input before
+            solving. Rejected candidates are not solved, their solve outputs are None. Defaults to None.
+        rejected_score (object, optional): Score of rejected candidates when submit_score is given. Defaults to None.
+
+    Returns:
+        list: Output paths of each simulation chain in sweep order, or the scores if submit_score is given.
+    """
+    n_dirs = herd._dir_manager._n_dirs
+    if n_dirs < herd._n_para_sims + n_mesh_workers:
+        print('Only {} run directories, {} are needed to keep every solver busy.'.format(
+            n_dirs,herd._n_para_sims + n_mesh_workers))
+
+    sweep_start_time = herd._start_sweep(var_sweep)
+    free_dirs = queue.Queue()
+    for i in range(n_dirs):
+        free_dirs.put(i)
+    # Input modifiers keep the variables they were given, so render one candidate at a time
+    render_lock = threading.Lock()
+
+    def mesh(i):
+        dir_num = free_dirs.get()
+        try:
+            run_dir = herd._dir_manager.get_run_dir(dir_num)
+            run_num = herd._get_run_num(herd._sim_iter+i,str(dir_num+1))
+            run_files = []
+            with render_lock:
+                for ii,mm in enumerate(herd._modifiers):
+                    ext = mm.get_input_file().suffix
+                    run_files.append(run_dir / (herd._input_names[ii]+'-'+run_num+ext))
+                    herd._mod_input(mm,var_sweep[i][ii],run_files[ii])
+            outputs = [herd._run(copy.copy(rr),run_files[ii]) for ii,rr in enumerate(herd._runners[:n_mesh_stages])]
+            passed = True
+            if gate is not None:
+                passed, stats = gate.check_geo(run_files[0])
+                if not passed:
+                    print('Candidate {} rejected before solving, mesh statistics: {}'.format(i,stats))
+                    free_dirs.put(dir_num)
+        except BaseException:
+            free_dirs.put(dir_num)
+            raise
+        return passed, dir_num, run_files, outputs
+
+    def solve(dir_num,run_files,outputs):
+        try:
+            for ii in range(n_mesh_stages,len(herd._runners)):
+                outputs.append(herd._run(copy.copy(herd._runners[ii]),run_files[ii]))
+        finally:
+            free_dirs.put(dir_num)
+        return outputs
+
+    output_files = [None]*len(var_sweep)
+    scores = dict()
+    with ThreadPoolExecutor(n_mesh_workers) as mesh_pool, ThreadPoolExecutor(herd._n_para_sims) as solve_pool:
+        meshes = dict()
+        for i in range(len(var_sweep)):
+            meshes[mesh_pool.submit(mesh,i)] = i
+
+        # One loop over both stages, so solved outputs are scored while later candidates still mesh
+        solves = dict()
+        pending = set(meshes)
+        while pending:
+            done, pending = wait(pending,return_when=FIRST_COMPLETED)
+            for future in done:
+                if future in meshes:
+                    i = meshes[future]
+                    passed, dir_num, run_files, outputs = future.result()
+                    if passed:
+                        solve_future = solve_pool.submit(solve,dir_num,run_files,outputs)
+                        solves[solve_future] = i
+                        pending.add(solve_future)
+                    else:
+                        output_files[i] = outputs + [None]*(len(herd._runners)-n_mesh_stages)
+                    continue
+                i = solves[future]
+                output_files[i] = future.result()
+                if submit_score is not None:
+                    scores[i] = submit_score(output_files[i])
+
+    results = output_files
+    if submit_score is not None:
+        results = [scores[i].get() if i in scores else rejected_score for i in range(len(var_sweep))]
+
+    herd._end_sweep(sweep_start_time,output_files)
+    return results
+
+
+class AskTellAdapter():
+    """Hands out the candidates of a pymoo algorithm one at a time and tells
+    the algorithm about each batch as soon as all its members are evaluated.
+
+    With a steady-state algorithm (e.g. GA with n_offsprings=1) every result is
+    told as it arrives. With larger offspring batches up to max_batches are
+    asked for at once, so a free slot never waits for a whole batch to finish.
+    """
+
+    def __init__(self,algorithm,problem,max_batches=2,split_results=None):
+        """
+        Args:
+            algorithm (pymoo algorithm): Algorithm, already setup.
+            problem (Problem): Problem the algorithm was setup with.
+            max_batches (int, optional): Maximum number of batches in flight. Defaults to 2.
+            split_results (function, optional): Turns the told results of a batch into the F, G and H
+                dict passed to StaticProblem. Defaults to None, results are the objectives.
+        """
+        self._algorithm = algorithm
+        self._problem = problem
+        self._max_batches = max_batches
+        self._split_results = split_results
+        self._batches = dict()
+        self._queue = []
+        self._n_batches = 0
+
+    def can_ask(self):
+        """Whether a new candidate can be handed out right now.
+
+        Returns:
+            bool: True if ask() will return a candidate.
+        """
+        if self._queue:
+            return True
+        if not self._algorithm.has_next():
+            return False
+        # Offspring can't be created until the initial population has been told.
+        if not self._algorithm.is_initialized and self._batches:
+            return False
+        return len(self._batches) < self._max_batches
+
+    def ask(self):
+        """Get the next candidate to evaluate.
+
+        Returns:
+            tuple: (batch_id, index, x) or None if nothing can be asked for yet.
+        """
+        if not self._queue:
+            if not self.can_ask():
+                return None
+            pop = self._algorithm.ask()
+            if pop is None or len(pop) == 0:
+                return None
+            batch_id = self._n_batches
+            self._n_batches += 1
+            self._batches[batch_id] = [pop,
+                                       [None]*len(pop),
+                                       np.zeros(len(pop),dtype=bool)]
+            self._queue.extend([(batch_id,i) for i in range(len(pop))])
+
+        batch_id, index = self._queue.pop(0)
+        return batch_id, index, self._batches[batch_id][0][index].X
+
+    def tell(self,batch_id,index,f):
+        """Report the objectives of one candidate.
+
+        Args:
+            batch_id (int): Batch id as returned by ask().
+            index (int): Index in the batch as returned by ask().
+            f (list): Objective values, or results in the format split_results expects.
+
+        Returns:
+            bool: True if this completed the batch and the algorithm was told.
+        """
+        pop, F, done = self._batches[batch_id]
+        F[index] = f
+        done[index] = True
+        if not np.all(done):
+            return False
+
+        del self._batches[batch_id]
+        if not self._algorithm.has_next():
+            # Terminated while this batch was running
+            return False
+        if self._split_results is None:
+            static = StaticProblem(self._problem,F=np.array(F))
+        else:
+            static = StaticProblem(self._problem,**self._split_results(np.array(F)))
+        self._algorithm.evaluator.eval(static,pop)
+        self._algorithm.tell(infills=pop)
+        return True
+
+    def n_pending(self):
+        """Number of candidates handed out or queued but not yet told.
+        """
+        return int(sum([np.sum(~b[2]) for b in self._batches.values()]))
@@ -0,0 +1,147 @@
+#
+# Shared memory transport of simulation data to pool workers.
+#
+import copy
+import dataclasses
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Offsets of arrays in a block are rounded up to this many bytes.
+_ALIGN = 64
+
+# Blocks attached by this process, kept open while views into them exist.
+_attached = dict()
+
+
+class SharedArrayRef():
+    """Lightweight handle to an array published in a shared memory block.
+    Pickles to a few dozen bytes whatever the size of the array.
+    """
+    __slots__ = ('name','offset','shape','dtype')
+
+    def __init__(self,name,offset,shape,dtype):
+        self.name = name
+        self.offset = offset
+        self.shape = shape
+        self.dtype = dtype
+
+    def __getstate__(self):
+        return (self.name,self.offset,self.shape,self.dtype)
+
+    def __setstate__(self,state):
+        self.name,self.offset,self.shape,self.dtype = state
+
+
+def _map_arrays(obj,function):
+    """Rebuild obj with function applied to every array or SharedArrayRef it holds.
+    Goes through dicts, lists, tuples and dataclasses (e.g. SimData), other
+    objects are returned unchanged.
+    """
+    if isinstance(obj,(np.ndarray,SharedArrayRef)):
+        return function(obj)
+    if isinstance(obj,dict):
+        return {key: _map_arrays(value,function) for key,value in obj.items()}
+    if isinstance(obj,list):
+        return [_map_arrays(value,function) for value in obj]
+    if isinstance(obj,tuple):
+        return tuple([_map_arrays(value,function) for value in obj])
+    if dataclasses.is_dataclass(obj) and not isinstance(obj,type):
+        new_obj = copy.copy(obj)
+        for field in dataclasses.fields(obj):
+            setattr(new_obj,field.name,_map_arrays(getattr(obj,field.name),function))
+        return new_obj
+    return obj
+
+
+class SharedArrayStore():
+    """Publishes the numeric arrays held in simulation data into a single
+    shared memory block. The published copies hold SharedArrayRef handles in
+    place of the arrays, so sending them to workers doesn't copy the data.
+    """
+
+    def __init__(self,min_bytes=1024):
+        """
+        Args:
+            min_bytes (int, optional): Arrays smaller than this are left in place. Defaults to 1024.
+        """
+        self._min_bytes = min_bytes
+        self._shm = None
+
+    def _shareable(self,array):
+        return (isinstance(array,np.ndarray) and not array.dtype.hasobject
+                and array.nbytes >= self._min_bytes)
+
+    def publish(self,obj):
+        """Copy the arrays in obj into a new shared memory block.
+
+        Args:
+            obj (object): Data to publish, usually a list of SimData lists.
+
+        Returns:
+            object: Copy of obj with shared arrays replaced by SharedArrayRef.
+        """
+        self.close()
+        sizes = []
+        def measure(array):
+            if self._shareable(array):
+                sizes.append(array.nbytes)
+            return array
+        _map_arrays(obj,measure)
+        if not sizes:
+            return obj
+
+        total = sum([-(-size//_ALIGN)*_ALIGN for size in sizes])
+        self._shm = shared_memory.SharedMemory(create=True,size=total)
+        offset = [0]
+        def share(array):
+            if not self._shareable(array):
+                return array
+            array = np.ascontiguousarray(array)
+            view = np.ndarray(array.shape,array.dtype,buffer=self._shm.buf,offset=offset[0])
+            view[...] = array
+            ref = SharedArrayRef(self._shm.name,offset[0],array.shape,array.dtype.str)
+            offset[0] += -(-array.nbytes//_ALIGN)*_ALIGN
+            return ref
+        return _map_arrays(obj,share)
+
+    def close(self):
+        """Release the shared memory block. Workers must be done with it.
+        """
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+
+def _release_attached(keep):
+    for name in list(_attached.keys()):
+        if name == keep:
+            continue
+        try:
+            _attached[name].close()
+        except BufferError:
+            # Views into the block are still alive, try again next time.
+            continue
+        del _attached[name]
+
+def attach(obj):
+    """Replace the SharedArrayRef handles in obj with read-only views into
+    shared memory. Blocks from earlier publishes are released.
+
+    Args:
+        obj (object): Data as returned by SharedArrayStore.publish.
+
+    Returns:
+        object: Data holding read-only numpy views.
+    """
+    def view(ref):
+        if not isinstance(ref,SharedArrayRef):
+            return ref
+        if ref.name not in _attached:
+            _release_attached(ref.name)
+            _attached[ref.name] = shared_memory.SharedMemory(name=ref.name)
+        array = np.ndarray(ref.shape,np.dtype(ref.dtype),buffer=_attached[ref.name].buf,offset=ref.offset)
+        array.flags.writeable = False
+        return array
+    return _map_arrays(obj,view)
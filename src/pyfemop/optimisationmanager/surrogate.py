@@ -0,0 +1,169 @@
+#
+# Surrogate model used to decide which candidates of a generation are simulated.
+#
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve, solve_triangular
+from scipy.spatial.distance import cdist
+
+
+class GaussianProcess():
+    """Gaussian process regression with a squared exponential kernel, shared
+    by every output column. The length scale is picked from a grid by the
+    log marginal likelihood each time the model is fitted.
+    """
+
+    def __init__(self,length_scales=None,noise=1E-6):
+        """
+        Args:
+            length_scales (np.ndarray, optional): Candidate length scales, for inputs scaled to [0,1].
+                Defaults to None, 12 values from 0.03 to 3.
+            noise (float, optional): Variance added to the diagonal, relative to the standardised outputs. Defaults to 1E-6.
+        """
+        if length_scales is None:
+            length_scales = np.logspace(-1.5,0.5,12)
+        self._length_scales = np.asarray(length_scales,dtype=float)
+        self._noise = noise
+        self._X = None
+
+    def fit(self,X,Y):
+        """Fit the model.
+
+        Args:
+            X (np.ndarray): Inputs, shape (n points, n inputs).
+            Y (np.ndarray): Outputs, shape (n points, n outputs).
+        """
+        X = np.asarray(X,dtype=float)
+        Y = np.asarray(Y,dtype=float).reshape(X.shape[0],-1)
+        self._y_mean = Y.mean(axis=0)
+        self._y_std = Y.std(axis=0)
+        self._y_std[self._y_std == 0] = 1.
+        Z = (Y - self._y_mean)/self._y_std
+        d2 = cdist(X,X,'sqeuclidean')
+
+        best = None
+        for length_scale in self._length_scales:
+            K = np.exp(-0.5*d2/length_scale**2) + self._noise*np.eye(X.shape[0])
+            try:
+                factor = cho_factor(K,lower=True)
+            except np.linalg.LinAlgError:
+                continue
+            alpha = cho_solve(factor,Z)
+            lml = -0.5*np.sum(Z*alpha) - Z.shape[1]*np.sum(np.log(np.diag(factor[0])))
+            if best is None or lml > best[0]:
+                best = (lml,length_scale,factor,alpha)
+        if best is None:
+            raise np.linalg.LinAlgError('Surrogate covariance is not positive definite for any length scale.')
+        _, self._length_scale, self._factor, self._alpha = best
+        self._X = X
+
+    def predict(self,X):
+        """Predict the outputs and their uncertainty.
+
+        Args:
+            X (np.ndarray): Inputs, shape (n points, n inputs).
+
+        Returns:
+            tuple: Mean and standard deviation, shape (n points, n outputs).
+        """
+        k = np.exp(-0.5*cdist(np.asarray(X,dtype=float),self._X,'sqeuclidean')/self._length_scale**2)
+        mean = k @ self._alpha*self._y_std + self._y_mean
+        v = solve_triangular(self._factor[0],k.T,lower=True)
+        variance = np.clip(1. - np.sum(v**2,axis=0),0.,None)
+        std = np.sqrt(variance)[:,None]*self._y_std
+        return mean, std
+
+
+class SurrogateScreen():
+    """Pre-screens a generation with a surrogate fitted to every candidate
+    simulated so far. Only the candidates with the best lower confidence
+    bound (predicted cost less kappa standard deviations, so promising or
+    uncertain) on at least one objective are simulated, the rest are given
+    the surrogate's prediction.
+    """
+
+    def __init__(self,fraction=0.5,kappa=2.,min_archive=10,max_archive=500,penalty=1E6,model=None):
+        """
+        Args:
+            fraction (float, optional): Fraction of each generation that is simulated. Defaults to 0.5.
+            kappa (float, optional): Weight of the uncertainty in the lower confidence bound. Defaults to 2.
+            min_archive (int, optional): Every candidate is simulated until this many have been. Defaults to 10.
+            max_archive (int, optional): Only the most recent simulations are used to fit. Defaults to 500.
+            penalty (float, optional): Results with an objective at or above this are failed runs
+                and are left out of the fit. Defaults to 1E6.
+            model (GaussianProcess, optional): Surrogate model. Defaults to None, a GaussianProcess.
+        """
+        if model is None:
+            model = GaussianProcess()
+        self._fraction = fraction
+        self._kappa = kappa
+        self._min_archive = min_archive
+        self._max_archive = max_archive
+        self._penalty = penalty
+        self._model = model
+        self._X = None
+        self._results = None
+        self._fitted = False
+
+    def add(self,x,results):
+        """Add simulated candidates to the archive.
+
+        Args:
+            x (np.ndarray): Candidate parameters scaled to [0,1], one row per candidate.
+            results (np.ndarray): Their results, objectives first.
+        """
+        x = np.atleast_2d(x)
+        results = np.asarray(results,dtype=float).reshape(x.shape[0],-1)
+        if self._X is None:
+            self._X = x
+            self._results = results
+        else:
+            self._X = np.vstack((self._X,x))[-self._max_archive:]
+            self._results = np.vstack((self._results,results))[-self._max_archive:]
+        self._fitted = False
+
+    def n_archive(self):
+        """Number of simulated candidates in the archive.
+        """
+        return 0 if self._X is None else self._X.shape[0]
+
+    def _fit(self):
+        ok = np.all(np.isfinite(self._results),axis=1) & np.all(self._results < self._penalty,axis=1)
+        self._model.fit(self._X[ok],self._results[ok])
+        self._fitted = True
+
+    def predict(self,x):
+        """Predict the results of candidates.
+
+        Args:
+            x (np.ndarray): Candidate parameters scaled to [0,1].
+
+        Returns:
+            tuple: Mean and standard deviation of each result.
+        """
+        if not self._fitted:
+            self._fit()
+        return self._model.predict(np.atleast_2d(x))
+
+    def select(self,x,n_obj):
+        """Choose the candidates to simulate.
+
+        Args:
+            x (np.ndarray): Candidate parameters scaled to [0,1].
+            n_obj (int): Number of objectives, the first columns of the results.
+
+        Returns:
+            np.ndarray: True for the candidates to simulate.
+        """
+        run = np.ones(x.shape[0],dtype=bool)
+        n_ok = 0 if self._results is None else np.sum(np.all(self._results < self._penalty,axis=1))
+        if n_ok < self._min_archive:
+            return run
+
+        mean, std = self.predict(x)
+        lcb = mean[:,:n_obj] - self._kappa*std[:,:n_obj]
+        # Rank on each objective, a candidate is as good as its best rank
+        ranks = np.argsort(np.argsort(lcb,axis=0),axis=0).min(axis=1)
+        n_run = int(np.ceil(self._fraction*x.shape[0]))
+        run[:] = False
+        run[np.argsort(ranks,kind='stable')[:n_run]] = True
+        return run
@@ -0,0 +1,41 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+
+from pyfemop.optimisationmanager.costfunctions import CostFunction
+from pyfemop.optimisationmanager.costfunctions import stack_scalar_data
+from pyfemop.optimisationmanager.costfunctions import min_plastic
+from pyfemop.optimisationmanager.costfunctions import creep_range
+
+def rows():
+    return [{'time':100.,'max_plas_strain':1E-3,'max_creep_strain':0.02,'min_creep_strain':0.01},
+            {'time':50.,'max_plas_strain':2E-3,'max_creep_strain':0.03,'min_creep_strain':0.01},
+            None,
+            {'time':100.,'max_plas_strain':'nan?','max_creep_strain':0.05}]
+
+def test_stack_scalar_data():
+    columns = stack_scalar_data(rows())
+    assert np.allclose(columns['time'][[0,1,3]],[100.,50.,100.])
+    assert np.isnan(columns['time'][2])
+    assert np.isnan(columns['max_plas_strain'][3])
+    assert np.isnan(columns['min_creep_strain'][3])
+
+def test_builtins_mask_failures():
+    columns = stack_scalar_data(rows())
+    assert np.allclose(min_plastic(columns,100.),[1E-3,1E6,1E6,1E6])
+    assert np.allclose(creep_range(columns,100.),[-0.01,1E6,1E6,1E6])
+
+def test_batch_matches_per_simulation():
+    def spread(data,endtime,external_data):
+        if data is None:
+            return 1E6
+        return data['max_creep_strain']*2
+
+    c = CostFunction(None,[min_plastic,creep_range],100.,ineq_constraints=[spread],batch=True)
+    batch = c.evaluate_parallel(rows()[:3])
+    single = [c.evaluate(data) for data in rows()[:3]]
+    assert np.allclose(batch,single)
+    assert np.allclose(np.array(batch)[:,0],[1E-3,1E6,1E6])
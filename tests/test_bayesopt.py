@@ -0,0 +1,74 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+from pymoo.core.problem import Problem
+from pymoo.problems.static import StaticProblem
+from pymoo.core.evaluator import Evaluator
+from pymoo.termination import get_termination
+
+from pyfemop.optimisationmanager.bayesopt import BatchBayesianOptimisation, expected_improvement, parego_scalarise
+
+def run_ask_tell(algorithm,problem,function,n_iter):
+    # Same loop as MooseOptimisationRun.run
+    algorithm.setup(problem,termination=get_termination('n_gen',n_iter),seed=1)
+    sizes = []
+    while algorithm.has_next():
+        pop = algorithm.ask()
+        sizes.append(len(pop))
+        static = StaticProblem(problem,F=function(pop.get('X')))
+        Evaluator().eval(static,pop)
+        algorithm.tell(infills=pop)
+    return sizes
+
+def test_expected_improvement():
+    ei = expected_improvement(np.array([0.,1.,2.,0.]),np.array([1.,1.,1.,0.]),1.)
+    assert ei[0] > ei[1] > ei[2] > 0
+    assert ei[3] == pytest.approx(1.)
+    assert ei[1] == pytest.approx(1/np.sqrt(2*np.pi))
+
+def test_parego_scalarise():
+    F = np.array([[0.,1.],[1.,0.],[0.5,0.5]])
+    y = parego_scalarise(F,np.array([0.5,0.5]),rho=0.)
+    assert y == pytest.approx([0.5,0.5,0.25])
+
+def test_batch_single_objective():
+    problem = Problem(n_var=2,n_obj=1,xl=np.array([-1.,-1.]),xu=np.array([1.,1.]))
+    sphere = lambda x: np.sum((x-0.3)**2,axis=1)[:,None]
+    algorithm = BatchBayesianOptimisation(batch_size=3,n_initial=8)
+    sizes = run_ask_tell(algorithm,problem,sphere,8)
+
+    assert sizes == [8] + [3]*7
+    assert len(algorithm.pop) == 29
+    X = algorithm.pop.get('X')
+    assert np.all(X >= -1) and np.all(X <= 1)
+    # No candidate is proposed twice
+    assert len(np.unique(X,axis=0)) == 29
+    assert algorithm.result().F[0] < 1E-2
+    assert algorithm.result().F[0] < np.min(algorithm.pop.get('F')[:8])
+
+def test_batch_failed_runs():
+    problem = Problem(n_var=2,n_obj=1,xl=np.zeros(2),xu=np.ones(2))
+    def function(x):
+        f = np.sum((x-0.3)**2,axis=1)[:,None]
+        f[x[:,0] > 0.7] = 1E6
+        return f
+    algorithm = BatchBayesianOptimisation(batch_size=2)
+    run_ask_tell(algorithm,problem,function,6)
+    assert algorithm.result().F[0] < 0.05
+
+def test_batch_multi_objective():
+    problem = Problem(n_var=2,n_obj=2,xl=np.zeros(2),xu=np.ones(2))
+    def function(x):
+        return np.column_stack((x[:,0],1-np.sqrt(x[:,0])+x[:,1]**2))
+    algorithm = BatchBayesianOptimisation(batch_size=4)
+    algorithm.set_batch_size(8)
+    run_ask_tell(algorithm,problem,function,6)
+
+    assert algorithm.pop_size == 4
+    front = algorithm.result().F
+    assert front.shape[0] > 3
+    # The front is close to f2 = 1 - sqrt(f1)
+    assert np.median(front[:,1] - (1-np.sqrt(front[:,0]))) < 0.05
@@ -0,0 +1,57 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+
+from pymoo.core.problem import Problem
+from pymoo.algorithms.soo.nonconvex.ga import GA
+from pymoo.termination import get_termination
+
+from pyfemop.optimisationmanager.costfunctions import CostFunction
+from pyfemop.optimisationmanager.scheduling import AskTellAdapter
+
+def objective(data,endtime,external_data):
+    return np.sum(data)
+
+def upper_limit(data,endtime,external_data):
+    return np.max(data) - 2.
+
+def fixed_length(data,endtime,external_data):
+    return len(data) - 3.
+
+def test_evaluate_and_split_results():
+    c = CostFunction(None,[objective],None,ineq_constraints=[upper_limit],eq_constraints=[fixed_length])
+    results = [c.evaluate([1.,2.,3.]),c.evaluate([0.,1.])]
+    assert results[0] == [6.,1.,0.]
+    F, G, H = c.split_results(results)
+    assert F.shape == (2,1)
+    assert np.allclose(G[:,0],[1.,-1.])
+    assert np.allclose(H[:,0],[0.,-1.])
+    assert c.evaluate_objectives([1.,2.,3.]) == [6.]
+
+def test_split_results_no_constraints():
+    c = CostFunction(None,[objective],None)
+    F, G, H = c.split_results([c.evaluate([1.,2.])])
+    assert np.allclose(F,[[3.]])
+    assert G is None and H is None
+
+def test_ask_tell_adapter_constraints():
+    c = CostFunction(None,[objective],None,ineq_constraints=[upper_limit])
+    problem = Problem(n_var=2,n_obj=1,n_ieq_constr=1,xl=np.array([0,0]),xu=np.array([3,3]))
+    algorithm = GA(pop_size=4,n_offsprings=2)
+    algorithm.setup(problem,termination=get_termination('n_gen',3))
+
+    def split_results(results):
+        F, G, H = c.split_results(results)
+        return {'F':F,'G':G}
+    adapter = AskTellAdapter(algorithm,problem,max_batches=1,split_results=split_results)
+
+    initial = [adapter.ask() for i in range(4)]
+    for batch_id,index,x in initial:
+        adapter.tell(batch_id,index,c.evaluate(x))
+    G = algorithm.pop.get('G')
+    X = algorithm.pop.get('X')
+    assert G.shape == (4,1)
+    assert np.allclose(G[:,0],np.max(X,axis=1) - 2.)
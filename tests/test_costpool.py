@@ -0,0 +1,72 @@
+#
+#
+#
+
+import pytest
+import os
+import pickle
+import dill
+
+from pyfemop.optimisationmanager.costfunctions import CostFunction
+
+def value(data,endtime,external_data):
+    return data['value']
+
+def worker_pid(data,endtime,external_data):
+    return os.getpid()
+
+# Only the pool lifecycle is tested on threads here, exodus reads on the
+# thread backend are covered by test_fused.py
+@pytest.mark.parametrize('backend',['process','thread'])
+def test_pool_reused(backend):
+    cost_function = CostFunction(None,[value],None,n_workers=2,backend=backend)
+    try:
+        data_list = [{'value':float(i)} for i in range(5)]
+        assert cost_function.evaluate_parallel(data_list) == [[float(i)] for i in range(5)]
+        pool = cost_function.get_pool()
+        assert cost_function.evaluate_parallel(data_list[::-1]) == [[float(i)] for i in range(5)][::-1]
+        assert cost_function.get_pool() is pool
+    finally:
+        cost_function.shutdown()
+    assert cost_function._pool is None
+
+def test_pool_recreated_after_shutdown():
+    cost_function = CostFunction(None,[value],None,n_workers=2)
+    try:
+        cost_function.evaluate_parallel([{'value':1.}])
+        pool = cost_function.get_pool()
+        cost_function.shutdown()
+        cost_function.shutdown()
+        assert cost_function.evaluate_parallel([{'value':2.}]) == [[2.]]
+        assert cost_function.get_pool() is not pool
+    finally:
+        cost_function.shutdown()
+
+def test_pool_size_cap():
+    assert CostFunction(None,[value],None)._n_workers == (os.cpu_count() or 1)
+    cost_function = CostFunction(None,[worker_pid],None,n_workers=2,chunksize=2)
+    try:
+        pids = cost_function.evaluate_parallel([dict() for i in range(12)])
+        # More candidates than workers, but no more processes than the cap
+        assert len(set([p[0] for p in pids])) <= 2
+        assert os.getpid() not in [p[0] for p in pids]
+        assert cost_function.get_pool()._processes == 2
+    finally:
+        cost_function.shutdown()
+
+@pytest.mark.parametrize('dumps,loads',[(pickle.dumps,pickle.loads),(dill.dumps,dill.loads)])
+def test_pickle_with_live_pool(dumps,loads):
+    cost_function = CostFunction(None,[value],None,n_workers=2)
+    try:
+        cost_function.evaluate_parallel([{'value':1.}])
+        restored = loads(dumps(cost_function))
+        # The copy starts its own pool, the original's keeps working
+        assert restored._pool is None
+        assert cost_function._pool is not None
+        try:
+            assert restored.evaluate_parallel([{'value':3.}]) == [[3.]]
+        finally:
+            restored.shutdown()
+        assert cost_function.evaluate_parallel([{'value':4.}]) == [[4.]]
+    finally:
+        cost_function.shutdown()
@@ -0,0 +1,26 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+
+from pyfemop.mooseutils.csvtail import read_last_row, read_last_rows
+
+def test_read_last_row(tmp_path):
+    csv_file = tmp_path / 'out.csv'
+    lines = ['time,max_stress,label']
+    lines += ['{},{},a'.format(i*0.5,i*2) for i in range(1000)]
+    # Partial line left by a run that is still writing
+    csv_file.write_text('\n'.join(lines) + '\n1000,')
+
+    row = read_last_row(csv_file,block_size=16)
+    assert row == {'time':499.5,'max_stress':1998.,'label':'a'}
+
+    empty_file = tmp_path / 'empty.csv'
+    empty_file.write_text('time,max_stress\n')
+    assert read_last_row(empty_file) is None
+
+    rows = read_last_rows([csv_file,tmp_path / 'missing.csv'])
+    assert rows[0] == row
+    assert rows[1] is None
@@ -0,0 +1,38 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+from mooseherder.simdata import SimData
+
+from pyfemop.mooseutils.dicmapping import DICData, DICMapping, compare_to_dic, get_dic_mapping
+
+def make_mesh():
+    X, Y = np.meshgrid(np.linspace(0,4,5),np.linspace(0,2,3))
+    coords = np.column_stack((X.ravel(),Y.ravel(),np.zeros(X.size)))
+    elements = [[j*5+i,j*5+i+1,j*5+i+6,j*5+i+5] for j in range(2) for i in range(4)]
+    return coords, {'connect1':(np.array(elements)+1).T}
+
+def test_compare_to_dic(tmp_path):
+    coords, connect = make_mesh()
+    time = np.array([0.,1.])
+    disp_y = np.outer(0.1*coords[:,0] - 0.05*coords[:,1],time)
+    data = SimData(time=time,coords=coords,connect=connect,node_vars={'disp_y':disp_y})
+
+    # Last point is just outside the mesh and uses the nearest nodes
+    points = np.array([[0.5,0.5],[3.2,1.7],[2.,1.],[4.1,1.]])
+    measured = 0.1*points[:,0] - 0.05*points[:,1]
+    dic_data = DICData(points,{'disp_y':measured})
+
+    point_data = compare_to_dic(data,dic_data,tmp_path)
+    assert np.allclose(point_data.data_sets[-1]['res_disp_y'][:3],0)
+    assert np.allclose(point_data.data_sets[0]['res_disp_y'][:3],-measured[:3])
+    assert abs(point_data.data_sets[-1]['res_disp_y'][3]) < 0.05
+
+    # Mapping was persisted and reloads to the same weights
+    saved = list(tmp_path.glob('*.npz'))
+    assert len(saved) == 1
+    assert get_dic_mapping(coords,connect,dic_data,tmp_path) is get_dic_mapping(coords,connect,dic_data)
+    loaded = DICMapping.load(saved[0])
+    assert np.allclose(loaded.apply(disp_y),point_data.fields['disp_y'].T)
@@ -0,0 +1,75 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+from functools import partial
+
+from pyfemop.optimisationmanager.evaluationcache import EvaluationCache, callable_identity, cost_function_identity
+from pyfemop.optimisationmanager.costfunctions import CostFunction
+
+def test_cache_tolerance(tmp_path):
+    cache = EvaluationCache(tmp_path,tolerance=1E-3)
+    key = cache.key(np.array([0.5,0.25]),'context')
+    assert cache.get(key) is None
+    cache.put(key,[1.,2.])
+    assert cache.key(np.array([0.5+1E-5,0.25]),'context') == key
+    assert cache.key(np.array([0.5,0.25]),'other context') != key
+    assert cache.get(key)[0] == pytest.approx([1.,2.])
+
+def test_cache_eviction(tmp_path):
+    cache = EvaluationCache(tmp_path,max_entries=3)
+    keys = [cache.key(np.array([float(i)])) for i in range(4)]
+    for key in keys[:3]:
+        cache.put(key,[0.])
+    # Using the first entry makes the second the least recently used
+    cache.get(keys[0])
+    cache.put(keys[3],[0.])
+    assert len(cache) == 3
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+
+def test_cache_eviction_by_size(tmp_path):
+    cache = EvaluationCache(tmp_path,max_bytes=1000)
+    for i in range(10):
+        cache.put(cache.key(np.array([float(i)])),np.zeros(20))
+    assert 0 < len(cache) < 10
+    assert cache._n_entries == len(cache)
+    assert cache._n_bytes == sum([p.stat().st_size for p in tmp_path.glob('*.pickle')])
+    # Overwriting an entry doesn't count it twice
+    n = len(cache)
+    cache.put(cache.key(np.array([9.])),np.zeros(20))
+    assert cache._n_entries == n
+    # A new cache picks up the existing entries
+    assert EvaluationCache(tmp_path,max_bytes=1000)._n_entries == n
+
+def scaled(data,endtime,external_data,scale=1.):
+    return scale
+
+class Weighted():
+    def __init__(self,weights):
+        self.weights = weights
+
+def test_callable_identity():
+    assert callable_identity(partial(scaled,scale=2.)) != callable_identity(partial(scaled,scale=3.))
+    assert callable_identity(partial(scaled,scale=2.)) == callable_identity(partial(scaled,scale=2.))
+    # Arrays are hashed in full, not by their truncated repr
+    weights = np.zeros(5000)
+    changed = weights.copy()
+    changed[2500] = 1.
+    assert callable_identity(Weighted(weights)) != callable_identity(Weighted(changed))
+    assert callable_identity(Weighted(weights)) == callable_identity(Weighted(weights.copy()))
+    # No memory addresses
+    nested = Weighted(Weighted(weights))
+    assert '0x' not in callable_identity(nested)
+    assert callable_identity(nested) == callable_identity(Weighted(Weighted(weights.copy())))
+
+def test_cost_function_identity():
+    def make(external_data):
+        return CostFunction(None,[partial(scaled,scale=2.)],100.,external_data=external_data)
+    points = np.linspace(0,1,5000)
+    shifted = points.copy()
+    shifted[1000] += 1E-3
+    assert cost_function_identity(make(points)) == cost_function_identity(make(points.copy()))
+    assert cost_function_identity(make(points)) != cost_function_identity(make(shifted))
@@ -0,0 +1,61 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+import netCDF4 as nc
+from mooseherder import ExodusReader
+
+from pyfemop.mooseutils.exodusslice import read_exodus
+
+def _write_names(dataset,key,dim,names):
+    var = dataset.createVariable(key,'S1',(dim,'len_name'))
+    var[:] = np.array([list(n.ljust(33,'\0')) for n in names],dtype='S1')
+
+def make_exodus(path,n_steps=10,n_nodes=6):
+    with nc.Dataset(str(path),'w') as dataset:
+        dataset.createDimension('time_step',None)
+        dataset.createDimension('num_nodes',n_nodes)
+        dataset.createDimension('num_el_in_blk1',2)
+        dataset.createDimension('num_nod_per_el1',3)
+        dataset.createDimension('len_name',33)
+        for key,n in (('num_nod_var_names',2),('num_elem_var_names',1),('num_glo_var_names',2),('num_eb_names',1)):
+            dataset.createDimension(key,n)
+        dataset.createVariable('time_whole','f8',('time_step',))[:] = np.arange(n_steps)*0.5
+        dataset.createVariable('coordx','f8',('num_nodes',))[:] = np.arange(n_nodes)
+        dataset.createVariable('coordy','f8',('num_nodes',))[:] = np.arange(n_nodes)*2
+        dataset.createVariable('connect1','i4',('num_el_in_blk1','num_nod_per_el1'))[:] = [[1,2,3],[4,5,6]]
+        _write_names(dataset,'name_nod_var','num_nod_var_names',['disp_x','disp_y'])
+        _write_names(dataset,'name_elem_var','num_elem_var_names',['strain_yy'])
+        _write_names(dataset,'name_glo_var','num_glo_var_names',['max_stress','react_y'])
+        _write_names(dataset,'eb_names','num_eb_names',['block'])
+        for i in range(2):
+            var = dataset.createVariable('vals_nod_var{}'.format(i+1),'f8',('time_step','num_nodes'))
+            var[:] = np.random.rand(n_steps,n_nodes)
+        dataset.createVariable('vals_elem_var1eb1','f8',('time_step','num_el_in_blk1'))[:] = np.random.rand(n_steps,2)
+        dataset.createVariable('vals_glo_var','f8',('time_step','num_glo_var_names'))[:] = np.random.rand(n_steps,2)
+
+def test_read_exodus(tmp_path):
+    path = tmp_path / 'out.e'
+    make_exodus(path)
+    full = ExodusReader(path).read_all_sim_data()
+
+    data = read_exodus(path)
+    assert np.allclose(data.coords,full.coords)
+    assert np.all(data.connect['connect1'] == full.connect['connect1'])
+    assert np.allclose(data.node_vars['disp_y'],full.node_vars['disp_y'])
+    assert np.allclose(data.elem_vars[('strain_yy',1)],full.elem_vars[('strain_yy',1)])
+
+    data = read_exodus(path,fields=['disp_y','max_stress'],time_steps='last')
+    assert list(data.node_vars.keys()) == ['disp_y']
+    assert data.elem_vars == {}
+    assert np.allclose(data.node_vars['disp_y'],full.node_vars['disp_y'][:,-1:])
+    assert np.allclose(data.glob_vars['max_stress'],full.glob_vars['max_stress'][-1:])
+
+    data = read_exodus(path,fields=['disp_x'],time_steps=(1.,2.))
+    assert np.allclose(data.time,[1.,1.5,2.])
+    assert np.allclose(data.node_vars['disp_x'],full.node_vars['disp_x'][:,2:5])
+
+    data = read_exodus(path,fields=['disp_x'],time_steps=[0,-1])
+    assert np.allclose(data.node_vars['disp_x'],full.node_vars['disp_x'][:,[0,9]])
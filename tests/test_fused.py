@@ -0,0 +1,68 @@
+#
+#
+#
+
+import pytest
+import gc
+import numpy as np
+import netCDF4 as nc
+from mooseherder import SweepReader, DirectoryManager
+
+from pyfemop.optimisationmanager.costfunctions import CostFunction
+from pyfemop.mooseutils.exodusslice import ExodusSelection
+
+def make_exodus(path,seed,n_steps=5,n_nodes=3):
+    rng = np.random.default_rng(seed)
+    with nc.Dataset(str(path),'w') as dataset:
+        dataset.createDimension('time_step',None)
+        dataset.createDimension('num_nodes',n_nodes)
+        dataset.createDimension('num_el_in_blk1',1)
+        dataset.createDimension('num_nod_per_el1',3)
+        dataset.createDimension('len_name',33)
+        dataset.createDimension('num_nod_var_names',1)
+        dataset.createDimension('num_glo_var_names',1)
+        dataset.createDimension('num_eb_names',1)
+        dataset.createVariable('time_whole','f8',('time_step',))[:] = np.arange(n_steps)*0.5
+        dataset.createVariable('coordx','f8',('num_nodes',))[:] = np.arange(n_nodes)
+        dataset.createVariable('coordy','f8',('num_nodes',))[:] = np.arange(n_nodes)*2
+        dataset.createVariable('connect1','i4',('num_el_in_blk1','num_nod_per_el1'))[:] = [[1,2,3]]
+        for key,dim,name in (('name_nod_var','num_nod_var_names','disp_y'),
+                             ('name_glo_var','num_glo_var_names','max_stress'),
+                             ('eb_names','num_eb_names','block')):
+            dataset.createVariable(key,'S1',(dim,'len_name'))[:] = np.array([list(name.ljust(33,'\0'))],dtype='S1')
+        dataset.createVariable('vals_nod_var1','f8',('time_step','num_nodes'))[:] = rng.random((n_steps,n_nodes))
+        dataset.createVariable('vals_glo_var','f8',('time_step','num_glo_var_names'))[:] = rng.random((n_steps,1))
+
+def final_stress(data,endtime,external_data):
+    # The mesh stage of the chain has no output
+    assert data[0] is None
+    return float(data[1].glob_vars['max_stress'][-1])
+
+def final_disp(data,endtime,external_data):
+    return float(np.max(data[1].node_vars['disp_y'][:,-1]))
+
+@pytest.mark.parametrize('backend',['process','thread'])
+@pytest.mark.parametrize('selection',[None,ExodusSelection(fields=['disp_y','max_stress'],time_steps='last')])
+def test_fused_matches_sweep(tmp_path,backend,selection):
+    output_files = []
+    for i in range(5):
+        path = tmp_path / 'out-{}.e'.format(i)
+        make_exodus(path,i)
+        output_files.append([None,path])
+
+    cost_function = CostFunction(None,[final_stress],None,ineq_constraints=[final_disp],
+                                 n_workers=2,backend=backend,selection=selection)
+    try:
+        # Sweep dispatch reads everything here, then scores on the pool
+        reader = SweepReader(DirectoryManager(n_dirs=1))
+        swept = cost_function.evaluate_parallel([reader.read_results_once(o) for o in output_files])
+        # mooseherder's reader leaves its datasets open, close them before the threads read
+        gc.collect()
+        fused = cost_function.evaluate_outputs_parallel(output_files)
+        submitted = [cost_function.submit_output(o).get() for o in output_files]
+    finally:
+        cost_function.shutdown()
+
+    assert np.array(fused) == pytest.approx(np.array(swept))
+    assert np.array(submitted) == pytest.approx(np.array(swept))
+    assert np.array(swept).shape == (5,2)
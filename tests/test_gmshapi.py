@@ -0,0 +1,110 @@
+#
+#
+#
+
+import pytest
+import pickle
+import numpy as np
+from pathlib import Path
+from types import SimpleNamespace
+
+from pyfemop.gmshutils import gmshapi
+from pyfemop.gmshutils.gmshapi import split_parameters, GmshApiMesher
+
+GEO = '''// Comment
+height = 1;
+//_*
+neckWidth = 0.8; // Parameter
+name = "part";
+//**
+lc = 0.2;
+filename = "mesh.msh";
+Point(1) = {0,0,0,lc};
+Point(2) = {neckWidth,0,0,lc};
+Point(3) = {1,height,0,lc};
+Point(4) = {0,height,0,lc};
+Line(1) = {1,2};
+Line(2) = {2,3};
+Line(3) = {3,4};
+Line(4) = {4,1};
+Curve Loop(1) = {1,2,3,4};
+Plane Surface(1) = {1};
+Mesh 2;
+Save Str(filename);
+Exit;
+'''
+
+def test_split_parameters():
+    template, defaults = split_parameters(GEO)
+    assert defaults == {'neckWidth':0.8,'name':'part'}
+    assert 'neckWidth =' not in template
+    assert 'Save' not in template
+    assert 'Exit' not in template
+    assert 'Mesh 2;' in template
+    with pytest.raises(ValueError):
+        split_parameters('Mesh 2;')
+
+def test_api_mesher(tmp_path):
+    if gmshapi.gmsh is None:
+        pytest.skip('gmsh python package not available')
+    geo_file = tmp_path / 'model.geo'
+    geo_file.write_text(GEO)
+    with GmshApiMesher(geo_file,n_workers=2) as mesher:
+        results = mesher.mesh_all([{'neckWidth':0.5},{'neckWidth':0.9}],
+                                  [tmp_path / 'a.msh',tmp_path / 'b.msh'])
+    assert all([r.ok for r in results])
+    assert (tmp_path / 'a.msh').exists() and (tmp_path / 'b.msh').exists()
+    assert (tmp_path / 'a.msh').read_text() != (tmp_path / 'b.msh').read_text()
+
+class FakeGmsh():
+    # Records the API calls, so the mesher can be checked without gmsh
+    def __init__(self):
+        self.numbers = dict()
+        self.strings = dict()
+        self.merged = []
+        self.written = []
+        self.generated = []
+        self.parser = SimpleNamespace(clear=self.numbers.clear,
+                                      setNumber=lambda name,value: self.numbers.update({name:value}),
+                                      setString=lambda name,value: self.strings.update({name:value}))
+        mesh = SimpleNamespace(getNodes=lambda: (np.zeros(0),),generate=lambda dim: self.generated.append(dim))
+        self.model = SimpleNamespace(mesh=mesh,getDimension=lambda: 2)
+
+    def clear(self):
+        pass
+
+    def merge(self,filename):
+        self.merged.append((filename,Path(filename).read_text()))
+
+    def write(self,filename):
+        self.written.append(filename)
+
+def test_api_mesher_template(tmp_path,monkeypatch):
+    fake = FakeGmsh()
+    monkeypatch.setattr(gmshapi,'gmsh',fake)
+    geo_file = tmp_path / 'model.geo'
+    geo_file.write_text(GEO.replace('lc = 0.2;','lc = 0.2;\nInclude "common.geo";\nMerge "/abs/part.step";'))
+
+    mesher = GmshApiMesher(geo_file)
+    template_file = mesher._template_file
+    # Nothing is written next to the original
+    assert sorted(tmp_path.iterdir()) == [geo_file]
+    assert template_file.parent != tmp_path
+    text = template_file.read_text()
+    assert 'Include "{}";'.format((tmp_path / 'common.geo').resolve().as_posix()) in text
+    assert 'Merge "/abs/part.step";' in text
+
+    result = gmshapi._mesh_with_api(geo_file,template_file,dict(mesher.get_defaults(),neckWidth=0.5),tmp_path / 'a.msh')
+    assert result.ok
+    assert fake.numbers == {'neckWidth':[0.5]}
+    assert fake.strings == {'name':['part']}
+    assert fake.merged == [(str(template_file),text)]
+    assert fake.written == [str(tmp_path / 'a.msh')]
+    assert fake.generated == [2]
+
+    # A copy doesn't remove the template, the original does on shutdown
+    copy = pickle.loads(pickle.dumps(mesher))
+    copy.shutdown()
+    assert template_file.exists()
+    mesher.shutdown()
+    assert not template_file.exists()
@@ -0,0 +1,43 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+from mooseherder.simdata import SimData
+
+from pyfemop.mooseutils.interpolation import interpolate_simdata, get_interpolation_plan
+
+def make_plate(nx=21,ny=11):
+    # Quad mesh of a 10 x 5 plate with a square hole in the middle
+    X, Y = np.meshgrid(np.linspace(0,10,nx),np.linspace(0,5,ny))
+    coords = np.column_stack((X.ravel(),Y.ravel(),np.zeros(X.size)))
+    elements = []
+    for j in range(ny-1):
+        for i in range(nx-1):
+            if 4 < X[0,i] < 6 and 2 <= Y[j,0] < 3:
+                continue
+            n = j*nx + i
+            elements.append([n,n+1,n+1+nx,n+nx])
+    connect = {'connect1':(np.array(elements)+1).T}
+    return coords, connect
+
+def test_interpolate_simdata():
+    coords, connect = make_plate()
+    time = np.array([0.,1.])
+    disp_x = np.outer(0.01*coords[:,0] + 0.002*coords[:,1],time)
+    disp_y = np.outer(-0.003*coords[:,1],time)
+    data = SimData(time=time,coords=coords,connect=connect,node_vars={'disp_x':disp_x,'disp_y':disp_y})
+
+    grid_data = interpolate_simdata(data,0.25)
+    assert get_interpolation_plan(coords,connect,0.25) is get_interpolation_plan(coords,connect,0.25)
+    xx, yy = np.meshgrid(grid_data._x,grid_data._y)
+    assert np.nanmax(np.abs(grid_data.fields['disp_x'][1] - (0.01*xx + 0.002*yy))) < 1E-12
+    # Grid points in the hole have no data
+    assert np.isnan(grid_data.data_sets[-1]['disp_x'][10,20])
+
+    grid_data.window_differentation('last',5)
+    assert np.nanmax(np.abs(grid_data.data_sets[-1]['exx'] - 0.01)) < 1E-9
+    assert np.nanmax(np.abs(grid_data.data_sets[-1]['eyy'] + 0.003)) < 1E-9
+    assert np.nanmax(np.abs(grid_data.data_sets[-1]['exy'] - 0.001)) < 1E-9
+    assert np.all(np.isnan(grid_data.data_sets[0]['eyy']))
@@ -0,0 +1,28 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+
+from pyfemop.optimisationmanager.costfunctions import CostFunction, memoise
+
+def test_read_once_and_memoise():
+    calls = {'reader':0,'derived':0}
+    def reader(simdata):
+        calls['reader'] += 1
+        return simdata
+    def derived(data):
+        calls['derived'] += 1
+        return np.array(data)*2
+    def objective_max(data,endtime,external_data):
+        return np.max(memoise(('derived',id(data)),derived,data))
+    def objective_min(data,endtime,external_data):
+        return np.min(memoise(('derived',id(data)),derived,data))
+
+    c = CostFunction(reader,[objective_max,objective_min],None)
+    assert c.evaluate_objectives([1.,2.,3.]) == [6.,2.]
+    assert calls == {'reader':1,'derived':1}
+    # The memo only lasts for one evaluation
+    c.evaluate_objectives([1.,2.,3.])
+    assert calls == {'reader':2,'derived':2}
@@ -0,0 +1,59 @@
+#
+#
+#
+
+import pytest
+from pathlib import Path
+
+from pyfemop.gmshutils.meshcache import get_mesh_output, CachedGmshRunner
+
+GEO = '''//_*
+p0 = {};
+//**
+filename = "test_mesh.msh";
+//Save "wrong.msh";
+Save Str(filename);
+Exit;
+'''
+
+def test_get_mesh_output(tmp_path):
+    geo_file = tmp_path / 'mesh.geo'
+    assert get_mesh_output(GEO.format(1),geo_file) == tmp_path / 'test_mesh.msh'
+    assert get_mesh_output('Save "a.msh";',geo_file) == tmp_path / 'a.msh'
+    assert get_mesh_output('Mesh 2;',geo_file) == tmp_path / 'mesh.msh'
+
+def test_cached_gmsh_runner(tmp_path):
+    # Stand in for gmsh that writes the mesh next to the script
+    gmsh_app = tmp_path / 'gmsh'
+    gmsh_app.write_text('#!/bin/sh\necho "$2" > "$(dirname "$2")/test_mesh.msh"\n')
+    gmsh_app.chmod(0o755)
+    runner = CachedGmshRunner(gmsh_app,tmp_path / 'cache')
+
+    for i,p0 in enumerate([1,2,1]):
+        run_dir = tmp_path / 'run{}'.format(i)
+        run_dir.mkdir()
+        geo_file = run_dir / 'mesh.geo'
+        geo_file.write_text(GEO.format(p0))
+        runner.run(geo_file)
+        assert (run_dir / 'test_mesh.msh').exists()
+
+    assert runner._n_runs == 2
+    assert runner._n_hits == 1
+    # The hit is the mesh made in the first directory
+    assert 'run0' in (tmp_path / 'run2' / 'test_mesh.msh').read_text()
+
+def test_cached_gmsh_runner_same_dir(tmp_path):
+    # Stand in for gmsh that writes p0 into the mesh, in place like gmsh does
+    gmsh_app = tmp_path / 'gmsh'
+    gmsh_app.write_text('#!/bin/sh\ngrep "^p0" "$2" > "$(dirname "$2")/test_mesh.msh"\n')
+    gmsh_app.chmod(0o755)
+    runner = CachedGmshRunner(gmsh_app,tmp_path / 'cache')
+
+    geo_file = tmp_path / 'mesh.geo'
+    for p0 in [1,2,1,2]:
+        geo_file.write_text(GEO.format(p0))
+        runner.run(geo_file)
+        assert (tmp_path / 'test_mesh.msh').read_text().strip() == 'p0 = {};'.format(p0)
+
+    assert runner._n_runs == 2
+    assert runner._n_hits == 2
@@ -0,0 +1,54 @@
+#
+#
+#
+
+import pytest
+from pathlib import Path
+
+from pyfemop.gmshutils.mesher import GmshMesher, run_gmsh
+
+FAKE_GMSH = '''#!/bin/sh
+if grep -q slow "$2"; then sleep 5; fi
+if grep -q bad "$2"; then echo "Error: bad geometry" >&2; exit 1; fi
+echo "meshed $2"
+echo mesh > "${2%.geo}.msh"
+'''
+
+@pytest.fixture
+def gmsh_app(tmp_path):
+    app = tmp_path / 'gmsh'
+    app.write_text(FAKE_GMSH)
+    app.chmod(0o755)
+    return app
+
+def write_geo(path,text):
+    path.write_text(text)
+    return path
+
+def test_run_gmsh(tmp_path,gmsh_app):
+    with pytest.raises(FileNotFoundError):
+        run_gmsh(gmsh_app,tmp_path / 'model.i')
+    with pytest.raises(FileNotFoundError):
+        run_gmsh(gmsh_app,tmp_path / 'missing.geo')
+
+    result = run_gmsh(gmsh_app,write_geo(tmp_path / 'good.geo','Mesh 2;'))
+    assert result.ok
+    assert 'meshed' in result.stdout
+    assert (tmp_path / 'good.msh').exists()
+
+    result = run_gmsh(gmsh_app,write_geo(tmp_path / 'bad.geo','bad'))
+    assert not result.ok
+    assert result.returncode == 1
+    assert 'bad geometry' in result.stderr
+
+def test_mesher_timeout(tmp_path,gmsh_app):
+    files = [write_geo(tmp_path / 'a.geo','Mesh 2;'),
+             write_geo(tmp_path / 'slow.geo','slow'),
+             write_geo(tmp_path / 'b.geo','Mesh 2;')]
+    with GmshMesher(gmsh_app,n_workers=2,timeout=0.5) as mesher:
+        results = mesher.mesh_all(files)
+    assert [r.input_file for r in results] == files
+    assert [r.ok for r in results] == [True,False,True]
+    assert results[1].timed_out
+    assert results[1].returncode is None
+    assert results[1].run_time < 5
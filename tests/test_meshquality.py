@@ -0,0 +1,104 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+from pathlib import Path
+
+from pyfemop.gmshutils.meshquality import read_msh, element_quality, mesh_statistics, MeshQualityGate
+
+# Two quads, the second has its last node pulled through so it folds over
+MSH41 = '''$MeshFormat
+4.1 0 8
+$EndMeshFormat
+$Nodes
+1 7 1 7
+2 1 0 7
+1
+2
+3
+4
+5
+6
+7
+0 0 0
+1 0 0
+1 1 0
+0 1 0
+2 0 0
+2 1 0
+{} {} 0
+$EndNodes
+$Elements
+2 3 1 3
+1 1 1 1
+1 1 2
+2 1 3 2
+2 1 2 3 4
+3 2 5 6 {}
+$EndElements
+'''
+
+MSH22 = '''$MeshFormat
+2.2 0 8
+$EndMeshFormat
+$Nodes
+4
+1 0 0 0
+2 1 0 0
+3 0 1 0
+4 0 0 1
+$EndNodes
+$Elements
+2
+1 2 2 0 1 1 2 3
+2 4 2 0 1 1 2 3 4
+$EndElements
+'''
+
+def write(path,text):
+    path.write_text(text)
+    return path
+
+def test_read_msh(tmp_path):
+    coords, elements = read_msh(write(tmp_path / 'a.msh',MSH41.format(0.5,0.5,3)))
+    assert coords.shape == (7,3)
+    assert np.array_equal(elements[3],[[0,1,2,3],[1,4,5,2]])
+    assert np.array_equal(elements[1],[[0,1]])
+
+    coords, elements = read_msh(write(tmp_path / 'b.msh',MSH22))
+    assert np.array_equal(elements[4],[[0,1,2,3]])
+    jacobian, ratio = element_quality(coords,elements)
+    # Only the tet counts in a 3D mesh
+    assert jacobian.shape == (1,)
+    assert ratio[0] == pytest.approx(np.sqrt(2))
+
+def test_element_quality(tmp_path):
+    coords, elements = read_msh(write(tmp_path / 'a.msh',MSH41.format(0.5,0.5,3)))
+    jacobian, ratio = element_quality(coords,elements)
+    assert jacobian == pytest.approx([1.,1.])
+    assert ratio == pytest.approx([1.,1.])
+
+    # Second quad folded over by moving its corner node
+    coords, elements = read_msh(write(tmp_path / 'b.msh',MSH41.format(2.5,-0.5,7)))
+    jacobian, ratio = element_quality(coords,elements)
+    assert jacobian[0] == pytest.approx(1.)
+    assert jacobian[1] < 0
+
+def test_mesh_quality_gate(tmp_path):
+    gate = MeshQualityGate(min_jacobian=0.2,max_aspect_ratio=10.,penalty=500.)
+    passed, stats = gate.check(Path(__file__).parent.parent / 'data' / 'test_mesh.msh')
+    assert passed
+    assert stats['n_elements'] == 4434
+
+    passed, stats = gate.check(write(tmp_path / 'bad.msh',MSH41.format(2.5,-0.5,7)))
+    assert not passed
+    assert stats['min_jacobian'] < 0
+
+    assert gate.check(tmp_path / 'missing.msh') == (False,None)
+    assert gate.check(write(tmp_path / 'junk.msh','$MeshFormat\n4.1 1 8\n$EndMeshFormat\n')) == (False,None)
+
+    geo_file = write(tmp_path / 'bad.geo','Mesh 2;\nSave "bad.msh";\n')
+    assert not gate.check_geo(geo_file)[0]
+    assert gate.get_penalty() == 500.
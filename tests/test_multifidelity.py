@@ -0,0 +1,104 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+import shutil
+from pathlib import Path
+from mooseherder import InputModifier
+
+from pyfemop.optimisationmanager.multifidelity import override_assignments, FidelityLevel, MultiFidelity
+
+def test_override_assignments():
+    lines = ['//_*\n','p0 = 1;\n','//**\n','lc = 0.6;\n','Point(1) = {0,0,0,lc};\n',
+             '  dt = 10 # time step\n','[TimeStepper]\n','  dt = 10\n','end_time = 1E5']
+    new = override_assignments(lines,{'lc':2.4,'dt':50,'end_time':'5E4'})
+    assert new[3] == 'lc = 2.4;\n'
+    assert new[4] == lines[4]
+    assert new[5] == '  dt = 50 # time step\n'
+    assert new[7] == '  dt = 50\n'
+    assert new[8] == 'end_time = 5E4'
+    assert lines[3] == 'lc = 0.6;\n'
+    with pytest.raises(KeyError):
+        override_assignments(lines,{'missing':1})
+
+def make_herd(tmp_path,modifiers):
+    class DirManager():
+        _base_dir = tmp_path / 'runs'
+    class Herd():
+        _dir_manager = DirManager()
+    DirManager._base_dir.mkdir(exist_ok=True)
+    herd = Herd()
+    herd._modifiers = modifiers
+    return herd
+
+def test_fidelity_level(tmp_path):
+    geo_file = tmp_path / 'plate.geo'
+    shutil.copy(Path('data/gmsh_hole_plate_creep.geo'),geo_file)
+    modifier = InputModifier(geo_file,'//',';')
+    herd = make_herd(tmp_path,[modifier,None])
+
+    level = FidelityLevel('coarse',[{'lc':2.4},None],cost=0.1)
+    with level.applied(herd):
+        coarse = herd._modifiers[0]
+        assert coarse is not modifier
+        assert herd._modifiers[1] is None
+        # The copy goes in the herd's directory, not next to the original
+        assert coarse.get_input_file() == tmp_path / 'runs' / 'plate_coarse.geo'
+        assert sorted(tmp_path.glob('*.geo')) == [geo_file]
+        # The parameters can still be set, the mesh size is changed
+        coarse.update_vars({'h1x':4.})
+        coarse.write_file(tmp_path / 'run.geo')
+        text = (tmp_path / 'run.geo').read_text()
+        assert 'lc = 2.4;' in text and 'h1x = 4.0;' in text
+    assert herd._modifiers[0] is modifier
+    assert 'lc = 0.6;' in geo_file.read_text()
+    assert 'lc = 2.4;' in coarse.get_input_file().read_text()
+
+def test_fidelity_level_block_override(tmp_path):
+    geo_file = tmp_path / 'plate.geo'
+    geo_file.write_text('//_*\nh1x = 2;\nlc = 0.6;\n//**\nPoint(1) = {0,0,0,lc};\n')
+    modifier = InputModifier(geo_file,'//',';')
+    herd = make_herd(tmp_path,[modifier])
+
+    level = FidelityLevel('coarse',[{'lc':2.4}])
+    with level.applied(herd):
+        coarse = herd._modifiers[0]
+        coarse.update_vars({'h1x':4.})
+        coarse.write_file(tmp_path / 'run.geo')
+    # lc is in the parameter block, which is written from the variables
+    text = (tmp_path / 'run.geo').read_text()
+    assert 'lc = 2.4;' in text and 'lc = 0.6;' not in text and 'h1x = 4.0;' in text
+    assert modifier.get_vars()['lc'] == 0.6
+    modifier.write_file(tmp_path / 'full.geo')
+    assert 'lc = 0.6;' in (tmp_path / 'full.geo').read_text()
+
+def test_multi_fidelity(tmp_path):
+    class Level(FidelityLevel):
+        def get_modifiers(self,modifiers,directory):
+            return [self.get_name()]
+    herd = make_herd(tmp_path,['full'])
+    low = Level('low',cost=0.1)
+    high = FidelityLevel('high')
+    def evaluate(x):
+        f = np.sum(x**2,axis=1)
+        if herd._modifiers[0] == 'low':
+            f = f - 1.
+            f[x[:,0] > 0.9] = 1E6
+        return f[:,None]
+
+    fidelity = MultiFidelity([low,high],fraction=0.25)
+    x = np.linspace(0,1,20)[:,None]
+    results, levels = fidelity.evaluate(herd,x,evaluate,1)
+
+    assert herd._modifiers == ['full']
+    # The best five are promoted and have full fidelity results
+    assert np.all(levels[:5] == 1) and np.all(levels[5:] == 0)
+    assert results[:5,0] == pytest.approx(x[:5,0]**2)
+    # The rest are corrected by the mean difference
+    assert fidelity.get_correction(0) == pytest.approx([1.])
+    assert results[5:18,0] == pytest.approx(x[5:18,0]**2)
+    # Failed runs are neither promoted nor corrected
+    assert np.all(results[18:] == 1E6)
+    assert fidelity.get_cost_summary() == {'low':(20,pytest.approx(2/7)),'high':(5,pytest.approx(5/7))}
@@ -0,0 +1,178 @@
+#
+#
+#
+
+import pytest
+import time
+import numpy as np
+from pathlib import Path
+
+from mooseherder import MooseHerd, DirectoryManager, InputModifier, SimRunner
+from pymoo.algorithms.soo.nonconvex.ga import GA
+from pymoo.termination import get_termination
+
+from pyfemop.optimisationmanager.optimisationmanager import MooseOptimisationRun
+from pyfemop.optimisationmanager.costfunctions import CostFunction
+from pyfemop.optimisationmanager.multifidelity import FidelityLevel, MultiFidelity
+from pyfemop.optimisationmanager.evaluationcache import EvaluationCache
+
+class FakeRunner(SimRunner):
+    # Stands in for moose, the output is a copy of the input file and the start time
+    def __init__(self,delay=0.):
+        self._delay = delay
+        self._input_path = None
+        self._output_path = None
+
+    def get_input_file(self):
+        return self._input_path
+
+    def set_input_file(self,input_path):
+        self._input_path = input_path
+
+    def run(self,input_file=None):
+        self._input_path = Path(input_file)
+        start = time.time()
+        time.sleep(self._delay)
+        self._output_path = self._input_path.with_suffix('.out')
+        self._output_path.write_text(self._input_path.read_text() + 'started = {!r}\n'.format(start))
+
+    def get_output_path(self):
+        return self._output_path
+
+def read_text_output(output_file):
+    values = dict()
+    for line in Path(output_file).read_text().splitlines():
+        if '=' in line and not line.startswith('#'):
+            name, value = line.split('=')
+            values[name.strip()] = float(value)
+    return values
+
+class TextReader():
+    # Stands in for the SweepReader, which reads exodus files
+    def read_results_once(self,output_files):
+        return [None if o is None else read_text_output(o) for o in output_files]
+
+class TextCost(CostFunction):
+    def read_outputs(self,output_files):
+        return TextReader().read_results_once(output_files)
+
+def sphere(data,endtime,external_data):
+    values = data[0]
+    if values['end_time'] != endtime:
+        return 1E6
+    return (values['x0']-0.3)**2 + (values['x1']+0.2)**2 + values['offset']
+
+def make_run(tmp_path,n_dirs=2,backend='thread',delay=0.,objective=sphere,algorithm=None,n_gen=3,**kwargs):
+    model = tmp_path / 'model.i'
+    model.write_text('#_*\nx0 = 0\nx1 = 0\n#**\noffset = 0\nend_time = 100\n')
+    dir_manager = DirectoryManager(n_dirs=n_dirs)
+    dir_manager.set_base_dir(tmp_path)
+    dir_manager.clear_dirs()
+    dir_manager.create_dirs()
+    herd = MooseHerd([FakeRunner(delay)],[InputModifier(model,'#','')],dir_manager)
+    herd._n_para_sims = n_dirs
+    cost_function = TextCost(None,[objective],100.,n_workers=2,backend=backend)
+    if algorithm is None:
+        algorithm = GA(pop_size=6)
+    mor = MooseOptimisationRun('test',algorithm,get_termination('n_gen',n_gen),herd,cost_function,
+                               {'x0':[-1,1],'x1':[-1,1]},**kwargs)
+    mor.sweep_reader = TextReader()
+    return mor
+
+def expected(x):
+    return (x[:,0]-0.3)**2 + (x[:,1]+0.2)**2
+
+@pytest.mark.parametrize('dispatch',['sweep','streamed','fused'])
+def test_run_population(tmp_path,dispatch):
+    mor = make_run(tmp_path,dispatch=dispatch)
+    x = np.array([[0.,0.],[0.5,-0.5],[1.,1.]])
+    # A second sweep in the same generation only reads its own outputs
+    assert mor.run_population(x)[:,0] == pytest.approx(expected(x))
+    assert mor.run_population(x[:2])[:,0] == pytest.approx(expected(x[:2]))
+
+@pytest.mark.parametrize('dispatch',['sweep','fused'])
+def test_multi_fidelity_run(tmp_path,dispatch):
+    fidelity = MultiFidelity([FidelityLevel('coarse',[{'offset':0.5}],cost=0.1),FidelityLevel('full')],fraction=0.5)
+    mor = make_run(tmp_path,dispatch=dispatch,fidelity=fidelity)
+    x = np.random.default_rng(0).uniform(-1,1,(6,2))
+
+    results = mor.evaluate_population(x)
+    levels = mor._fidelity_levels
+    assert np.sum(levels == 1) == 3
+    # The promoted candidates have full fidelity results, the rest corrected coarse ones
+    assert fidelity.get_correction(0) == pytest.approx([-0.5])
+    assert results[:,0] == pytest.approx(expected(x))
+    assert set(np.flatnonzero(levels == 1)) == set(np.argsort(expected(x))[:3])
+    assert mor._herd._modifiers[0].get_input_file() == tmp_path / 'model.i'
+
+    mor.run(2)
+    assert set(mor._algorithm.pop.get('fidelity')) <= {0,1}
+
+@pytest.mark.parametrize('dispatch,backend',[('sweep','thread'),('fused','process')])
+def test_multi_fidelity_endtime(tmp_path,dispatch,backend):
+    # The short runs would all be failures against the full endtime
+    short = FidelityLevel('short',[{'end_time':50,'offset':0.5}],cost=0.5,endtime=50.)
+    fidelity = MultiFidelity([short,FidelityLevel('full')],fraction=0.5)
+    mor = make_run(tmp_path,backend=backend,dispatch=dispatch,fidelity=fidelity)
+    x = np.random.default_rng(1).uniform(-1,1,(6,2))
+    try:
+        results = mor.evaluate_population(x)
+    finally:
+        mor._cost_function.shutdown()
+
+    assert np.sum(mor._fidelity_levels == 1) == 3
+    assert results[:,0] == pytest.approx(expected(x))
+    assert mor._cost_function.get_endtime() == 100.
+
+def test_failed_runs_not_cached(tmp_path):
+    cache = EvaluationCache(tmp_path / 'cache')
+    mor = make_run(tmp_path,evaluation_cache=cache)
+    x = np.array([[0.,0.],[0.5,-0.5]])
+    # Every run stops short of this endtime, so gets the penalty
+    mor._cost_function.set_endtime(200.)
+    assert np.all(mor.evaluate_feasible(x) == 1E6)
+    assert len(cache) == 0
+
+    mor._cost_function.set_endtime(100.)
+    assert mor.evaluate_feasible(x)[:,0] == pytest.approx(expected(x))
+    assert len(cache) == 2
+
+scores = []
+
+def slow_sphere(data,endtime,external_data):
+    start = time.time()
+    time.sleep(0.3)
+    scores.append((data[0]['started'],start,time.time()))
+    return sphere(data,endtime,external_data)
+
+def test_run_async(tmp_path):
+    scores.clear()
+    mor = make_run(tmp_path,delay=0.1,objective=slow_sphere,algorithm=GA(pop_size=4,n_offsprings=1),n_gen=100)
+    mor.run_async(8)
+
+    assert len(scores) == 8
+    pop = mor._algorithm.pop
+    assert pop.get('F')[:,0] == pytest.approx(expected(pop.get('X')))
+    assert mor._herd._sim_iter == 8
+    # Both slots were refilled before the first scores finished, and scores ran side by side on the pool
+    first_scored = min([end for _,_,end in scores])
+    assert sum([started < first_scored for started,_,_ in scores]) > 2
+    intervals = sorted([(start,end) for _,start,end in scores])
+    assert any([intervals[i+1][0] < intervals[i][1] for i in range(len(intervals)-1)])
+
+def test_backup_with_live_pool(tmp_path):
+    mor = make_run(tmp_path,dispatch='fused',backend='process')
+    x = np.array([[0.,0.],[0.5,-0.5]])
+    try:
+        mor.run_population(x)
+        assert mor._cost_function._pool is not None
+        mor.backup()
+        restored = MooseOptimisationRun.restore_backup(mor.get_backup_path())
+        restored.sweep_reader = mor.sweep_reader
+        try:
+            assert restored._cost_function._pool is None
+            assert restored.run_population(x)[:,0] == pytest.approx(expected(x))
+        finally:
+            restored._cost_function.shutdown()
+    finally:
+        mor._cost_function.shutdown()
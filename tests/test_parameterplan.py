@@ -0,0 +1,22 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+
+from pyfemop.optimisationmanager.parameterplan import ParameterPlan
+
+def test_parameter_plan():
+    # gmsh modifier, a modifier with nothing optimised, then moose
+    plan = ParameterPlan(['E','p0','p1'],[['p0','lc','p1'],['a'],['n','E']])
+    assert plan.get_assignment() == [['p0','p1'],[],['E']]
+
+    x = np.array([[1.,2.,3.],[4.,5.,6.]])
+    blocks = plan.blocks(x)
+    assert np.all(blocks[0] == [[2.,3.],[5.,6.]])
+    assert blocks[1] is None
+
+    sweep = plan.to_sweep(x)
+    assert sweep[1] == [{'p0':5.,'p1':6.},None,{'E':4.}]
+    assert plan.to_dicts(x)[0] == {'E':1.,'p0':2.,'p1':3.}
@@ -0,0 +1,133 @@
+#
+#
+#
+
+import pytest
+import time
+from pathlib import Path
+
+from mooseherder import MooseHerd, DirectoryManager, InputModifier, SimRunner
+
+from pyfemop.optimisationmanager.scheduling import run_pipelined
+
+class FakeRunner(SimRunner):
+    # Stands in for gmsh (writes a mesh) or moose (reads it and writes an output)
+    def __init__(self,stage,log,delay):
+        self._stage = stage
+        self._log = log
+        self._delay = delay
+        self._input_path = None
+        self._output_path = None
+
+    def get_input_file(self):
+        return self._input_path
+
+    def set_input_file(self,input_path):
+        self._input_path = input_path
+
+    def run(self,input_file=None):
+        self._input_path = Path(input_file)
+        start = time.perf_counter()
+        time.sleep(self._delay)
+        value = self._input_path.read_text().split('=')[1].split('\n')[0].strip(' ;')
+        mesh_file = self._input_path.parent / 'mesh.msh'
+        if self._stage == 'mesh':
+            mesh_file.write_text(value)
+            self._output_path = None
+        else:
+            self._output_path = self._input_path.with_suffix('.out')
+            self._output_path.write_text(mesh_file.read_text())
+        self._log.append((self._stage,float(value),start,time.perf_counter()))
+
+    def get_output_path(self):
+        return self._output_path
+
+def test_run_pipelined(tmp_path):
+    geo = tmp_path / 'mesh.geo'
+    geo.write_text('//_*\np = 0;\n//**\n')
+    moose = tmp_path / 'model.i'
+    moose.write_text('#_*\np = 0\n#**\n')
+
+    log = []
+    dir_manager = DirectoryManager(n_dirs=3)
+    dir_manager.set_base_dir(tmp_path)
+    dir_manager.clear_dirs()
+    dir_manager.create_dirs()
+    herd = MooseHerd([FakeRunner('mesh',log,0.05),FakeRunner('solve',log,0.2)],
+                     [InputModifier(geo,'//',';'),InputModifier(moose,'#','')],dir_manager)
+    herd._n_para_sims = 2
+
+    var_sweep = [[{'p':float(i)},{'p':float(i)}] for i in range(6)]
+    output_files = run_pipelined(herd,var_sweep,n_mesh_workers=1)
+
+    # Every solve used its own candidate's mesh
+    assert [float(o[1].read_text()) for o in output_files] == [float(i) for i in range(6)]
+    assert [o[0] for o in output_files] == [None]*6
+    # Meshes were made while other candidates solved
+    meshes = {v:(s,e) for stage,v,s,e in log if stage == 'mesh'}
+    solves = {v:(s,e) for stage,v,s,e in log if stage == 'solve'}
+    assert meshes[1.][0] < solves[0.][1]
+    assert meshes[2.][1] < solves[0.][1]
+    assert herd._sweep_iter == 1
+
+class OddGate():
+    # Rejects candidates with an odd parameter
+    def check_geo(self,geo_file):
+        value = float((Path(geo_file).parent / 'mesh.msh').read_text())
+        return value % 2 == 0, {'value':value}
+
+class Score():
+    def __init__(self,value):
+        self._value = value
+
+    def get(self):
+        return self._value
+
+def test_run_pipelined_gate(tmp_path):
+    geo = tmp_path / 'mesh.geo'
+    geo.write_text('//_*\np = 0;\n//**\n')
+    moose = tmp_path / 'model.i'
+    moose.write_text('#_*\np = 0\n#**\n')
+
+    log = []
+    dir_manager = DirectoryManager(n_dirs=3)
+    dir_manager.set_base_dir(tmp_path)
+    dir_manager.clear_dirs()
+    dir_manager.create_dirs()
+    herd = MooseHerd([FakeRunner('mesh',log,0.01),FakeRunner('solve',log,0.02)],
+                     [InputModifier(geo,'//',';'),InputModifier(moose,'#','')],dir_manager)
+    herd._n_para_sims = 2
+
+    var_sweep = [[{'p':float(i)},{'p':float(i)}] for i in range(5)]
+    scores = run_pipelined(herd,var_sweep,gate=OddGate(),rejected_score=-1.,
+                           submit_score=lambda outputs: Score(float(outputs[1].read_text())))
+    assert scores == [0.,-1.,2.,-1.,4.]
+    assert sorted([v for stage,v,s,e in log if stage == 'solve']) == [0.,2.,4.]
+
+def test_run_pipelined_scores_while_meshing(tmp_path):
+    geo = tmp_path / 'mesh.geo'
+    geo.write_text('//_*\np = 0;\n//**\n')
+    moose = tmp_path / 'model.i'
+    moose.write_text('#_*\np = 0\n#**\n')
+
+    log = []
+    dir_manager = DirectoryManager(n_dirs=3)
+    dir_manager.set_base_dir(tmp_path)
+    dir_manager.clear_dirs()
+    dir_manager.create_dirs()
+    # Meshing is the slow stage, the first solves finish long before the last mesh
+    herd = MooseHerd([FakeRunner('mesh',log,0.1),FakeRunner('solve',log,0.01)],
+                     [InputModifier(geo,'//',';'),InputModifier(moose,'#','')],dir_manager)
+    herd._n_para_sims = 2
+
+    submitted = dict()
+    def submit_score(outputs):
+        value = float(outputs[1].read_text())
+        submitted[value] = time.perf_counter()
+        return Score(value)
+
+    var_sweep = [[{'p':float(i)},{'p':float(i)}] for i in range(5)]
+    scores = run_pipelined(herd,var_sweep,submit_score=submit_score)
+    assert scores == [float(i) for i in range(5)]
+    last_mesh = max([e for stage,v,s,e in log if stage == 'mesh'])
+    assert submitted[0.] < last_mesh
@@ -0,0 +1,98 @@
+#
+#
+#
+
+import pytest
+import json
+import time
+import numpy as np
+from pathlib import Path
+from multiprocessing.pool import ThreadPool
+
+from pymoo.core.problem import Problem
+from pymoo.algorithms.soo.nonconvex.ga import GA
+from pymoo.termination import get_termination
+from mooseherder import MooseHerd, DirectoryManager, InputModifier, SimRunner
+
+from pyfemop.optimisationmanager.scheduling import AskTellAdapter, run_streamed
+
+def test_ask_tell_adapter():
+    problem = Problem(n_var=2,n_obj=1,xl=np.array([-1,-1]),xu=np.array([1,1]))
+    algorithm = GA(pop_size=6,n_offsprings=2)
+    algorithm.setup(problem,termination=get_termination('n_gen',5))
+    adapter = AskTellAdapter(algorithm,problem,max_batches=2)
+
+    # Initial population has to be told before any offspring are asked for
+    initial = [adapter.ask() for i in range(6)]
+    assert adapter.ask() is None
+    for batch_id,index,x in initial[:-1]:
+        assert adapter.tell(batch_id,index,[np.sum(x**2)]) == False
+    batch_id,index,x = initial[-1]
+    assert adapter.tell(batch_id,index,[np.sum(x**2)]) == True
+
+    # Two offspring batches can be in flight at once
+    in_flight = [adapter.ask() for i in range(4)]
+    assert all([c is not None for c in in_flight])
+    assert adapter.ask() is None
+    assert adapter.n_pending() == 4
+    for batch_id,index,x in reversed(in_flight):
+        adapter.tell(batch_id,index,[np.sum(x**2)])
+    assert adapter.n_pending() == 0
+    assert algorithm.n_gen == 4
+
+class DelayRunner(SimRunner):
+    # Later candidates finish first, the output is a copy of the input
+    def __init__(self):
+        self._input_path = None
+        self._output_path = None
+
+    def get_input_file(self):
+        return self._input_path
+
+    def set_input_file(self,input_path):
+        self._input_path = input_path
+
+    def run(self,input_file=None):
+        self._input_path = Path(input_file)
+        time.sleep(0.05*(6-read_value(self._input_path)))
+        self._output_path = self._input_path.with_suffix('.out')
+        self._output_path.write_text(self._input_path.read_text())
+
+    def get_output_path(self):
+        return self._output_path
+
+def read_value(path):
+    return float(Path(path).read_text().split('=')[1].split('\n')[0])
+
+def make_herd(base_dir):
+    base_dir.mkdir()
+    model = base_dir / 'model.i'
+    model.write_text('#_*\np = 0\n#**\n')
+    dir_manager = DirectoryManager(n_dirs=3)
+    dir_manager.set_base_dir(base_dir)
+    dir_manager.clear_dirs()
+    dir_manager.create_dirs()
+    herd = MooseHerd([DelayRunner()],[InputModifier(model,'#','')],dir_manager)
+    herd._n_para_sims = 3
+    return herd
+
+def test_run_streamed(tmp_path):
+    var_sweep = [[{'p':float(i)}] for i in range(6)]
+    streamed = make_herd(tmp_path / 'streamed')
+    swept = make_herd(tmp_path / 'swept')
+
+    with ThreadPool(2) as pool:
+        scores = run_streamed(streamed,var_sweep,lambda o: pool.apply_async(read_value,(o[0],)))
+    output_files = swept.run_para(var_sweep)
+
+    # Scores come back in sweep order, not the order the simulations finished
+    assert scores == [float(i) for i in range(6)]
+    assert [read_value(o[0]) for o in output_files] == scores
+    # The sweep is logged as run_para logs it
+    assert streamed._sim_iter == swept._sim_iter == 6
+    assert streamed._sweep_iter == swept._sweep_iter == 1
+    keys = []
+    for herd in (streamed,swept):
+        with open(herd._dir_manager.get_output_key_file(1),'r') as f:
+            keys.append([[Path(p).name for p in o] for o in json.load(f)])
+    assert keys[0] == keys[1]
@@ -0,0 +1,28 @@
+#
+#
+#
+
+import pytest
+import pickle
+import numpy as np
+
+from mooseherder import SimData
+from pyfemop.optimisationmanager.sharedarrays import SharedArrayStore
+from pyfemop.optimisationmanager.sharedarrays import attach
+
+def test_publish_attach():
+    data = [[SimData(time=np.arange(10.),
+                     coords=np.random.rand(1000,3),
+                     node_vars={'disp_y':np.full((1000,10),float(i))})] for i in range(3)]
+    store = SharedArrayStore(min_bytes=100)
+    published = store.publish(data)
+    assert len(pickle.dumps(published)) < len(pickle.dumps(data))/10
+
+    shared = attach(pickle.loads(pickle.dumps(published)))
+    assert shared[1][0].coords == pytest.approx(data[1][0].coords)
+    assert shared[2][0].node_vars['disp_y'][0,0] == pytest.approx(2.)
+    assert not shared[0][0].coords.flags.writeable
+    # Small arrays are left in place
+    assert isinstance(published[0][0].time,np.ndarray)
+    del shared
+    store.close()
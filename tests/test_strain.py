@@ -0,0 +1,30 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+
+from pyfemop.mooseutils.strain import window_strains
+
+def test_window_strains():
+    x = np.arange(30)*0.5
+    y = np.arange(20)*0.5
+    xx, yy = np.meshgrid(x,y)
+    scale = np.array([1.,2.])[:,None,None]
+    disp_x = scale*(0.01*xx + 0.004*yy)
+    disp_y = scale*(-0.003*yy + 0.002*xx)
+    # Hole in the middle of the field
+    disp_x[:,8:12,12:18] = np.nan
+    disp_y[:,8:12,12:18] = np.nan
+
+    strains = window_strains(disp_x,disp_y,5,(0.5,0.5))
+    assert np.nanmax(np.abs(strains['exx'] - 0.01*scale)) < 1E-10
+    assert np.nanmax(np.abs(strains['eyy'] + 0.003*scale)) < 1E-10
+    assert np.nanmax(np.abs(strains['exy'] - 0.003*scale)) < 1E-10
+    assert np.all(np.isnan(strains['exx'][:,8:12,12:18]))
+    assert np.sum(np.isnan(strains['exx'])) == 2*4*6
+
+    strains32 = window_strains(disp_x,disp_y,5,(0.5,0.5),np.float32)
+    assert strains32['eyy'].dtype == np.float32
+    assert np.nanmax(np.abs(strains32['eyy'] + 0.003*scale)) < 1E-5
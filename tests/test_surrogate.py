@@ -0,0 +1,46 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+
+from pyfemop.optimisationmanager.surrogate import GaussianProcess, SurrogateScreen
+
+def sphere(x):
+    return np.sum((x-0.3)**2,axis=1)
+
+def test_gaussian_process():
+    rng = np.random.default_rng(0)
+    X = rng.uniform(0,1,(40,2))
+    model = GaussianProcess()
+    model.fit(X,np.column_stack((sphere(X),np.sin(3*X[:,0]))))
+
+    mean, std = model.predict(X[:5])
+    assert mean[:,0] == pytest.approx(sphere(X[:5]),abs=1E-3)
+    assert np.all(std < 1E-2)
+
+    X_test = rng.uniform(0,1,(20,2))
+    mean, std = model.predict(X_test)
+    assert mean[:,0] == pytest.approx(sphere(X_test),abs=0.02)
+    assert mean[:,1] == pytest.approx(np.sin(3*X_test[:,0]),abs=0.02)
+    # Far from the data the model is uncertain
+    assert model.predict(np.array([[3.,3.]]))[1][0,0] > 10*np.max(std[:,0])
+
+def test_surrogate_screen():
+    rng = np.random.default_rng(1)
+    screen = SurrogateScreen(fraction=0.25,kappa=0.,min_archive=10)
+    x = rng.uniform(0,1,(8,2))
+    # Everything runs until the archive is big enough
+    assert np.all(screen.select(x,1))
+
+    X = rng.uniform(0,1,(30,2))
+    results = sphere(X)[:,None]
+    results[0] = 1E6
+    screen.add(X,results)
+    assert screen.n_archive() == 30
+
+    run = screen.select(x,1)
+    assert np.sum(run) == 2
+    # With no weight on the uncertainty the best predicted candidates run
+    assert set(np.flatnonzero(run)) == set(np.argsort(sphere(x))[:2])
@@ -0,0 +1,55 @@
+#
+#
+#
+
+import pytest
+import numpy as np
+
+from pyfemop.mooseutils.timecurves import time_to_limit, curve_area
+from pyfemop.mooseutils.interpolation import GridData
+from pyfemop.optimisationmanager.costfunctions import TimeToLimitArea
+
+def lin_int(x,x0,y0,x1,y1):
+    return (y0*(x1-x)+y1*(x-x0))/(x1-x0)
+
+def loop_curve(time,strain,stress,limit):
+    # Per step, per point reference as in test_st_curve.py
+    n = strain.shape[1]
+    under = np.full((3,n),np.nan)
+    over = np.full((3,n),np.nan)
+    for i in range(time.shape[0]):
+        mask = strain[i] < limit
+        under[:,mask] = np.vstack((strain[i],stress[i],np.full(n,time[i])))[:,mask]
+    for i in reversed(range(time.shape[0])):
+        mask = strain[i] > limit
+        over[:,mask] = np.vstack((strain[i],stress[i],np.full(n,time[i])))[:,mask]
+    times = np.array([lin_int(limit,under[0,j],under[2,j],over[0,j],over[2,j]) for j in range(n)])
+    stresses = np.array([lin_int(limit,under[0,j],under[1,j],over[0,j],over[1,j]) for j in range(n)])
+    return times, stresses
+
+def test_time_to_limit_matches_loop():
+    rng = np.random.default_rng(3)
+    time = np.linspace(0,100,21)
+    rates = rng.uniform(0,2E-4,50)
+    strain = np.outer(time,rates) + rng.uniform(0,1E-3,50)
+    stress = 100 + np.outer(time,rng.uniform(-0.5,0.5,50))
+    times, stresses = time_to_limit(time,strain,stress,5E-3)
+
+    expected_times, expected_stresses = loop_curve(time,strain,stress,5E-3)
+    assert np.allclose(times,expected_times,equal_nan=True)
+    assert np.allclose(stresses,expected_stresses,equal_nan=True)
+    assert np.any(np.isnan(times)) and not np.all(np.isnan(times))
+
+def test_time_to_limit_area_objective():
+    time = np.array([0.,1.,2.])
+    strain = np.array([[0.,0.,0.],[0.5,1.,2.],[1.,2.,4.]])
+    stress = np.array([[10.,20.,30.],[10.,20.,30.],[10.,20.,30.]])
+    times, stresses = time_to_limit(time,strain,stress,0.75)
+    assert np.allclose(times,[1.5,0.75,0.375])
+    assert curve_area(times,stresses) == pytest.approx(0.5*(30+20)*0.375 + 0.5*(20+10)*0.75)
+
+    data = GridData(time,None,None,{'mechanical_strain_yy':strain[:,None,:],'stress_yy':stress[:,None,:]})
+    objective = TimeToLimitArea(0.75)
+    assert objective(data,2) == pytest.approx(-curve_area(times,stresses))
+    assert objective(data,3) == 1E6
+    assert objective(None,2) == 1E6